@@ -0,0 +1,87 @@
+import math
+import random
+
+
+_DISTRIBUTIONS = ["constant", "poisson"]
+
+
+def _normalize_schedule(schedule):
+    """Converts a schedule into a list of (duration, start_rate, end_rate) segments.
+
+    Each step of the schedule is a dict with a `duration` in seconds and either a fixed
+    `rate` (queries per second) or a `start_rate` and `end_rate` to ramp linearly between.
+    The last step may omit `duration` to hold its rate until the workload is exhausted.
+    """
+    segments = []
+    for i, step in enumerate(schedule):
+        if "rate" in step:
+            start_rate = end_rate = float(step["rate"])
+        else:
+            start_rate = float(step["start_rate"])
+            end_rate = float(step["end_rate"])
+        assert start_rate >= 0 and end_rate >= 0, "Arrival rates must be >= 0."
+        duration = step.get("duration")
+        if duration is None:
+            assert i == len(schedule) - 1, "Only the last step may omit its duration."
+            assert start_rate == end_rate and start_rate > 0, (
+                "An open-ended step needs a fixed rate > 0."
+            )
+            duration = math.inf
+        assert duration > 0, "Step durations must be > 0."
+        segments.append((float(duration), start_rate, end_rate))
+    return segments
+
+
+def _arrivals_in_segment(duration, start_rate, end_rate):
+    """Expected number of arrivals in a segment, i.e. the integral of its rate."""
+    return duration * (start_rate + end_rate) / 2
+
+
+def _time_of_arrival(m, duration, start_rate, end_rate):
+    """Inverts the cumulative arrival count within one segment."""
+    if start_rate == end_rate:
+        return m / start_rate
+    # rate(t) = start_rate + slope * t, so count(t) = start_rate * t + slope * t^2 / 2
+    half_slope = (end_rate - start_rate) / (2 * duration)
+    return (-start_rate + math.sqrt(max(start_rate ** 2 + 4 * half_slope * m, 0.0))) / (2 * half_slope)
+
+
+def arrival_offsets(schedule, distribution="constant", seed=None):
+    """Yields the intended start offset (seconds from the start of the run) of each query.
+
+    Parameters:
+    schedule (list): Steps of the form {"duration": 60, "rate": 10} or
+        {"duration": 60, "start_rate": 1, "end_rate": 20}.
+    distribution (str): "constant" spaces arrivals evenly, "poisson" draws exponential
+        inter-arrival gaps with the same average rate.
+    seed (int): Seed for the Poisson arrivals, for reproducible runs.
+
+    The generator ends when the schedule runs out.
+    """
+    assert distribution in _DISTRIBUTIONS, (
+        "Invalid arrival distribution. "
+        f"Allowed distributions include: {_DISTRIBUTIONS}."
+    )
+    segments = _normalize_schedule(schedule)
+    rng = random.Random(seed)
+
+    segment_index = 0
+    segment_start_time = 0.0
+    segment_start_count = 0.0
+    count = 0.0
+    while True:
+        # Draw arrivals as a unit-rate process, then map them onto the schedule's time axis
+        count += rng.expovariate(1.0) if distribution == "poisson" else 1.0
+        while segment_index < len(segments):
+            duration, start_rate, end_rate = segments[segment_index]
+            segment_count = _arrivals_in_segment(duration, start_rate, end_rate)
+            if count <= segment_start_count + segment_count:
+                break
+            segment_start_time += duration
+            segment_start_count += segment_count
+            segment_index += 1
+        else:
+            return
+        yield segment_start_time + _time_of_arrival(
+            count - segment_start_count, duration, start_rate, end_rate
+        )
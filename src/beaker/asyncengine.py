@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class AsyncStatementEngine:
+    """Runs queries through the Databricks SQL Statement Execution API using asyncio.
+
+    Statements are submitted asynchronously (`wait_timeout=0s`) and their status is polled
+    with a backoff until they reach a terminal state. Because no thread is held while a
+    statement runs, a single driver can keep hundreds of queries in flight. The blocking
+    HTTP calls themselves are short and run on a small thread pool.
+
+    Note: the Statement Execution API does not accept session configuration, so the
+    warehouse's default results caching behaviour applies.
+    """
+
+    _TERMINAL_STATES = ["SUCCEEDED", "FAILED", "CANCELED", "CLOSED"]
+
+    def __init__(
+        self,
+        hostname,
+        token,
+        warehouse_id,
+        catalog=None,
+        schema=None,
+        poll_interval=0.05,
+        max_poll_interval=1.0,
+        http_workers=32,
+    ):
+        self.hostname = hostname
+        self.token = token
+        self.warehouse_id = warehouse_id
+        self.catalog = catalog
+        self.schema = schema
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._http_executor = ThreadPoolExecutor(max_workers=http_workers)
+
+    async def _request(self, method, path, json=None):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self._http_executor,
+            functools.partial(
+                requests.request,
+                method,
+                f"https://{self.hostname}/api/2.0/sql/statements{path}",
+                headers={"Authorization": f"Bearer {self.token}"},
+                json=json,
+            ),
+        )
+        if response.status_code != 200:
+            raise Exception(f"Statement API request failed ({response.status_code}): {response.text}")
+        return response.json()
+
+    def _statement_parameters(self, param):
+        """Converts a dict of named parameter markers into Statement API parameters."""
+        return [
+            {"name": name, "value": None if value is None else str(value)}
+            for name, value in param.items()
+        ]
+
+    async def submit(self, query_str, param=None):
+        """Submits a statement without waiting for it to finish and returns its response."""
+        body = {
+            "statement": query_str,
+            "warehouse_id": self.warehouse_id,
+            "wait_timeout": "0s",
+            "on_wait_timeout": "CONTINUE",
+        }
+        if self.catalog:
+            body["catalog"] = self.catalog
+        if self.schema:
+            body["schema"] = self.schema
+        if param:
+            body["parameters"] = self._statement_parameters(param)
+        return await self._request("POST", "", json=body)
+
+    async def wait(self, statement):
+        """Polls a submitted statement until it reaches a terminal state."""
+        statement_id = statement["statement_id"]
+        interval = self.poll_interval
+        while statement["status"]["state"] not in self._TERMINAL_STATES:
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            statement = await self._request("GET", f"/{statement_id}")
+        state = statement["status"]["state"]
+        if state != "SUCCEEDED":
+            error = statement["status"].get("error", {}).get("message")
+            raise Exception(f"Statement {statement_id} finished in state {state}: {error}")
+        return statement
+
+    async def execute_query(self, query_str, param=None):
+        """Submits a statement and waits for it to succeed."""
+        statement = await self.submit(query_str, param)
+        logging.debug(f"Submitted statement {statement['statement_id']}")
+        return await self.wait(statement)
+
+    def close(self):
+        self._http_executor.shutdown(wait=False)
+
+
+def run_coroutine(coroutine):
+    """Runs a coroutine to completion, even when called from a notebook with a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Jupyter and Databricks notebooks already run an event loop in this thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
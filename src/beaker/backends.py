@@ -0,0 +1,392 @@
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+import requests
+
+from beaker.queryhistory import QueryHistoryFetcher
+from beaker.spark_fixture import get_spark_session
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+
+class ExecutionBackend:
+    """The engine a Benchmark runs its queries on.
+
+    A backend creates the executors that run queries, serves the query history of a
+    run and manages the lifecycle of the warehouses it runs on. Executors have the
+    interface of `SQLWarehouseUtils`: `execute_query(query_str, param)` returns the
+    client-side timings and statement id of a query, and `fetch_all`,
+    `release_connection`, `close_connections`, `setConnectionMode`, `setPoolSize` and
+    `setFetchMode` are supported.
+    """
+
+    name = None
+    # Whether `USE CATALOG` and `USE SCHEMA` are run before the benchmark
+    supports_catalogs = True
+    # Whether the "async" engine can submit statements through the Statement Execution API
+    supports_statement_api = False
+
+    def create_executor(self, benchmark):
+        raise NotImplementedError
+
+    def get_query_history(self, benchmark, warehouse_ids, start_ts_ms, end_ts_ms):
+        raise NotImplementedError
+
+    def launch_warehouse(self, benchmark, config):
+        raise NotImplementedError
+
+    def stop_warehouse(self, benchmark, warehouse_id):
+        raise NotImplementedError
+
+    def get_warehouse_name(self, benchmark, warehouse_id):
+        raise NotImplementedError
+
+    def monitoring_url(self, benchmark):
+        """Returns where a run can be monitored, if anywhere."""
+        return None
+
+
+class DatabricksSQLBackend(ExecutionBackend):
+    """Runs queries on a Databricks SQL warehouse through the SQL connector and REST APIs."""
+
+    name = "databricks"
+    supports_statement_api = True
+    # Warehouse names per (hostname, warehouse id), shared so repeated runs don't look them up again
+    _warehouse_info_cache = {}
+
+    def create_executor(self, benchmark):
+        sql_warehouse = SQLWarehouseUtils(
+            benchmark.hostname,
+            benchmark.http_path,
+            benchmark.token,
+            benchmark.catalog,
+            benchmark.schema,
+            benchmark.results_cache_enabled,
+            connection_mode=benchmark.connection_mode,
+            # default to one warm session per query that can run at once
+            pool_size=benchmark._pool_size(),
+            fetch_mode=benchmark.fetch_mode,
+        )
+        return sql_warehouse
+
+    def _get_user_id(self, benchmark):
+        """Helper method for filtering query history the current User's Id"""
+        response = requests.get(
+            f"https://{benchmark.hostname}/api/2.0/preview/scim/v2/Me",
+            headers={"Authorization": f"Bearer {benchmark.token}"},
+        )
+        return response.json()["id"]
+
+    def get_query_history(self, benchmark, warehouse_ids, start_ts_ms, end_ts_ms):
+        user_id = self._get_user_id(benchmark)
+        fetcher = QueryHistoryFetcher(benchmark.hostname, benchmark.token)
+        return fetcher.fetch(warehouse_ids, [user_id], start_ts_ms, end_ts_ms)
+
+    def launch_warehouse(self, benchmark, config):
+        warehouse_utils = SQLWarehouseUtils()
+        warehouse_utils.setToken(token=benchmark.token)
+        warehouse_utils.setHostname(hostname=benchmark.hostname)
+        warehouse_utils.setCatalog(benchmark.catalog)
+        warehouse_utils.setSchema(benchmark.schema)
+        warehouse_utils.setEnableResultCaching(benchmark.results_cache_enabled)
+        return warehouse_utils.launch_warehouse(config, registry=benchmark.warehouse_registry)
+
+    def stop_warehouse(self, benchmark, warehouse_id):
+        response = requests.post(
+            f"https://{benchmark.hostname}/api/2.0/sql/warehouses/{warehouse_id}/stop",
+            headers={"Authorization": f"Bearer {benchmark.token}"},
+        )
+        return response.status_code
+
+    def get_warehouse_name(self, benchmark, warehouse_id):
+        key = (benchmark.hostname, warehouse_id)
+        if key not in self._warehouse_info_cache:
+            response = requests.get(
+                f"https://{benchmark.hostname}/api/2.0/sql/warehouses/{warehouse_id}",
+                headers={"Authorization": f"Bearer {benchmark.token}"},
+            )
+            self._warehouse_info_cache[key] = response.json()["name"]
+        return self._warehouse_info_cache[key]
+
+    def monitoring_url(self, benchmark):
+        return f"https://{benchmark.hostname}/sql/warehouses/{benchmark.warehouse_id}/monitoring"
+
+
+class LocalBackend(ExecutionBackend):
+    """Base class of backends that run queries in-process and keep their own query history.
+
+    Subclasses open a connection per worker thread with `_connect()` and run a query with
+    `_execute(connection, query_str, param)`, which returns an iterator of row batches.
+    Local engines only run a query as its rows are read, so with the "none" fetch mode
+    the rows are drained and discarded as part of `execute_time`. Results aren't
+    available as Arrow, so the "arrow" fetch mode isn't supported.
+    """
+
+    supports_catalogs = False
+    _FETCH_MODES = ["none", "rows"]
+
+    def __init__(self, fetch_batch_size=10000):
+        self.fetch_batch_size = fetch_batch_size
+        self.fetch_mode = "none"
+        self.warehouse_id = self.name
+        self._history = []
+        self._history_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _execute(self, connection, query_str, param):
+        raise NotImplementedError
+
+    def _fetch_all(self, connection, query_str, param):
+        raise NotImplementedError
+
+    def _batches(self, cursor):
+        """Yields the rows of a DB-API cursor in batches."""
+        while True:
+            rows = cursor.fetchmany(self.fetch_batch_size)
+            if not rows:
+                return
+            yield rows
+
+    def _run_without_fetch(self, connection, query_str, param):
+        """Runs a query to completion without keeping its rows and returns the row count."""
+        return sum(len(rows) for rows in self._execute(connection, query_str, param))
+
+    def _connection(self):
+        if not hasattr(self._local, "connection"):
+            self._local.connection = self._connect()
+            self._connections.append(self._local.connection)
+        return self._local.connection
+
+    def _record(self, statement_id, query_str, start_time, end_time, result_rows, status, error):
+        start_ms = int(start_time * 1000)
+        end_ms = int(end_time * 1000)
+        entry = {
+            "query_id": statement_id,
+            "query_text": query_str,
+            "status": status,
+            "error_message": error,
+            "warehouse_id": self.warehouse_id,
+            "query_start_time_ms": start_ms,
+            "execution_end_time_ms": end_ms,
+            "query_end_time_ms": end_ms,
+            "duration": end_ms - start_ms,
+            "is_final": True,
+            "metrics": {
+                "total_time_ms": end_ms - start_ms,
+                "execution_time_ms": end_ms - start_ms,
+                "rows_produced_count": result_rows,
+            },
+        }
+        with self._history_lock:
+            self._history.append(entry)
+
+    def create_executor(self, benchmark):
+        self.setFetchMode(benchmark.fetch_mode)
+        return self
+
+    def execute_query(self, query_str, param=None):
+        """Executes a query and returns its timings, like `SQLWarehouseUtils.execute_query`."""
+        timings = dict.fromkeys(SQLWarehouseUtils._PHASES + SQLWarehouseUtils._RESULT_STATS + ["statement_id"])
+        timings["statement_id"] = str(uuid.uuid4())
+        start_time = time.time()
+        result_rows = None
+        status, error = "FINISHED", None
+        phase_start = time.perf_counter()
+        try:
+            connection = self._connection()
+            timings["connect_time"] = time.perf_counter() - phase_start
+            phase_start = time.perf_counter()
+            if self.fetch_mode == "none":
+                result_rows = self._run_without_fetch(connection, query_str, param)
+                timings["execute_time"] = time.perf_counter() - phase_start
+            else:
+                batches = self._execute(connection, query_str, param)
+                timings["execute_time"] = time.perf_counter() - phase_start
+                phase_start = time.perf_counter()
+                result_rows = len(next(batches, []))
+                timings["time_to_first_row"] = time.perf_counter() - phase_start
+                result_rows += sum(len(rows) for rows in batches)
+                timings["fetch_time"] = time.perf_counter() - phase_start
+                timings["result_rows"] = result_rows
+        except Exception as e:
+            status, error = "FAILED", str(e)
+            raise
+        finally:
+            self._record(timings["statement_id"], query_str, start_time, time.time(), result_rows, status, error)
+        timings["close_time"] = 0.0
+        return timings
+
+    def fetch_all(self, query_str, param=None):
+        """Executes a small metadata query and returns its (column names, rows)."""
+        return self._fetch_all(self._connection(), query_str, param)
+
+    def release_connection(self):
+        pass
+
+    def close_connections(self):
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+        self._local = threading.local()
+
+    def setConnectionMode(self, connection_mode, **kwargs):
+        # Local engines always keep one connection per worker thread
+        pass
+
+    def setPoolSize(self, pool_size):
+        pass
+
+    def setFetchMode(self, fetch_mode, fetch_batch_size=None):
+        assert fetch_mode in self._FETCH_MODES, (
+            f"Invalid fetch mode for the {self.name} backend. "
+            f"Allowed fetch modes include: {self._FETCH_MODES}."
+        )
+        self.fetch_mode = fetch_mode
+        if fetch_batch_size is not None:
+            self.fetch_batch_size = fetch_batch_size
+
+    def get_query_history(self, benchmark, warehouse_ids, start_ts_ms, end_ts_ms):
+        with self._history_lock:
+            return [
+                dict(entry) for entry in self._history
+                if start_ts_ms <= entry["query_start_time_ms"] <= end_ts_ms
+            ]
+
+    def launch_warehouse(self, benchmark, config):
+        # There is nothing to provision for an in-process engine
+        return self.warehouse_id
+
+    def stop_warehouse(self, benchmark, warehouse_id):
+        self.close_connections()
+        return 200
+
+    def get_warehouse_name(self, benchmark, warehouse_id):
+        return self.name
+
+
+class SQLiteBackend(LocalBackend):
+    """Runs queries on an embedded SQLite database.
+
+    database: A SQLite database path or URI. Defaults to an in-memory database shared by
+        every worker thread.
+    setup: An optional SQL script run once to create and load the benchmark tables.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, database="file:beaker?mode=memory&cache=shared", setup=None, fetch_batch_size=10000):
+        super().__init__(fetch_batch_size)
+        self.database = database
+        # Keep one connection open, since a shared in-memory database lives as long as one does
+        self._root = self._connect()
+        if setup:
+            self._root.executescript(setup)
+            self._root.commit()
+
+    def _connect(self):
+        return sqlite3.connect(self.database, uri=True, check_same_thread=False, isolation_level=None)
+
+    def _execute(self, connection, query_str, param):
+        # SQLite binds named `:param` markers natively
+        cursor = connection.execute(query_str, param or {})
+        return self._batches(cursor)
+
+    def _fetch_all(self, connection, query_str, param):
+        cursor = connection.execute(query_str, param or {})
+        columns = [column[0] for column in cursor.description or []]
+        return columns, cursor.fetchall()
+
+
+class DuckDBBackend(LocalBackend):
+    """Runs queries on an embedded DuckDB database. Needs the `duckdb` package.
+
+    database: A DuckDB database path, or ":memory:".
+    setup: An optional SQL script run once to create and load the benchmark tables.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, database=":memory:", setup=None, fetch_batch_size=10000):
+        # Imported here so duckdb is only needed when this backend is used
+        import duckdb
+
+        super().__init__(fetch_batch_size)
+        self._root = duckdb.connect(database)
+        if setup:
+            self._root.execute(setup)
+
+    def _connect(self):
+        # Cursors are separate connections to the same database, one per worker thread
+        return self._root.cursor()
+
+    def _run(self, connection, query_str, param):
+        if param:
+            # DuckDB names parameters `$param` instead of `:param`
+            connection.execute(re.sub(r"(?<![:\w]):(\w+)", r"$\1", query_str), param)
+        else:
+            connection.execute(query_str)
+
+    def _execute(self, connection, query_str, param):
+        self._run(connection, query_str, param)
+        return self._batches(connection)
+
+    def _fetch_all(self, connection, query_str, param):
+        self._run(connection, query_str, param)
+        columns = [column[0] for column in connection.description or []]
+        return columns, connection.fetchall()
+
+
+class SparkSessionBackend(LocalBackend):
+    """Runs queries on a SparkSession, by default the one from `spark_fixture.get_spark_session`.
+
+    With `ENV=LOCAL` that is an in-process local Spark, so the same query files can be
+    benchmarked without a warehouse. With the "none" fetch mode results are written to
+    Spark's no-op sink, so queries run in full without collecting rows to the driver.
+    With the "rows" fetch mode `execute_time` only covers parsing and analysing the
+    query. Spark runs its jobs as the rows are read, so `time_to_first_row` includes
+    the execution of the first partitions.
+    """
+
+    name = "spark"
+
+    def __init__(self, spark=None, fetch_batch_size=10000):
+        super().__init__(fetch_batch_size)
+        self.spark = spark or get_spark_session()
+
+    def _connect(self):
+        return self.spark
+
+    def _sql(self, spark, query_str, param):
+        # Spark binds named `:param` markers from `args`
+        return spark.sql(query_str, args=param) if param else spark.sql(query_str)
+
+    def _execute(self, spark, query_str, param):
+        # Analysed now, so errors and planning count towards execute_time
+        df = self._sql(spark, query_str, param)
+        return self._row_batches(df.toLocalIterator())
+
+    def _row_batches(self, rows):
+        while True:
+            batch = [row for _, row in zip(range(self.fetch_batch_size), rows)]
+            if not batch:
+                return
+            yield batch
+
+    def _run_without_fetch(self, spark, query_str, param):
+        self._sql(spark, query_str, param).write.format("noop").mode("overwrite").save()
+        return None
+
+    def _fetch_all(self, spark, query_str, param):
+        df = self._sql(spark, query_str, param)
+        return df.columns, [tuple(row) for row in df.collect()]
+
+    def close_connections(self):
+        # The session is shared with the caller, so it is left running
+        self._connections = []
+        self._local = threading.local()
@@ -1,24 +1,76 @@
 import os
 import time
 import re
-import requests
 import logging
 from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED
 import threading
+import itertools
+import asyncio
 import datetime
 import json
+import math
+import uuid
+import weakref
 import pandas as pd
 from pandas import json_normalize
 
-from beaker.sqlwarehouseutils import SQLWarehouseUtils
-from beaker.spark_fixture import get_spark_session, metrics_to_df_view
+from beaker.arrivals import arrival_offsets
+from beaker.asyncengine import AsyncStatementEngine, run_coroutine
+from beaker.distributed import run_distributed
+from beaker.matrix import run_matrix
+from beaker.histogram import LatencyRecorder
+from beaker.metricsrecorder import MetricsRecorder, MetricsRow
+from beaker.runstore import RunStore
+from beaker.parsecache import ParseCache
+from beaker.warehouseregistry import WarehouseRegistry
+from beaker.backends import ExecutionBackend, DatabricksSQLBackend
+from beaker.hooks import BenchmarkHook, HookDispatcher
+from beaker.progress import LiveProgress
+from beaker.paramsweep import generate_bindings
+from beaker.prewarm import bind_params, references_table, touched_columns, partition_filter, warm_statement
+from beaker.stats import relative_median_ci_width, find_saturation_knee
+from beaker.spark_fixture import get_spark_session, metrics_to_df_view, export_metrics_to_delta
 
 # Create thread-local storage
 thread_local = threading.local()
 
+# A query file header `--id--` followed by the query text up to the next semicolon
+_QUERY_PATTERN = re.compile(r'--(.*?)--\s*(.*?);', re.DOTALL)
+
+
+class _Workload:
+    """A lazily generated workload that can be iterated more than once.
+
+    Every iteration calls `factory` to start a fresh generator, so repeating the workload
+    re-streams it from its source instead of holding every query in memory.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __iter__(self):
+        return iter(self._factory())
+
+
+class _WorkQueue:
+    """A thread-safe queue that pulls queries lazily from a workload as workers ask for them."""
+
+    def __init__(self, queries):
+        self._queries = enumerate(queries)
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Returns the next (index, query), or (None, None) once the workload is drained."""
+        with self._lock:
+            return next(self._queries, (None, None))
+
+
 class Benchmark:
     """Encapsulates a query benchmark test."""
 
+    _SCHEDULERS = ["continuous", "bucketed"]
+    _ENGINES = ["threads", "async"]
+
     def __init__(
         self,
         name="beaker_benchmark",
@@ -35,7 +87,13 @@ class Benchmark:
         schema="default",
         new_warehouse_config=None,
         results_cache_enabled=False,
-        query_file_format = "semicolon-delimited"
+        query_file_format = "semicolon-delimited",
+        connection_mode="fresh",
+        pool_size=None,
+        scheduler="continuous",
+        engine="threads",
+        fetch_mode="none",
+        backend=None,
     ):
         self.name = self._clean_name(name)
         self.query = query
@@ -52,37 +110,47 @@ class Benchmark:
         self.new_warehouse_config = new_warehouse_config
         self.results_cache_enabled = results_cache_enabled
         self.query_file_format = query_file_format
+        self.connection_mode = connection_mode
+        self.pool_size = pool_size
+        self.fetch_mode = fetch_mode
+        self.sql_warehouse = None
+        self.setScheduler(scheduler)
+        self.setArrivalRate(None)
+        self.setEngine(engine)
+        self.setDistributed(None)
+        self.latency_recorder = LatencyRecorder()
+        self.metrics_recorder = MetricsRecorder()
+        self.run_id = None
+        self.run_store = None
+        self.results_table = None
+        self.parse_cache = None
+        self.warmup_count = 0
+        self._warming_up = False
+        self.setAdaptiveRepetition(None)
+        self.setWarehouseRegistry()
+        self.hooks = []
+        self.hook_queue_size = 10000
+        self._hook_dispatcher = None
+        self._stop_event = threading.Event()
+        self.stop_reason = None
+        self.setBackend(backend)
         # Check if a new SQL warehouse needs to be created
         if new_warehouse_config is not None:
             self.setWarehouseConfig(new_warehouse_config)
-        self.sql_warehouse = None
 
 
     def _create_dbc(self):
-        sql_warehouse = SQLWarehouseUtils(
-            self.hostname,
-            self.http_path,
-            self.token,
-            self.catalog,
-            self.schema,
-            self.results_cache_enabled,
-        )
-        return sql_warehouse
+        return self.backend.create_executor(self)
 
     def _get_thread_local_connection(self):
-        if not hasattr(thread_local, "connection"):
+        # The cached executor belongs to the benchmark that created it, since another
+        # benchmark in the same thread can point at a different warehouse or workspace
+        owner = getattr(thread_local, "owner", None)
+        if owner is None or owner() is not self:
             thread_local.connection = self._create_dbc()
+            thread_local.owner = weakref.ref(self)
         return thread_local.connection
 
-    def _get_user_id(self):
-        """Helper method for filtering query history the current User's Id"""
-        response = requests.get(
-            f"https://{self.hostname}/api/2.0/preview/scim/v2/Me",
-            headers={"Authorization": f"Bearer {self.token}"},
-        )
-        return response.json()["id"]
-
-
     def _validate_warehouse(self, http_path):
         """Validates the SQL warehouse HTTP path."""
         pattern = r'^/sql/1\.0/warehouses/[a-f0-9]+$'
@@ -93,13 +161,7 @@ class Benchmark:
 
     def _launch_new_warehouse(self):
         """Launches a new SQL Warehouse"""
-        warehouse_utils = SQLWarehouseUtils()
-        warehouse_utils.setToken(token=self.token)
-        warehouse_utils.setHostname(hostname=self.hostname)
-        warehouse_utils.setCatalog(self.catalog)
-        warehouse_utils.setSchema(self.schema)
-        warehouse_utils.setEnableResultCaching(self.results_cache_enabled)
-        warehouse_id = warehouse_utils.launch_warehouse(self.new_warehouse_config)
+        warehouse_id = self.backend.launch_warehouse(self, self.new_warehouse_config)
         return warehouse_id
 
     def _clean_name(self, name):
@@ -119,6 +181,14 @@ class Benchmark:
         self.warehouse_name = self._get_warehouse_info()
         self.http_path = f"/sql/1.0/warehouses/{self.warehouse_id}"
 
+    def setWarehouseRegistry(self, path=os.path.join(os.path.expanduser("~"), ".beaker", "warehouses.json")):
+        """Sets where Beaker remembers the warehouses it provisioned, keyed by config.
+
+        `setWarehouseConfig` and `runMatrix` restart a registered warehouse with the same
+        config instead of creating a new one. Pass None to always create new warehouses.
+        """
+        self.warehouse_registry = WarehouseRegistry(path) if path is not None else None
+
     def setWarehouse(self, http_path):
         """Sets the SQL Warehouse http path to use for the benchmark."""
         assert self._validate_warehouse(http_path), "Invalid HTTP path for SQL Warehouse."
@@ -130,15 +200,297 @@ class Benchmark:
     def stop_warehouse(self, warehouse_id):
         """Stops a SQL warehouse."""
         logging.info(f"Stopping warehouse {warehouse_id}")
-        response = requests.post(
-            f"https://{self.hostname}/api/2.0/sql/warehouses/{warehouse_id}/stop",
-            headers={"Authorization": f"Bearer {self.token}"},
+        return self.backend.stop_warehouse(self, warehouse_id)
+
+    def addHook(self, hook, queue_size=None):
+        """Adds an instrumentation hook that receives run and query events.
+
+        hook: A `beaker.hooks.BenchmarkHook`, e.g. `JSONLinesSink`, `PrometheusSink` or
+            `InMemorySink`. Hooks run on a background thread fed by a bounded queue, so
+            they never add to measured latencies.
+        queue_size: Maximum number of undelivered events. Events beyond it are dropped
+            rather than slowing down the benchmark.
+        """
+        assert isinstance(hook, BenchmarkHook), "Invalid hook. Hooks must subclass beaker.hooks.BenchmarkHook."
+        self.hooks.append(hook)
+        if queue_size is not None:
+            self.hook_queue_size = queue_size
+
+    def clearHooks(self):
+        """Removes and closes every instrumentation hook."""
+        for hook in self.hooks:
+            hook.close()
+        self.hooks = []
+
+    def setLiveProgress(self, refresh_interval=5, window=60, slo_p95=None, slo_error_rate=None, min_samples=20):
+        """Shows rolling QPS, in-flight queries, error rate and p95 latency while the benchmark runs.
+
+        refresh_interval: seconds between refreshes of the progress line.
+        window: length of the rolling window the statistics cover, in seconds.
+        slo_p95: stops the run early once the rolling p95 latency exceeds this many seconds.
+        slo_error_rate: stops the run early once the rolling error rate exceeds this fraction.
+        min_samples: number of queries the window must hold before the SLOs are checked.
+        """
+        assert refresh_interval > 0 and window > 0, "Invalid live progress settings. refresh_interval and window must be positive."
+        progress = LiveProgress(
+            refresh_interval=refresh_interval,
+            window=window,
+            slo_p95=slo_p95,
+            slo_error_rate=slo_error_rate,
+            min_samples=min_samples,
+            on_breach=self.stopRun,
+        )
+        self.addHook(progress)
+        return progress
+
+    def stopRun(self, reason=None):
+        """Stops the running benchmark early. Queries already in flight finish and are kept.
+
+        Can be called from another thread, e.g. a notebook cell or a hook.
+        """
+        self.stop_reason = reason or "stopped by the user"
+        self._stop_event.set()
+        logging.warning(f"Stopping the benchmark: {self.stop_reason}")
+
+    def setBackend(self, backend):
+        """Sets the engine the benchmark runs its queries on.
+
+        backend: An `ExecutionBackend`, e.g. `SQLiteBackend()`, `DuckDBBackend()` or
+            `SparkSessionBackend()` from `beaker.backends` to run the same query files and
+            params locally. None (default) runs on a Databricks SQL warehouse.
+        """
+        assert backend is None or isinstance(backend, ExecutionBackend), (
+            "Invalid backend. Backends must subclass beaker.backends.ExecutionBackend."
         )
-        return response.status_code
+        self.backend = backend or DatabricksSQLBackend()
+        self.sql_warehouse = None
+        if not isinstance(self.backend, DatabricksSQLBackend):
+            # Local engines have a single, always running "warehouse"
+            self.warehouse_id = self.backend.launch_warehouse(self, None)
+            self.warehouse_name = self.backend.get_warehouse_name(self, self.warehouse_id)
+            self.sql_warehouse = self._create_dbc()
 
     def setConcurrency(self, concurrency):
         """Sets the query execution parallelism."""
         self.concurrency = concurrency
+        self._resize_pool()
+
+    def _pool_size(self):
+        """Returns the number of pooled sessions: `pool_size`, or one per query that can run at once."""
+        if self.pool_size is not None:
+            return self.pool_size
+        # Open-loop runs ignore the concurrency and run up to `max_in_flight` queries at once
+        return self.max_in_flight if self.arrival_schedule is not None else self.concurrency
+
+    def _resize_pool(self):
+        if self.sql_warehouse and self.connection_mode == "pooled" and self.pool_size is None:
+            # The default pool size follows the concurrency, or the open-loop `max_in_flight`
+            self.sql_warehouse.setPoolSize(self._pool_size())
+
+    def setConnectionMode(self, connection_mode, pool_size=None):
+        """Sets whether each query opens a fresh connection or reuses a pooled session.
+
+        connection_mode: "fresh" (default) opens and closes a connection around every query,
+            so elapsed times include the session handshake. "pooled" leases a warm session
+            to each worker thread and reuses it, the way BI tools see latency.
+        pool_size: maximum number of pooled sessions. Defaults to the concurrency, or to
+            `max_in_flight` in open-loop mode.
+        """
+        self.connection_mode = connection_mode
+        self.pool_size = pool_size
+        if self.sql_warehouse:
+            self.sql_warehouse.setConnectionMode(connection_mode, pool_size=self._pool_size())
+
+    def setFetchMode(self, fetch_mode):
+        """Sets whether query results are fetched after execution.
+
+        fetch_mode: "none" (default) only waits for `cursor.execute` to return. "rows"
+            also streams every row back to the client in batches and discards it, so
+            time to first row and result transfer are measured too. "arrow" streams the
+            results as Arrow batches (including Cloud Fetch downloads) and also records
+            the result size in bytes and the transfer throughput in MB/s.
+        """
+        self.fetch_mode = fetch_mode
+        if self.sql_warehouse:
+            self.sql_warehouse.setFetchMode(fetch_mode)
+
+    def setRunStore(self, path):
+        """Persists the client metrics and query history of every run under a local directory.
+
+        Runs are saved as partitioned Parquet with a small manifest, see `RunStore`.
+        Pass None to stop persisting runs.
+        """
+        self.run_store = RunStore(path) if path is not None else None
+
+    def setResultsTable(self, table):
+        """Appends the results of every run to a Delta table, partitioned by run id.
+
+        table: The table name, e.g. "main.benchmarks.beaker_results". It's created on the
+            first run. Pass None to stop exporting results.
+        """
+        self.results_table = table
+
+    def setParseCache(self, cache_dir):
+        """Caches parsed query files and params under `cache_dir`, so only changed files are re-parsed.
+
+        Pass None to disable the cache.
+        """
+        self.parse_cache = ParseCache(cache_dir) if cache_dir is not None else None
+
+    def setScheduler(self, scheduler):
+        """Sets how queries are scheduled onto the concurrent workers.
+
+        scheduler: "continuous" (default) keeps `concurrency` queries in flight for the whole
+            run using long-lived workers that pull from a shared queue. "bucketed" runs the
+            workload in batches of `concurrency` queries and waits for each batch to finish,
+            which matches results from older versions of Beaker.
+        """
+        scheduler = scheduler.strip().lower()
+        assert scheduler in self._SCHEDULERS, (
+            "Invalid scheduler. "
+            f"Allowed schedulers include: {self._SCHEDULERS}."
+        )
+        self.scheduler = scheduler
+
+    def setEngine(self, engine, poll_interval=0.05, max_poll_interval=1.0):
+        """Sets the engine used to run closed-loop workloads.
+
+        engine: "threads" (default) runs each in-flight query on its own thread through the
+            Databricks SQL connector. "async" submits statements through the Statement
+            Execution API and polls their status from a single asyncio event loop, so one
+            driver can keep hundreds of queries (`concurrency`) in flight. It doesn't fetch
+            results, so it only supports the "none" fetch mode, and it doesn't record phase
+            timings or result sizes.
+        poll_interval: initial delay between status polls for the async engine, in seconds.
+        max_poll_interval: the poll delay backs off up to this many seconds.
+        """
+        engine = engine.strip().lower()
+        assert engine in self._ENGINES, (
+            "Invalid engine. "
+            f"Allowed engines include: {self._ENGINES}."
+        )
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    def setArrivalRate(
+        self, rate, distribution="constant", schedule=None, seed=None, max_in_flight=256
+    ):
+        """Switches the benchmark to open-loop execution at a target arrival rate.
+
+        In open-loop mode queries are started on a fixed timetable, regardless of how long
+        earlier queries take, and `concurrency` is ignored.
+
+        rate: target queries per second. Pass None (and no schedule) to go back to
+            closed-loop execution.
+        distribution: "constant" for evenly spaced arrivals or "poisson" for random arrivals.
+        schedule: list of steps to vary the rate over time, e.g.
+            [{"duration": 60, "rate": 5}, {"duration": 120, "start_rate": 5, "end_rate": 50}].
+        seed: seed for Poisson arrivals.
+        max_in_flight: upper bound on the number of queries running at once. In pooled
+            connection mode the pool holds this many sessions, unless `pool_size` is set,
+            so queries don't queue for a session.
+        """
+        if schedule is None and rate is not None:
+            assert rate > 0, "Arrival rate must be > 0."
+            schedule = [{"rate": rate}]
+        self.arrival_schedule = schedule
+        self.arrival_distribution = distribution
+        self.arrival_seed = seed
+        self.max_in_flight = max_in_flight
+        self._resize_pool()
+
+    def setDistributed(self, num_workers, backend="process", start_delay=10):
+        """Shards the workload across several driver processes or Spark tasks.
+
+        num_workers: number of workers to split the workload across. Pass None to run
+            everything from this process. `concurrency` (and the open-loop arrival rate)
+            is the total across all workers.
+        backend: "process" for local processes or "spark" for Spark tasks.
+        start_delay: seconds to wait so that every worker starts at the same wall-clock time.
+        """
+        if num_workers is not None:
+            assert int(num_workers) > 0, "Number of distributed workers must be > 0."
+        self.distributed_workers = num_workers
+        self.distributed_backend = backend
+        self.distributed_start_delay = start_delay
+
+    def _worker_config(self, worker_index, num_workers):
+        """Returns a picklable config to rebuild this benchmark inside a distributed worker."""
+        kwargs = {
+            "name": self.name,
+            "concurrency": max(1, math.ceil(self.concurrency / num_workers)),
+            "db_hostname": self.hostname,
+            "warehouse_http_path": self.http_path,
+            "token": self.token,
+            "catalog": self.catalog,
+            "schema": self.schema,
+            "results_cache_enabled": self.results_cache_enabled,
+            "connection_mode": self.connection_mode,
+            "pool_size": self.pool_size,
+            "scheduler": self.scheduler,
+            "engine": self.engine,
+            "fetch_mode": self.fetch_mode,
+        }
+        schedule = self.arrival_schedule
+        if schedule is not None:
+            # Each worker carries an equal share of the target arrival rate
+            schedule = [
+                {k: v / num_workers if k.endswith("rate") else v for k, v in step.items()}
+                for step in schedule
+            ]
+        attributes = {
+            "warehouse_id": self.warehouse_id,
+            "warehouse_name": self.warehouse_name,
+            "arrival_schedule": schedule,
+            "arrival_distribution": self.arrival_distribution,
+            "arrival_seed": None if self.arrival_seed is None else self.arrival_seed + worker_index,
+            "max_in_flight": self.max_in_flight,
+            "poll_interval": self.poll_interval,
+            "max_poll_interval": self.max_poll_interval,
+        }
+        return {"kwargs": kwargs, "attributes": attributes}
+
+    def setWarmup(self, warmup_count):
+        """Runs every query `warmup_count` times before the measured run.
+
+        Warm-up results are tagged with `warmup=True` and excluded from the returned metrics,
+        the latency summary and the query history window.
+        """
+        assert int(warmup_count) >= 0, "Warm-up count must be >= 0."
+        self.warmup_count = int(warmup_count)
+
+    def setAdaptiveRepetition(
+        self,
+        target_relative_ci=0.05,
+        confidence=0.95,
+        min_repetitions=5,
+        max_repetitions=50,
+        time_budget=None,
+    ):
+        """Repeats each query until its median latency is known precisely enough.
+
+        Instead of a fixed `query_repeat_count`, the workload is run in rounds. After each
+        round, queries whose median latency confidence interval is narrower than
+        `target_relative_ci` (relative to the median) stop repeating, so noisy queries get
+        more samples and stable ones fewer.
+
+        target_relative_ci: target width of the median's confidence interval, e.g. 0.05
+            for +/- 2.5%. Pass None to disable adaptive repetition.
+        confidence: confidence level of the interval.
+        min_repetitions, max_repetitions: bounds on the number of runs of each query.
+        time_budget: optional number of seconds after which no new round is started.
+        """
+        if target_relative_ci is not None:
+            assert target_relative_ci > 0, "Target confidence interval width must be > 0."
+            assert 0 < min_repetitions <= max_repetitions, (
+                "Repetitions must satisfy 0 < min_repetitions <= max_repetitions."
+            )
+        self.adaptive_target_relative_ci = target_relative_ci
+        self.adaptive_confidence = confidence
+        self.adaptive_min_repetitions = min_repetitions
+        self.adaptive_max_repetitions = max_repetitions
+        self.adaptive_time_budget = time_budget
 
     def setQueryRepeatCount(self, query_repeat_count):
         """Sets the number of times a passed query will be repeatedly run."""
@@ -193,36 +545,152 @@ class Benchmark:
         ), "Invalid query file directory."
         self.query_file_dir = query_file_dir
 
-    def _execute_single_query(self, query, id=None, param=None):
+    def _execute_single_query(self, query, id=None, param=None, intended_start_time=None, record_errors=False):
+        """Runs one query and returns its metrics.
+
+        A failing query raises, unless `record_errors` is set: then it's returned as a metrics
+        row with its `error`, so a worker can carry on with the rest of the workload.
+        """
         query = query.strip()
+        self._emit("on_query_submit", {"id": id, "param": param, "warmup": self._warming_up})
         start_time = time.perf_counter()
-        self.sql_warehouse.execute_query(query, param)
+        try:
+            timings = self.sql_warehouse.execute_query(query, param)
+        except Exception as e:
+            self._emit("on_error", {"id": id, "param": param, "warmup": self._warming_up, "error": str(e)})
+            if not record_errors:
+                raise
+            return self._query_metrics(
+                query, id, param, start_time, time.perf_counter(), intended_start_time, error=str(e)
+            )
         end_time = time.perf_counter()
-        elapsed_time = f"{end_time - start_time:0.3f}"
- 
-        metrics = {
-            "id": id,
-            "param": param,
-            "hostname": self.hostname,
-            "http_path": self.http_path,
-            "warehouse_name": self.warehouse_name,
-            "concurrency": self.concurrency,
-            "query": query,
-            "elapsed_time": elapsed_time,
-        }
+        metrics = self._query_metrics(query, id, param, start_time, end_time, intended_start_time, timings)
+        self._emit("on_query_complete", metrics)
+        return metrics
+
+    async def _execute_single_query_async(self, engine, query, id=None, param=None):
+        """Runs one query on the async engine. A failing query is returned as a row with its `error`."""
+        query = query.strip()
+        self._emit("on_query_submit", {"id": id, "param": param, "warmup": self._warming_up})
+        start_time = time.perf_counter()
+        try:
+            statement = await engine.execute_query(query, param)
+        except Exception as e:
+            self._emit("on_error", {"id": id, "param": param, "warmup": self._warming_up, "error": str(e)})
+            return self._query_metrics(query, id, param, start_time, time.perf_counter(), error=str(e))
+        end_time = time.perf_counter()
+        timings = {"statement_id": statement["statement_id"]}
+        metrics = self._query_metrics(query, id, param, start_time, end_time, timings=timings)
+        self._emit("on_query_complete", metrics)
         return metrics
 
+    def _emit(self, event_name, payload):
+        """Hands an event to the hook dispatcher without blocking; a no-op without hooks."""
+        dispatcher = self._hook_dispatcher
+        if dispatcher is not None:
+            dispatcher.emit(event_name, dict(payload, event=event_name, time=time.time(), run_id=self.run_id))
+
+    def _start_hooks(self):
+        if self.hooks:
+            self._hook_dispatcher = HookDispatcher(self.hooks, self.hook_queue_size)
+
+    def _stop_hooks(self):
+        dispatcher, self._hook_dispatcher = self._hook_dispatcher, None
+        if dispatcher is not None:
+            dispatcher.close()
+
+    def _query_metrics(self, query, id, param, start_time, end_time, intended_start_time=None, timings=None, error=None):
+        wall_clock_offset = time.time() - time.perf_counter()
+        # Timings carry the statement id, the client-side phase breakdown and result sizes;
+        # phases the engine can't observe are left empty
+        metrics = dict(
+            timings or {},
+            id=id,
+            param=param,
+            query=query,
+            elapsed_time=end_time - start_time,
+            end_time=end_time + wall_clock_offset,
+            warmup=self._warming_up,
+            error=error,
+        )
+        if intended_start_time is not None:
+            # Open-loop runs also record how late the query started and the latency measured
+            # from when it should have started, which corrects for coordinated omission
+            metrics["intended_start_time"] = intended_start_time + wall_clock_offset
+            metrics["actual_start_time"] = start_time + wall_clock_offset
+            metrics["start_delay"] = start_time - intended_start_time
+            metrics["corrected_elapsed_time"] = end_time - intended_start_time
+        if id is not None and not self._warming_up and error is None:
+            self.latency_recorder.record(id, param, self.concurrency, metrics["elapsed_time"], metrics["end_time"])
+        return self.metrics_recorder.record(**metrics)
+
 
     def _set_default_catalog(self):
-        if self.catalog:
+        if self.catalog and self.backend.supports_catalogs:
             query = f"USE CATALOG {self.catalog}"
             self._execute_single_query(query)
 
     def _set_default_schema(self):
-        if self.schema:
+        if self.schema and self.backend.supports_catalogs:
             query = f"USE SCHEMA {self.schema}"
             self._execute_single_query(query)
+        # In pooled mode these ran on a session leased to the calling thread, which stays
+        # alive, so hand the session back for the workers
+        self.sql_warehouse.release_connection()
     
+    def _iter_query_file(self, file_path):
+        """
+        Lazily parses a SQL file and yields a (query_id, query_text) tuple per query.
+
+        The file is read line by line and each query is yielded as soon as its terminating
+        semicolon is read, so memory use doesn't grow with the size of the file.
+        """
+        buffer = ""
+        with open(file_path, 'r') as file:
+            for line in file:
+                buffer += line
+                if ";" not in line:
+                    continue
+                end = 0
+                for match in _QUERY_PATTERN.finditer(buffer):
+                    yield match.group(1), match.group(2)
+                    end = match.end()
+                buffer = buffer[end:]
+
+    def _read_params(self, params_path):
+        with open(params_path, 'r') as f:
+            return json.load(f)
+
+    def _load_params(self, params_path):
+        """Loads the params.json file, if any."""
+        if not params_path:
+            return None
+        if self.parse_cache:
+            return self.parse_cache.get(params_path, self._read_params)
+        return self._read_params(params_path)
+
+    def _expand_params(self, matches, data):
+        """Yields a (query_text, query_id, param) tuple for every param of every query.
+
+        The params of a query are either a list of literal param dicts or a parameter
+        sweep that generates them lazily, see `paramsweep.generate_bindings`.
+        """
+        for query_id, query_text in matches:
+            if data and query_id in data:
+                for param in generate_bindings(data.get(query_id)):
+                    query = f"--{query_id}|{param}--\n{query_text.strip()};"
+                    yield (query, query_id, param)
+            else:
+                yield (f"--{query_id}--\n{query_text.strip()};", query_id, None)
+
+    def _iter_queries_from_file(self, file_path, params_path=None, data=None):
+        data = self._load_params(params_path) if data is None else data
+        if self.parse_cache:
+            matches = self.parse_cache.get(file_path, lambda path: list(self._iter_query_file(path)))
+        else:
+            matches = self._iter_query_file(file_path)
+        yield from self._expand_params(matches, data)
+
     def _get_queries_from_file(self, file_path, params_path=None):
         """
         Parses a SQL file and returns a list of tuples with the (query_text, query_id, param=None).
@@ -234,81 +702,270 @@ class Benchmark:
         Returns:
         list: A list of tuples, where each tuple contains a query_id and a query text.
         """
-        with open(file_path, 'r') as file:
-            content = file.read().strip()
-
-        matches = re.findall(r'--(.*?)--\s*(.*?);', content, re.DOTALL)
-
-        if params_path:
-            with open(params_path, 'r') as f:
-                data = json.load(f)
-        else:
-            return [(f"--{query_id}--\n{query_text.strip()};", query_id, None) for query_id, query_text in matches ] 
-
-        queries_w_params = []
-        for query_id, query_text in matches:
-            if query_id in data:
-                for param in data.get(query_id):
-                    query = f"--{query_id}|{param}--\n{query_text.strip()};"
-                    queries_w_params.append((query, query_id, param))
-            else:
-                queries_w_params.append((f"--{query_id}--\n{query_text.strip()};", query_id, None))
-        return queries_w_params
-
-
-    def _execute_queries_from_file(self, query_file, params_path):
-        queries = self._get_queries_from_file(query_file, params_path)
-        metrics = self._execute_queries(queries, self.concurrency)
-        return metrics
+        return list(self._iter_queries_from_file(file_path, params_path))
 
     def _get_query_filenames_from_dir(self, query_file_dir):
         return [os.path.join(query_file_dir, f) for f in os.listdir(query_file_dir) if f.endswith('.sql')]
 
+    def _iter_queries_from_dir(self, query_dir, params_path=None):
+        data = self._load_params(params_path)
+        for qf in self._get_query_filenames_from_dir(query_dir):
+            yield from self._iter_queries_from_file(qf, data=data)
+
     def _get_queries_from_dir(self, query_dir, params_path=None):
-        query_files = self._get_query_filenames_from_dir(query_dir) 
-        queries = []
-        for qf in query_files:
-            qs = self._get_queries_from_file(qf, params_path)
-            queries += qs
-        return queries
-
-    def _execute_queries_from_dir(self, query_dir, params_path=None):
-        queries = self._get_queries_from_dir(query_dir, params_path)
-        metrics = self._execute_queries(queries, self.concurrency)
-        return metrics
+        return list(self._iter_queries_from_dir(query_dir, params_path))
 
-    def _execute_queries_from_query(self, query, params_path=None):
-        if params_path:
-            with open(params_path, 'r') as f:
-                data = json.load(f)
+    def _iter_queries_from_query(self, query, params_path=None):
+        data = self._load_params(params_path)
+        if data:
+            for param in generate_bindings(data["query"]):
+                yield (f"--query|{param}--\n{query.strip()};", "query", param)
+        else:
+            yield (f"--query--\n{query.strip()};", "query", None)
 
-            params = data["query"]
-            queries = [(f"--query|{param}--\n{query.strip()};", "query", param) for param in params]
-            metrics = self._execute_queries(queries, self.concurrency)
+    def _get_workload(self):
+        """Returns the lazily loaded workload of the benchmark's query source."""
+        if self.query_file_dir is not None:
+            logging.info("Loading query files from directory.")
+            query_dir, params_path = self.query_file_dir, self.params_path
+            return _Workload(lambda: self._iter_queries_from_dir(query_dir, params_path))
+        elif self.query_file is not None:
+            logging.info("Loading query file.")
+            query_file, params_path = self.query_file, self.params_path
+            return _Workload(lambda: self._iter_queries_from_file(query_file, params_path))
+        elif self.query is not None:
+            logging.info("Executing single query.")
+            query, params_path = self.query, self.params_path
+            return _Workload(lambda: self._iter_queries_from_query(query, params_path))
         else:
-            metrics = self._execute_queries([(f"--query--\n{query.strip()};", "query", None)], self.concurrency)
-        return metrics
+            raise ValueError("No query specified.")
+
+    def _repeat_queries(self, queries, repeat_count=None):
+        """Lazily repeats the workload `query_repeat_count` times."""
+        for _ in range(repeat_count or self.query_repeat_count):
+            yield from queries
+
+    def _execute_warmup(self, queries):
+        """Runs the workload `warmup_count` times in the configured execution mode, tagging the results as warm-up."""
+        print(f"Warming up with {self.warmup_count} run(s) of the workload")
+        self._warming_up = True
+        try:
+            return self._dispatch_queries(self._repeat_queries(queries, self.warmup_count), self.concurrency)
+        finally:
+            self._warming_up = False
+
+    def _execute_queries_adaptive(self, queries, num_threads):
+        """Runs the workload in rounds until every query's median latency has converged."""
+        queries = list(queries)
+        samples = [[] for _ in queries]
+        pending = list(range(len(queries)))
+        deadline = time.time() + self.adaptive_time_budget if self.adaptive_time_budget else None
+
+        metrics_list = []
+        failed = set()
+        while pending and not self._stop_event.is_set():
+            round_metrics = self._dispatch_queries([queries[i] for i in pending], num_threads)
+            metrics_list += round_metrics
+            for index, metrics in zip(pending, round_metrics):
+                if metrics["error"] is not None:
+                    failed.add(index)
+                else:
+                    samples[index].append(metrics["elapsed_time"])
+            pending = [
+                index for index in pending
+                if index not in failed
+                and (
+                    len(samples[index]) < self.adaptive_min_repetitions
+                    or (
+                        len(samples[index]) < self.adaptive_max_repetitions
+                        and relative_median_ci_width(samples[index], self.adaptive_confidence)
+                        > self.adaptive_target_relative_ci
+                    )
+                )
+            ]
+            if deadline and time.time() >= deadline and pending:
+                logging.warning(f"Adaptive repetition time budget exhausted with {len(pending)} queries unconverged.")
+                break
+        if failed:
+            # A failing query would never converge, so it's not repeated
+            logging.warning(f"Adaptive repetition stopped repeating {len(failed)} failing queries.")
+        repetitions = [len(s) for s in samples]
+        print(f"Adaptive repetition ran each query between {min(repetitions, default=0)} and {max(repetitions, default=0)} times")
+        return metrics_list
 
     def _execute_queries(self, queries, num_threads):
+        if self.adaptive_target_relative_ci is not None:
+            return self._execute_queries_adaptive(queries, num_threads)
         # Duplicate queries `query_repeat_count` number of times
-        queries = queries * self.query_repeat_count
-        # Create bucketed_queries
-        bucketed_queries = [queries[i:i + num_threads] for i in range(0, len(queries), num_threads)]
+        return self._dispatch_queries(self._repeat_queries(queries), num_threads)
+
+    def _dispatch_queries(self, queries, num_threads):
+        """Runs a stream of queries with the configured execution mode."""
+        if self.distributed_workers:
+            assert isinstance(self.backend, DatabricksSQLBackend), (
+                "Distributed execution is only supported on a Databricks SQL warehouse."
+            )
+            return self._execute_queries_distributed(list(queries))
+        if self.arrival_schedule is not None:
+            return self._execute_queries_open_loop(queries)
+        if self.engine == "async":
+            assert self.backend.supports_statement_api, (
+                f"The async engine isn't supported on the {self.backend.name} backend."
+            )
+            assert self.fetch_mode == "none", (
+                "The async engine doesn't fetch results. Use the \"none\" fetch mode, or the threads engine."
+            )
+            return self._execute_queries_async(queries, num_threads)
+        if self.scheduler == "bucketed":
+            return self._execute_queries_bucketed(queries, num_threads)
+        return self._execute_queries_continuous(queries, num_threads)
+
+    def _execute_queries_bucketed(self, queries, num_threads):
+        # Create bucketed_queries lazily, one bucket at a time
+        queries = iter(queries)
+        bucketed_queries = iter(lambda: list(itertools.islice(queries, num_threads)), [])
 
         metrics_list = []
         for query_bucket in bucketed_queries:
+            if self._stop_event.is_set():
+                break
             print(f'Executing {len(query_bucket)} queries concurrently on {self.warehouse_name}')
             with ThreadPoolExecutor(max_workers=num_threads) as executor:
-                futures = [executor.submit(self._execute_single_query, query, id, param) for query, id, param in query_bucket]
+                futures = [
+                    executor.submit(self._execute_single_query, query, id, param, record_errors=True)
+                    for query, id, param in query_bucket
+                ]
 
                 # wait(futures, return_when=ALL_COMPLETED)
             metrics_list = metrics_list + [future.result() for future in futures]
         return metrics_list
 
+    def _worker_loop(self, work_queue, metrics_list):
+        """Pulls queries off the shared queue until it is drained or the run is stopped."""
+        try:
+            while not self._stop_event.is_set():
+                index, query = work_queue.next()
+                if query is None:
+                    return
+                query, id, param = query
+                metrics_list[index] = self._execute_single_query(query, id, param, record_errors=True)
+        finally:
+            # hand the worker's pooled session back before the thread exits
+            self.sql_warehouse.release_connection()
+
+    def _execute_queries_continuous(self, queries, num_threads):
+        work_queue = _WorkQueue(queries)
+        metrics_list = {}
+
+        print(f'Executing queries with {num_threads} concurrent workers on {self.warehouse_name}')
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [executor.submit(self._worker_loop, work_queue, metrics_list) for _ in range(num_threads)]
+        for future in futures:
+            future.result()
+        return [metrics_list[index] for index in sorted(metrics_list)]
+
+    def _execute_queries_open_loop(self, queries):
+        offsets = arrival_offsets(
+            self.arrival_schedule, self.arrival_distribution, self.arrival_seed
+        )
+        print(f'Executing queries open-loop ({self.arrival_distribution} arrivals) on {self.warehouse_name}')
+
+        queries = iter(queries)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            run_start = time.perf_counter()
+            for offset, (query, id, param) in zip(offsets, queries):
+                intended_start_time = run_start + offset
+                delay = intended_start_time - time.perf_counter()
+                # Waiting on the stop event instead of sleeping lets a stop interrupt long gaps
+                if self._stop_event.wait(max(delay, 0)):
+                    break
+                futures.append(executor.submit(
+                    self._execute_single_query, query, id, param, intended_start_time, record_errors=True
+                ))
+        if not self._stop_event.is_set() and next(queries, None) is not None:
+            logging.warning(f"Arrival schedule ended after {len(futures)} queries, before the workload was exhausted.")
+        return [future.result() for future in futures]
+
+    async def _execute_queries_async_loop(self, engine, queries, max_in_flight):
+        queries = enumerate(queries)
+        metrics_list = {}
+
+        async def worker():
+            # Workers share one iterator, which is safe since they all run on this event loop
+            for index, (query, id, param) in queries:
+                if self._stop_event.is_set():
+                    return
+                metrics_list[index] = await self._execute_single_query_async(engine, query, id, param)
+
+        await asyncio.gather(*[worker() for _ in range(max_in_flight)])
+        return [metrics_list[index] for index in sorted(metrics_list)]
+
+    def _execute_queries_async(self, queries, max_in_flight):
+        print(f'Executing queries with up to {max_in_flight} in flight (async) on {self.warehouse_name}')
+        engine = AsyncStatementEngine(
+            self.hostname,
+            self.token,
+            self.warehouse_id,
+            catalog=self.catalog,
+            schema=self.schema,
+            poll_interval=self.poll_interval,
+            max_poll_interval=self.max_poll_interval,
+        )
+        try:
+            return list(run_coroutine(self._execute_queries_async_loop(engine, queries, max_in_flight)))
+        finally:
+            engine.close()
+
+    def _execute_queries_distributed(self, queries):
+        num_workers = self.distributed_workers
+        worker_configs = [self._worker_config(i, num_workers) for i in range(num_workers)]
+        metrics_list = run_distributed(
+            worker_configs,
+            queries,
+            backend=self.distributed_backend,
+            start_delay=self.distributed_start_delay,
+        )
+        # Latencies were measured in the workers, so record them here once they're merged,
+        # with the wall-clock time each query finished so throughput covers the real run.
+        # The workers don't know about the warm-up, so its results are tagged here too.
+        rows = []
+        for metrics in metrics_list:
+            rows.append(self.metrics_recorder.record(**dict(metrics, warmup=self._warming_up)))
+            if metrics.get("error") is not None:
+                self._emit("on_error", rows[-1])
+                continue
+            if not self._warming_up:
+                self.latency_recorder.record(
+                    metrics["id"], metrics["param"], self.concurrency, metrics["elapsed_time"], metrics.get("end_time")
+                )
+            self._emit("on_query_complete", rows[-1])
+        return rows
+
+    def getLatencySummary(self, overall=False):
+        """Returns latency percentiles, max and throughput from the streaming latency recorder.
+
+        Can be called while `execute()` is running from another thread, or after it returns.
+        Latencies accumulate across runs until `resetLatencySummary()` is called.
+
+        overall: summarize every query together instead of one row per
+            query id, param and concurrency level.
+        """
+        if overall:
+            return pd.DataFrame([self.latency_recorder.overall()])
+        return pd.DataFrame(self.latency_recorder.summary())
+
+    def resetLatencySummary(self):
+        """Clears the latencies recorded by previous runs."""
+        self.latency_recorder.reset()
+
     def get_query_history(self, warehouse_id, start_ts_ms, end_ts_ms):
         """
         Retrieves the Query History for a given workspace and Data Warehouse.
 
+        Every page of results is retrieved, large windows are fetched as parallel sub-ranges,
+        and queries that are still running are re-polled until they are final.
+
         Parameters:
         -----------
         warehouse_id (str): The ID of the Data Warehouse for which to retrieve the Query History.
@@ -320,45 +977,50 @@ class Benchmark:
         end_res : query history json
         """
         print(f"Extracting query history {self.warehouse_name} from {start_ts_ms} to {end_ts_ms}")
-        user_id = self._get_user_id()
-        ## Put together request 
-        request_string = {
-            "filter_by": {
-                "query_start_time_range": {
-                    "end_time_ms": end_ts_ms,
-                    "start_time_ms": start_ts_ms
-            },
-            "warehouse_ids": warehouse_id,
-            "user_ids": [user_id],
-            },
-            "include_metrics": "true",
-            "max_results": "1000"
-        }
-
-        # ## Convert dict to json
-        v = json.dumps(request_string)
-
-        uri = f"https://{self.hostname}/api/2.0/sql/history/queries"
-        headers_auth = {"Authorization":f"Bearer {self.token}"}
-
-        #### Get Query History Results from API
-        response = requests.get(uri, data=v, headers=headers_auth)
-        while True:
-            results = response.json()['res']
-            if all([item['is_final'] for item in results]):
-                break
-            time.sleep(10)
-            response = requests.get(uri, data=v, headers=headers_auth)
-
-        if (response.status_code == 200) and ("res" in response.json()):
-            end_res = response.json()['res']
-            return end_res
-        else:
-            raise Exception("Failed to retrieve successful query history")
-
-    def _clean_query_history(self, warehouse_id, start_ts_ms, end_ts_ms):
+        warehouse_ids = [warehouse_id] if isinstance(warehouse_id, str) else warehouse_id
+        return self.backend.get_query_history(self, warehouse_ids, start_ts_ms, end_ts_ms)
+
+    def _metrics_to_pandas(self, metrics):
+        """Returns client metrics, as rows of a metrics recorder, dicts or a DataFrame, as a DataFrame."""
+        if isinstance(metrics, pd.DataFrame):
+            return metrics
+        recorder = getattr(metrics[0], "recorder", None)
+        if all(isinstance(row, MetricsRow) and row.recorder is recorder for row in metrics):
+            return recorder.to_pandas(rows=[row.index for row in metrics])
+        return pd.DataFrame([dict(row) for row in metrics])
+
+    def _clean_query_history(self, warehouse_id, start_ts_ms, end_ts_ms, metrics=None):
+        """Retrieves the query history of a run and joins it with the client-side metrics.
+
+        When the client metrics carry statement ids, or every query failed, the result has one
+        row per executed query with both client and server timings, joined exactly on the
+        statement id.
+        Otherwise the query id is recovered from the `--id--` header in the query text.
+        """
         history_metrics = self.get_query_history(warehouse_id, start_ts_ms, end_ts_ms)
         history_pdf = pd.DataFrame(history_metrics)
+        if "query_id" not in history_pdf.columns:
+            history_pdf["query_id"] = pd.Series(dtype=object)
+
+        client_pdf = self._metrics_to_pandas(metrics) if metrics is not None and len(metrics) else None
+        if client_pdf is None and history_pdf.empty:
+            # Nothing ran in the measured window, e.g. the run was stopped during the warm-up
+            client_pdf = self.metrics_recorder.to_pandas(rows=[])
+            return client_pdf.reindex(columns=client_pdf.columns.tolist() + ["query_id", "query_text"])
+
+        # Failed queries have no statement id, but a run in which all of them failed
+        # still returns the client rows, so their errors aren't lost
+        if client_pdf is not None and (
+            client_pdf["statement_id"].notna().any() or client_pdf["error"].notna().all()
+        ):
+            return client_pdf.merge(
+                history_pdf,
+                how="left",
+                left_on="statement_id",
+                right_on="query_id",
+                suffixes=("", "_server"),
+            )
+
         history_pdf["warehouse_name"] = self.warehouse_name
         ## Extract the text from query_text, if missing value, use 'query'
         history_pdf['id'] = history_pdf['query_text'].str.extract(r'--(.*?)--', flags=re.IGNORECASE).fillna('query')
@@ -371,11 +1033,7 @@ class Benchmark:
 
     def _get_warehouse_info(self):
         """Gets the warehouse name as it's not available in the config and in http_path."""
-        response = requests.get(
-            f"https://{self.hostname}/api/2.0/sql/warehouses/{self.warehouse_id}",
-            headers={"Authorization": f"Bearer {self.token}"},
-        )
-        warehouse_name = response.json()["name"]
+        warehouse_name = self.backend.get_warehouse_name(self, self.warehouse_id)
         return warehouse_name
     
 
@@ -388,32 +1046,223 @@ class Benchmark:
         self._set_default_catalog()
         self._set_default_schema()
         
-        print(f"Monitor warehouse `{self.warehouse_name}` at: ", f"https://{self.hostname}/sql/warehouses/{self.warehouse_id}/monitoring")
-        
+        monitoring_url = self.backend.monitoring_url(self)
+        if monitoring_url:
+            print(f"Monitor warehouse `{self.warehouse_name}` at: ", monitoring_url)
+
+        workload = self._get_workload()
+        self.run_id = f"{self.name}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self._stop_event.clear()
+        self.stop_reason = None
+        self._start_hooks()
+        try:
+            history_pdf = self._execute_run(workload)
+        except Exception as e:
+            self._emit("on_run_end", {"status": "failed", "error": str(e)})
+            raise
+        finally:
+            self._stop_hooks()
+        if self._stop_event.is_set():
+            print(f"Benchmark stopped early on {self.warehouse_name}: {self.stop_reason}")
+        else:
+            print(f"Benchmark completed on {self.warehouse_name}")
+        return history_pdf
+
+    def _execute_run(self, workload):
+        """Runs the warm-up and the measured workload, and returns the joined results.
+
+        If the run fails or is interrupted, the client metrics collected so far are still
+        stored and the run is marked failed in the run store.
+        """
+        # A new recorder per run, so frames returned by earlier runs stay valid
+        self._client_stored = False
+        self.metrics_recorder = MetricsRecorder(
+            hostname=self.hostname,
+            http_path=self.http_path,
+            warehouse_name=self.warehouse_name,
+            concurrency=self.concurrency,
+        )
+        self._emit(
+            "on_run_start",
+            {"name": self.name, "warehouse_name": self.warehouse_name, "concurrency": self.concurrency},
+        )
+        try:
+            return self._execute_workload(workload)
+        except BaseException as e:
+            if self.run_store:
+                self._store_failed_run(e)
+            raise
+
+    def _execute_workload(self, workload):
+        """Runs the warm-up and the measured workload, storing the run as it goes."""
+        if self.warmup_count:
+            self._execute_warmup(workload)
+
         start_ts_ms = int(time.time() * 1000)
         start_dt = datetime.datetime.fromtimestamp(start_ts_ms/1000).strftime('%Y-%m-%d %H:%M:%S')
+        if self.run_store:
+            self.run_store.update_run(
+                self.run_id,
+                name=self.name,
+                hostname=self.hostname,
+                warehouse_id=self.warehouse_id,
+                warehouse_name=self.warehouse_name,
+                concurrency=self.concurrency,
+                query_repeat_count=self.query_repeat_count,
+                start_time=start_dt,
+                status="running",
+            )
+
+        metrics = self._execute_queries(workload, self.concurrency)
+        num_failed = sum(1 for row in metrics if row["error"] is not None)
+        if num_failed:
+            logging.warning(f"{num_failed} of {len(metrics)} queries failed, see the `error` column of the results.")
 
-        if self.query_file_dir is not None:
-            logging.info("Loading query files from directory.")
-            metrics = self._execute_queries_from_dir(self.query_file_dir, self.params_path)
-        elif self.query_file is not None:
-            logging.info("Loading query file.")
-            metrics = self._execute_queries_from_file(self.query_file, self.params_path)
-        elif self.query is not None:
-            logging.info("Executing single query.")
-            metrics = self._execute_queries_from_query(self.query, self.params_path)
+        end_ts_ms = int(time.time() * 1000)
+        status = "stopped" if self._stop_event.is_set() else "completed"
+        if self.run_store:
+            # Stored before the history is fetched, so a failing history request doesn't lose them.
+            # Warm-up results are kept in the store, tagged, but left out of the results.
+            self.run_store.append(self.run_id, "client", self.metrics_recorder.to_pandas())
+            self._client_stored = True
+
+        history_pdf = self._clean_query_history(self.warehouse_id, start_ts_ms, end_ts_ms, metrics)
+        if self.run_store:
+            self.run_store.append(self.run_id, "history", history_pdf)
+            self.run_store.update_run(
+                self.run_id,
+                end_time=datetime.datetime.fromtimestamp(end_ts_ms/1000).strftime('%Y-%m-%d %H:%M:%S'),
+                num_queries=len(metrics),
+                num_failed=num_failed,
+                num_history_rows=len(history_pdf),
+                status=status,
+            )
+        if self.results_table:
+            export_metrics_to_delta(history_pdf, self.results_table, self.run_id)
+        self._emit("on_run_end", {"status": status, "num_queries": len(metrics), "num_failed": num_failed})
+        return history_pdf
+
+    def _store_failed_run(self, error):
+        """Keeps the client metrics collected before a run failed or was interrupted, and marks it failed."""
+        if not self._client_stored:
+            self.run_store.append(self.run_id, "client", self.metrics_recorder.to_pandas())
+        self.run_store.update_run(
+            self.run_id,
+            end_time=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            num_queries=len(self.metrics_recorder),
+            status="failed",
+            error=str(error) or type(error).__name__,
+        )
+
+    def sweepConcurrency(self, levels=None, max_concurrency=64, min_scaling=0.2, max_latency_growth=1.5):
+        """Runs the workload at increasing concurrency levels and finds where the warehouse saturates.
+
+        Parameters:
+        levels (list): The concurrency levels to run, e.g. [1, 2, 4, 8]. Defaults to powers
+            of two up to `max_concurrency`.
+        min_scaling, max_latency_growth: thresholds of the knee detection, see
+            `stats.find_saturation_knee`.
+
+        Returns:
+        DataFrame: One row per level with throughput and latency percentiles. The `knee`
+            column marks the last level before throughput flattens and p99 latency shoots
+            up. The knee level is also stored in `saturation_knee`, and the results of
+            each level's run in `sweep_results`.
+        """
+        if levels is None:
+            levels = [2 ** i for i in range(int(math.log2(max_concurrency)) + 1)]
+        original_concurrency = self.concurrency
+        self.resetLatencySummary()
+        self.sweep_results = {}
+        try:
+            for level in levels:
+                print(f"Running concurrency sweep level {level}")
+                self.setConcurrency(level)
+                self.sweep_results[level] = self.execute()
+        finally:
+            self.setConcurrency(original_concurrency)
+
+        summary_pdf = pd.DataFrame(
+            [dict(concurrency=level, **self.latency_recorder.overall(concurrency=level)) for level in levels]
+        )
+        self.saturation_knee = find_saturation_knee(
+            levels,
+            summary_pdf["throughput_qps"],
+            summary_pdf["p99"],
+            min_scaling=min_scaling,
+            max_latency_growth=max_latency_growth,
+        )
+        summary_pdf["knee"] = summary_pdf["concurrency"] == self.saturation_knee
+        if self.saturation_knee is None:
+            print("No saturation knee found; try higher concurrency levels.")
         else:
-            raise ValueError("No query specified.")
+            print(f"Throughput saturates above concurrency {self.saturation_knee} on {self.warehouse_name}")
+        return summary_pdf
 
-        end_ts_ms = int(time.time() * 1000)
+    def runMatrix(self, warehouse_configs, concurrent=False, stop_warehouses=True):
+        """Runs this benchmark on one new warehouse per config, e.g. sizes x photon x serverless.
 
-        history_pdf = self._clean_query_history(self.warehouse_id, start_ts_ms, end_ts_ms)
-        print(f"Benchmark completed on {self.warehouse_name}")
-        return history_pdf
+        The warehouses are provisioned in parallel, so the whole matrix waits through a single
+        startup time. See `matrix.run_matrix` for the parameters. The benchmark of each
+        config is kept in `matrix_benchmarks`, keyed by the config's index. Each of them has
+        its own live progress and SLOs, and can be stopped on its own with `stopRun()`.
+
+        Returns:
+        DataFrame: The combined results of every warehouse.
+        """
+        return run_matrix(self, warehouse_configs, concurrent=concurrent, stop_warehouses=stop_warehouses)
+
+    def _workload_warm_statement(self, table, queries):
+        """Returns the CACHE SELECT of only the columns and partitions the workload reads from a table."""
+        table_queries = [query for query in queries if references_table(query, table)]
+        if not table_queries:
+            return None
+        columns, _ = self.sql_warehouse.fetch_all(f"SELECT * FROM {table} LIMIT 0")
+        detail_columns, detail_rows = self.sql_warehouse.fetch_all(f"DESCRIBE DETAIL {table}")
+        detail = dict(zip(detail_columns, detail_rows[0])) if detail_rows else {}
+        partition_columns = list(detail.get("partitionColumns") or [])
+        return warm_statement(
+            table,
+            columns=touched_columns(table_queries, columns),
+            where=partition_filter(table_queries, partition_columns, table),
+        )
+
+    @staticmethod
+    def _warm_result(table, statement):
+        return {"table": table, "statement": statement, "elapsed_time": None, "statement_id": None, "error": None}
+
+    def _warm_table(self, table, statement):
+        """Runs one table's CACHE SELECT and returns its timing."""
+        result = self._warm_result(table, statement)
+        try:
+            metrics = self._execute_single_query(statement)
+            result["elapsed_time"] = metrics["elapsed_time"]
+            result["statement_id"] = metrics["statement_id"]
+            print(f"{metrics['elapsed_time']:0.3f}s Pre-warmed {table}")
+        except Exception as e:
+            logging.error(f"Failed to pre-warm {table}: {e}")
+            result["error"] = str(e)
+        finally:
+            self.sql_warehouse.release_connection()
+        return result
+
+    def preWarmTables(self, tables, concurrency=None, workload_only=False):
+        """Delta caches the tables before running a benchmark test.
+
+        Parameters:
+        tables (list): The tables to cache.
+        concurrency (int): How many tables are cached at the same time. Defaults to the
+            benchmark's concurrency.
+        workload_only (bool): Only cache the columns and partitions that the workload's
+            queries read, instead of every table in full. Tables the workload doesn't
+            reference are skipped. Partitions are narrowed down by literal predicates on
+            the partition columns.
 
-    def preWarmTables(self, tables):
-        """Delta caches the table before running a benchmark test."""
-        assert self.http_path is not None, (
+        Returns:
+        DataFrame: One row per table with the statement run, its elapsed time, statement id,
+            the bytes it read according to the query history, and any error.
+        """
+        assert self.http_path is not None or not isinstance(self.backend, DatabricksSQLBackend), (
             "No running warehouse. "
             "You can launch a new warehouse by calling `.setWarehouseConfig()`."
         )
@@ -421,15 +1270,53 @@ class Benchmark:
             self.catalog is not None
         ), "No catalog provided. You can add a catalog by calling `.setCatalog()`."
         
-        self.sql_warehouse = self._get_thread_local_connection()
+        if not self.sql_warehouse:
+            self.sql_warehouse = self._get_thread_local_connection()
         
         self._set_default_catalog()
         self._set_default_schema()
         print(f"Pre-warming tables in {self.catalog}.{self.schema} on {self.warehouse_name}")
-        for table in tables:
-            query = f"CACHE SELECT * FROM {table}"
-            self._execute_single_query(query)
 
+        results = {}
+        if workload_only:
+            queries = [bind_params(query, param) for query, _, param in self._get_workload()]
+            statements = {}
+            for table in tables:
+                try:
+                    statement = self._workload_warm_statement(table, queries)
+                except Exception as e:
+                    # A table that can't be described fails on its own, like a failing CACHE SELECT
+                    logging.error(f"Failed to pre-warm {table}: {e}")
+                    results[table] = dict(self._warm_result(table, None), error=str(e))
+                    continue
+                finally:
+                    self.sql_warehouse.release_connection()
+                if statement is None:
+                    print(f"Skipping {table}: not read by the workload")
+                else:
+                    statements[table] = statement
+        else:
+            statements = {table: warm_statement(table) for table in tables}
+
+        start_ts_ms = int(time.time() * 1000)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency or self.concurrency)) as executor:
+            results.update(zip(statements.keys(), executor.map(self._warm_table, statements.keys(), statements.values())))
+        end_ts_ms = int(time.time() * 1000)
+
+        warm_pdf = pd.DataFrame(
+            [results[table] for table in dict.fromkeys(tables) if table in results],
+            columns=["table", "statement", "elapsed_time", "statement_id", "error"],
+        )
+        warm_pdf["read_bytes"] = None
+        if warm_pdf["statement_id"].notna().any():
+            try:
+                history = self.get_query_history(self.warehouse_id, start_ts_ms, end_ts_ms)
+                read_bytes = {q["query_id"]: q.get("metrics", {}).get("read_bytes") for q in history}
+                warm_pdf["read_bytes"] = warm_pdf["statement_id"].map(read_bytes)
+            except Exception as e:
+                # Timings are still useful without the bytes read
+                logging.warning(f"Could not get bytes read from the query history: {e}")
+        return warm_pdf
 
     def __str__(self):
         object_str = f"""
@@ -442,6 +1329,9 @@ class Benchmark:
     query_file_dir={self.query_file_dir}
     concurrency={self.concurrency}
     query_repeat_count={self.query_repeat_count}
+    connection_mode={self.connection_mode}
+    scheduler={self.scheduler}
+    engine={self.engine}
     hostname={self.hostname}
     warehouse_http_path={self.http_path}
     sql_warehouse={self.sql_warehouse}
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+
+
+class PooledConnection:
+    """A connection managed by a `ConnectionPool`, with usage bookkeeping."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.last_checked_at = self.created_at
+        self.query_count = 0
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_used_at
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception as e:
+            logging.warning(f"Failed to close pooled connection: {e}")
+
+
+class ConnectionPool:
+    """A bounded pool of Databricks SQL connections.
+
+    Connections are created lazily by `connection_factory` up to `max_size`.
+    Idle connections are evicted after `max_idle_time` seconds and are
+    health-checked before reuse when they have not been checked for
+    `health_check_interval` seconds.
+
+    Workers can either borrow a connection per query with `acquire()`/`release()`,
+    or pin one to the calling thread with `lease()` so the same warm session is
+    reused for every query that worker runs.
+    """
+
+    def __init__(
+        self,
+        connection_factory,
+        max_size=8,
+        max_idle_time=300,
+        health_check_interval=30,
+        health_check_query="SELECT 1",
+        acquire_timeout=None,
+    ):
+        assert int(max_size) > 0, "Connection pool size must be > 0."
+        self._connection_factory = connection_factory
+        self.max_size = int(max_size)
+        self.max_idle_time = max_idle_time
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+        self.acquire_timeout = acquire_timeout
+        self._idle = []
+        self._leases = {}
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _is_healthy(self, pooled):
+        """Runs a cheap query to verify that the session is still usable."""
+        if (
+            self.health_check_interval is None
+            or time.monotonic() - pooled.last_checked_at < self.health_check_interval
+        ):
+            return True
+        try:
+            cursor = pooled.connection.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.close()
+        except Exception as e:
+            logging.info(f"Discarding unhealthy pooled connection: {e}")
+            return False
+        pooled.last_checked_at = time.monotonic()
+        return True
+
+    def _discard(self, pooled):
+        """Closes a connection and frees its slot. Caller must hold the lock."""
+        self._size -= 1
+        pooled.close()
+        self._condition.notify()
+
+    def _reclaim_dead_leases(self):
+        """Returns connections leased by threads that have exited. Caller must hold the lock."""
+        for thread in [t for t in self._leases if not t.is_alive()]:
+            self._idle.append(self._leases.pop(thread))
+
+    def evict_idle(self):
+        """Closes idle connections that have exceeded `max_idle_time`."""
+        with self._condition:
+            self._evict_idle()
+
+    def _evict_idle(self):
+        if self.max_idle_time is None:
+            return
+        expired = [p for p in self._idle if p.idle_seconds() > self.max_idle_time]
+        for pooled in expired:
+            self._idle.remove(pooled)
+            self._discard(pooled)
+
+    def acquire(self):
+        """Borrows a connection from the pool, creating one if there is room."""
+        deadline = (
+            time.monotonic() + self.acquire_timeout
+            if self.acquire_timeout is not None
+            else None
+        )
+        with self._condition:
+            while True:
+                assert not self._closed, "Connection pool is closed."
+                self._reclaim_dead_leases()
+                self._evict_idle()
+                while self._idle:
+                    # Most recently used first to keep the warmest sessions busy
+                    pooled = self._idle.pop()
+                    if self._is_healthy(pooled):
+                        return pooled
+                    self._discard(pooled)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(
+                        f"Timed out waiting for a connection from a pool of size {self.max_size}."
+                    )
+                self._condition.wait(remaining if remaining is not None else 1.0)
+
+        # Open the connection outside of the lock so other workers aren't blocked
+        try:
+            return PooledConnection(self._connection_factory())
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, pooled, discard=False):
+        """Returns a borrowed connection to the pool."""
+        with self._condition:
+            pooled.last_used_at = time.monotonic()
+            if self._closed:
+                pooled.close()
+            elif discard or self._size > self.max_size:
+                self._discard(pooled)
+            else:
+                self._idle.append(pooled)
+                self._condition.notify()
+
+    def resize(self, max_size):
+        """Changes how many connections the pool may hold.
+
+        Growing wakes up workers waiting for a connection. Shrinking closes idle
+        connections beyond the new size; leased ones are closed as they are returned.
+        """
+        assert int(max_size) > 0, "Connection pool size must be > 0."
+        with self._condition:
+            self.max_size = int(max_size)
+            while self._idle and self._size > self.max_size:
+                self._discard(self._idle.pop(0))
+            self._condition.notify_all()
+
+    def lease(self):
+        """Returns the connection pinned to the calling thread, acquiring one if needed."""
+        thread = threading.current_thread()
+        with self._condition:
+            pooled = self._leases.get(thread)
+        if pooled is None:
+            pooled = self.acquire()
+            with self._condition:
+                self._leases[thread] = pooled
+        return pooled
+
+    def end_lease(self, discard=False):
+        """Returns the calling thread's leased connection to the pool."""
+        thread = threading.current_thread()
+        with self._condition:
+            pooled = self._leases.pop(thread, None)
+        if pooled is not None:
+            self.release(pooled, discard=discard)
+
+    def close(self):
+        """Closes every connection owned by the pool."""
+        with self._condition:
+            self._closed = True
+            pooled_connections = self._idle + list(self._leases.values())
+            self._idle = []
+            self._leases = {}
+            self._size = 0
+            self._condition.notify_all()
+        for pooled in pooled_connections:
+            pooled.close()
+
+    def stats(self):
+        """Returns a snapshot of the pool's utilization."""
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "leased": len(self._leases),
+                "max_size": self.max_size,
+            }
+
+    def __str__(self):
+        return f"ConnectionPool({self.stats()})"
@@ -0,0 +1,98 @@
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from beaker.spark_fixture import get_spark_session
+
+
+_BACKENDS = ["process", "spark"]
+
+
+def shard_queries(queries, num_shards):
+    """Splits a workload round-robin into `num_shards` shards of near-equal size."""
+    return [queries[i::num_shards] for i in range(num_shards)]
+
+
+def run_shard(worker_config, shard, start_at):
+    """Runs one shard of a workload and returns its metrics.
+
+    `shard` is a list of (workload index, query) pairs, and each metrics dict is returned
+    with the workload index of its query. A shard can run fewer queries than it was given,
+    e.g. when its arrival schedule ends first.
+
+    Every worker waits until the shared wall-clock time `start_at` so that all shards
+    start loading the warehouse at the same moment.
+    """
+    # Imported here because the benchmark module imports this one
+    from beaker.benchmark import Benchmark
+
+    benchmark = Benchmark(**worker_config["kwargs"])
+    for attribute, value in worker_config["attributes"].items():
+        setattr(benchmark, attribute, value)
+    benchmark.sql_warehouse = benchmark._create_dbc()
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    else:
+        logging.warning(f"Worker started {-delay:0.3f}s after the shared start time.")
+    indices = [index for index, _ in shard]
+    metrics_list = benchmark._execute_queries([query for _, query in shard], benchmark.concurrency)
+    # Schedulers return the metrics of a prefix of the shard, in order. Rows are views into
+    # the worker's metrics recorder, so send back plain dicts
+    return [(index, dict(metrics)) for index, metrics in zip(indices, metrics_list)]
+
+
+def merge_shard_metrics(shard_metrics):
+    """Merges the (workload index, metrics) pairs of every shard into workload order."""
+    pairs = sorted(itertools.chain.from_iterable(shard_metrics), key=lambda pair: pair[0])
+    return [metrics for _, metrics in pairs]
+
+
+def run_distributed(worker_configs, queries, backend="process", start_delay=10):
+    """Shards a workload across local processes or Spark tasks and merges their metrics.
+
+    Parameters:
+    worker_configs (list): One picklable Benchmark config per worker.
+    queries (list): The full workload of (query, id, param) tuples.
+    backend (str): "process" runs the shards in local processes, "spark" runs each shard
+        as a Spark task. Spark tasks need Beaker installed on the cluster and enough free
+        task slots to run every shard at the same time.
+    start_delay (int): Seconds from now at which every worker starts executing. It must be
+        long enough for all workers to be scheduled and connected.
+
+    Returns:
+    list: The metrics of every query that ran, in the order of `queries`.
+    """
+    assert backend in _BACKENDS, (
+        "Invalid distributed backend. "
+        f"Allowed backends include: {_BACKENDS}."
+    )
+    num_workers = len(worker_configs)
+    shards = shard_queries(list(enumerate(queries)), num_workers)
+    start_at = time.time() + start_delay
+    print(f"Executing {len(queries)} queries across {num_workers} {backend} workers")
+
+    if backend == "spark":
+        spark = get_spark_session()
+        tasks = list(zip(worker_configs, shards))
+        shard_metrics = (
+            spark.sparkContext.parallelize(tasks, num_workers)
+            .map(lambda task: run_shard(task[0], task[1], start_at))
+            .collect()
+        )
+    else:
+        # Use spawn so workers don't inherit the driver's threads and open connections
+        with ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(run_shard, worker_config, shard, start_at)
+                for worker_config, shard in zip(worker_configs, shards)
+            ]
+        shard_metrics = [future.result() for future in futures]
+
+    # Undo the round-robin sharding so metrics line up with the input workload
+    return merge_shard_metrics(shard_metrics)
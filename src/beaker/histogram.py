@@ -0,0 +1,162 @@
+import json
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """A constant-memory, mergeable latency histogram in the style of HdrHistogram.
+
+    Latencies are recorded in microseconds into log-linear buckets: every power-of-two
+    range is split into equal sub-buckets, so every recorded value is kept to within
+    `significant_digits` decimal digits of precision regardless of its magnitude.
+    Histograms with the same precision can be merged by adding their bucket counts.
+    """
+
+    def __init__(self, significant_digits=2):
+        assert 1 <= significant_digits <= 5, "significant_digits must be between 1 and 5."
+        self.significant_digits = significant_digits
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._sub_bucket_half = self._sub_bucket_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self._sub_bucket_bits)
+        return shift * self._sub_bucket_half + (value >> shift)
+
+    def _value_range(self, index):
+        """Returns the lowest and highest microsecond values that map to a bucket."""
+        if index < self._sub_bucket_count:
+            return index, index
+        shift = index // self._sub_bucket_half - 1
+        sub_bucket = index - shift * self._sub_bucket_half
+        return sub_bucket << shift, ((sub_bucket + 1) << shift) - 1
+
+    def record(self, seconds):
+        """Records a latency given in seconds."""
+        value = max(0, int(round(seconds * 1_000_000)))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Adds the recorded values of another histogram into this one."""
+        assert other.significant_digits == self.significant_digits, (
+            "Only histograms with the same precision can be merged."
+        )
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percentile):
+        """Returns the latency in seconds at or below which `percentile`% of values fall."""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = self._value_range(index)
+                value = min(max((low + high) / 2, self.min), self.max)
+                return value / 1_000_000
+        return self.max / 1_000_000
+
+    def mean(self):
+        return self.total / self.count / 1_000_000 if self.count else None
+
+
+class LatencyRecorder:
+    """Thread-safe latency histograms keyed by query id, param and concurrency level."""
+
+    PERCENTILES = [50, 90, 95, 99, 99.9]
+
+    def __init__(self, significant_digits=2):
+        self.significant_digits = significant_digits
+        self._histograms = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _key(self, id, param, concurrency):
+        # Params are dicts, so serialize them into a hashable key
+        param_key = json.dumps(param, sort_keys=True, default=str) if param else None
+        return (id, param_key, concurrency)
+
+    def record(self, id, param, concurrency, seconds, end_time=None):
+        """Records one query execution that took `seconds` and finished at `end_time`."""
+        end_time = time.time() if end_time is None else end_time
+        key = self._key(id, param, concurrency)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram(self.significant_digits)
+            histogram.record(seconds)
+            start_time = end_time - seconds
+            first_start, last_end = self._windows.get(key, (start_time, end_time))
+            self._windows[key] = (min(first_start, start_time), max(last_end, end_time))
+
+    def merge(self, other):
+        """Adds the histograms of another recorder, e.g. one from a distributed worker."""
+        with self._lock:
+            for key, histogram in other._histograms.items():
+                if key in self._histograms:
+                    self._histograms[key].merge(histogram)
+                else:
+                    self._histograms[key] = LatencyHistogram(self.significant_digits).merge(histogram)
+                first_start, last_end = other._windows[key]
+                if key in self._windows:
+                    first_start = min(first_start, self._windows[key][0])
+                    last_end = max(last_end, self._windows[key][1])
+                self._windows[key] = (first_start, last_end)
+        return self
+
+    def _summarize(self, histogram, first_start, last_end):
+        summary = {"count": histogram.count, "mean": histogram.mean()}
+        for percentile in self.PERCENTILES:
+            summary[f"p{percentile:g}"] = histogram.percentile(percentile)
+        summary["max"] = histogram.max / 1_000_000 if histogram.count else None
+        duration = last_end - first_start
+        summary["throughput_qps"] = histogram.count / duration if duration > 0 else None
+        return summary
+
+    def summary(self):
+        """Returns one summary row (a dict) per query id, param and concurrency level."""
+        with self._lock:
+            items = [(key, self._windows[key], histogram) for key, histogram in self._histograms.items()]
+            rows = []
+            for (id, param_key, concurrency), (first_start, last_end), histogram in items:
+                row = {"id": id, "param": param_key, "concurrency": concurrency}
+                row.update(self._summarize(histogram, first_start, last_end))
+                rows.append(row)
+            return rows
+
+    def overall(self, concurrency=None):
+        """Returns a single summary across every recorded query, optionally at one concurrency level."""
+        with self._lock:
+            keys = [key for key in self._histograms if concurrency is None or key[2] == concurrency]
+            histogram = LatencyHistogram(self.significant_digits)
+            for key in keys:
+                histogram.merge(self._histograms[key])
+            if not keys:
+                return self._summarize(histogram, 0, 0)
+            first_start = min(self._windows[key][0] for key in keys)
+            last_end = max(self._windows[key][1] for key in keys)
+            return self._summarize(histogram, first_start, last_end)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._windows = {}
@@ -0,0 +1,234 @@
+import json
+import logging
+import queue
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from beaker.histogram import LatencyHistogram
+
+
+class BenchmarkHook:
+    """Base class of instrumentation hooks. Override the events you need.
+
+    Every event receives a dict payload that always has `event`, `time` (epoch seconds)
+    and `run_id`. Hooks are called on a dispatcher thread, never on the thread that
+    measures a query, so a slow hook can't inflate measured latencies.
+
+    on_run_start: the run's name, warehouse_name and concurrency.
+    on_query_submit: the id and param of a query about to run, and whether it's a warm-up.
+    on_query_complete: the client metrics of a finished query.
+    on_error: the id, param and error of a query that failed.
+    on_run_end: the run's status, number of queries and number of failed queries.
+    """
+
+    def on_run_start(self, event):
+        pass
+
+    def on_query_submit(self, event):
+        pass
+
+    def on_query_complete(self, event):
+        pass
+
+    def on_error(self, event):
+        pass
+
+    def on_run_end(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class HookDispatcher:
+    """Delivers events to hooks from a background thread through a bounded queue.
+
+    `emit` never blocks: when the queue is full the event is dropped and counted in
+    `dropped`, so instrumentation can't slow down the benchmark.
+    """
+
+    _EVENTS = ["on_run_start", "on_query_submit", "on_query_complete", "on_error", "on_run_end"]
+    _STOP = object()
+
+    def __init__(self, hooks, max_queue_size=10000):
+        self.hooks = list(hooks)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="beaker-hooks", daemon=True)
+        self._thread.start()
+
+    def emit(self, event_name, payload):
+        assert event_name in self._EVENTS, (
+            f"Invalid hook event '{event_name}'. "
+            f"Allowed events include: {self._EVENTS}."
+        )
+        try:
+            self._queue.put_nowait((event_name, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            event_name, payload = item
+            for hook in self.hooks:
+                try:
+                    getattr(hook, event_name)(payload)
+                except Exception as e:
+                    logging.error(f"Hook {type(hook).__name__}.{event_name} failed: {e}")
+
+    def close(self, timeout=30):
+        """Delivers the queued events, then stops the dispatcher thread."""
+        # Blocking here is fine: the run is over and every event should be delivered
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self.dropped:
+            logging.warning(f"{self.dropped} hook events were dropped because the hook queue was full.")
+
+
+class JSONLinesSink(BenchmarkHook):
+    """Appends every event as one JSON object per line to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, event):
+        self._file.write(json.dumps(event, default=str) + "\n")
+
+    on_run_start = on_query_submit = on_query_complete = on_error = _write
+
+    def on_run_end(self, event):
+        self._write(event)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class InMemorySink(BenchmarkHook):
+    """Aggregates events in memory: counts, errors and a latency histogram per query id.
+
+    The most recent `max_events` events are kept in `events` as well.
+    """
+
+    def __init__(self, max_events=1000):
+        self.events = deque(maxlen=max_events)
+        self.counts = {}
+        self.errors = {}
+        self.latencies = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def _count(self, event):
+        with self._lock:
+            self.events.append(event)
+            self.counts[event["event"]] = self.counts.get(event["event"], 0) + 1
+
+    def on_run_start(self, event):
+        self._count(event)
+
+    def on_query_submit(self, event):
+        self._count(event)
+        with self._lock:
+            self.in_flight += 1
+
+    def on_query_complete(self, event):
+        self._count(event)
+        with self._lock:
+            # Distributed runs only report completions, so don't go below zero
+            self.in_flight = max(0, self.in_flight - 1)
+            histogram = self.latencies.setdefault(event["id"], LatencyHistogram())
+            histogram.record(float(event["elapsed_time"]))
+
+    def on_error(self, event):
+        self._count(event)
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.errors[event["id"]] = self.errors.get(event["id"], 0) + 1
+
+    def on_run_end(self, event):
+        self._count(event)
+
+    def summary(self):
+        """Returns one dict per query id with its count, errors and latency percentiles."""
+        with self._lock:
+            ids = list(dict.fromkeys(list(self.latencies) + list(self.errors)))
+            rows = []
+            for id in ids:
+                histogram = self.latencies.get(id, LatencyHistogram())
+                rows.append({
+                    "id": id,
+                    "count": histogram.count,
+                    "errors": self.errors.get(id, 0),
+                    "mean": histogram.mean(),
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                })
+            return rows
+
+
+class PrometheusSink(InMemorySink):
+    """Serves the in-memory aggregates in the Prometheus text format at http://host:port/metrics."""
+
+    def __init__(self, port=9464, host="127.0.0.1"):
+        super().__init__(max_events=0)
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes would otherwise be printed to stderr
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="beaker-prometheus", daemon=True)
+        self._thread.start()
+
+    def _label(self, id):
+        return str(id).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def render(self):
+        """Returns the current metrics in the Prometheus text exposition format."""
+        rows = self.summary()
+        with self._lock:
+            in_flight = self.in_flight
+        lines = [
+            "# HELP beaker_queries_in_flight Queries submitted but not finished.",
+            "# TYPE beaker_queries_in_flight gauge",
+            f"beaker_queries_in_flight {in_flight}",
+            "# HELP beaker_queries_total Finished queries.",
+            "# TYPE beaker_queries_total counter",
+        ]
+        lines += [f'beaker_queries_total{{id="{self._label(row["id"])}"}} {row["count"]}' for row in rows]
+        lines += ["# HELP beaker_query_errors_total Failed queries.", "# TYPE beaker_query_errors_total counter"]
+        lines += [f'beaker_query_errors_total{{id="{self._label(row["id"])}"}} {row["errors"]}' for row in rows]
+        lines += ["# HELP beaker_query_latency_seconds Client-side query latency.", "# TYPE beaker_query_latency_seconds summary"]
+        for row in rows:
+            if not row["count"]:
+                continue
+            for quantile, column in [("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")]:
+                lines.append(
+                    f'beaker_query_latency_seconds{{id="{self._label(row["id"])}",quantile="{quantile}"}} {row[column]}'
+                )
+            lines.append(f'beaker_query_latency_seconds_count{{id="{self._label(row["id"])}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,151 @@
+import copy
+import datetime
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from beaker.backends import DatabricksSQLBackend
+from beaker.histogram import LatencyRecorder
+from beaker.progress import LiveProgress
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+
+def _matrix_config(config, index):
+    """Gives unnamed configs a unique name, since warehouses are created at the same moment."""
+    config = dict(config)
+    if "name" not in config:
+        config["name"] = f"🧪 Beaker Benchmark Matrix Warehouse {index} {datetime.datetime.now()}"
+    return config
+
+
+def provision_warehouses(benchmark, warehouse_configs):
+    """Creates and starts one warehouse per config in parallel.
+
+    All warehouses are created first (or reused from the benchmark's warehouse registry)
+    and then started concurrently, so the whole matrix waits through a single startup time
+    instead of one per config.
+
+    Returns:
+    tuple: Two lists with one entry per config, in order: the ids of the created
+        warehouses, and the ids of those that started. Failed entries are None. Created
+        but unstarted warehouses are still returned so the caller can stop them.
+    """
+    warehouse_utils = SQLWarehouseUtils()
+    warehouse_utils.setToken(token=benchmark.token)
+    warehouse_utils.setHostname(hostname=benchmark.hostname)
+
+    warehouse_ids = []
+    for index, config in enumerate(warehouse_configs):
+        logging.info(f"Creating new warehouse with config: {config}")
+        try:
+            warehouse_id = warehouse_utils.find_registered_warehouse(config, benchmark.warehouse_registry)
+            if warehouse_id is None:
+                warehouse_id = warehouse_utils.create_warehouse(_matrix_config(config, index))
+                if benchmark.warehouse_registry is not None:
+                    benchmark.warehouse_registry.register(benchmark.hostname, config, warehouse_id)
+            warehouse_ids.append(warehouse_id)
+        except Exception as e:
+            logging.error(f"Failed to create warehouse for config {config}: {e}")
+            warehouse_ids.append(None)
+
+    def wait(warehouse_id):
+        if warehouse_id is None:
+            return None
+        try:
+            warehouse_utils.wait_for_warehouse(warehouse_id)
+            return warehouse_id
+        except Exception as e:
+            logging.error(f"Warehouse {warehouse_id} failed to start: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(warehouse_ids))) as executor:
+        started = list(executor.map(wait, warehouse_ids))
+    return warehouse_ids, started
+
+
+def _benchmark_on_warehouse(benchmark, warehouse_id):
+    """Copies a benchmark so it runs the same workload against another warehouse."""
+    clone = copy.copy(benchmark)
+    clone.warehouse_id = warehouse_id
+    clone.http_path = f"/sql/1.0/warehouses/{warehouse_id}"
+    clone.warehouse_name = clone._get_warehouse_info()
+    clone.latency_recorder = LatencyRecorder()
+    # Each warehouse's run is stopped on its own, so an SLO breach on one doesn't stop the rest
+    clone._stop_event = threading.Event()
+    clone.stop_reason = None
+    clone._hook_dispatcher = None
+    # Live progress follows a single run, so every warehouse gets its own. Other hooks,
+    # such as sinks, are shared and receive the events of every warehouse.
+    clone.hooks = [
+        LiveProgress(
+            refresh_interval=hook.refresh_interval,
+            window=hook.window,
+            slo_p95=hook.slo_p95,
+            slo_error_rate=hook.slo_error_rate,
+            min_samples=hook.min_samples,
+            on_breach=clone.stopRun,
+        )
+        if isinstance(hook, LiveProgress) else hook
+        for hook in benchmark.hooks
+    ]
+    # Don't reuse the original's (thread-local) connection, which points at its own warehouse
+    clone.sql_warehouse = clone._create_dbc()
+    return clone
+
+
+def run_matrix(benchmark, warehouse_configs, concurrent=False, stop_warehouses=True):
+    """Runs the same benchmark workload on one new warehouse per config and combines the results.
+
+    Parameters:
+    benchmark (Benchmark): The benchmark whose workload and settings are run on every warehouse.
+    warehouse_configs (list): Warehouse configs in the format of `setWarehouseConfig`.
+    concurrent (bool): Run the workload on every warehouse at the same time instead of one
+        warehouse after another. Faster, but the warehouses then share the client's CPU and
+        network, which can skew client-side latencies.
+    stop_warehouses (bool): Stop every provisioned warehouse once the matrix is done.
+
+    Returns:
+    DataFrame: The results of every run, with the `config_index` and `warehouse_config` of
+        the warehouse each query ran on.
+    """
+    assert isinstance(benchmark.backend, DatabricksSQLBackend), (
+        "A warehouse matrix can only run on the Databricks SQL backend."
+    )
+    created_ids, started_ids = provision_warehouses(benchmark, warehouse_configs)
+    benchmark.matrix_benchmarks = {}
+
+    def run(index):
+        warehouse_id = started_ids[index]
+        if warehouse_id is None:
+            logging.warning(f"Skipping config {warehouse_configs[index]}: no running warehouse.")
+            return None
+        clone = _benchmark_on_warehouse(benchmark, warehouse_id)
+        benchmark.matrix_benchmarks[index] = clone
+        try:
+            result_pdf = clone.execute()
+        finally:
+            clone.sql_warehouse.close_connections()
+        result_pdf = result_pdf.copy()
+        result_pdf["config_index"] = index
+        result_pdf["warehouse_config"] = json.dumps(warehouse_configs[index], sort_keys=True)
+        return result_pdf
+
+    try:
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=max(1, len(warehouse_configs))) as executor:
+                results = list(executor.map(run, range(len(warehouse_configs))))
+        else:
+            results = [run(index) for index in range(len(warehouse_configs))]
+    finally:
+        if stop_warehouses:
+            for warehouse_id in created_ids:
+                if warehouse_id is not None:
+                    benchmark.stop_warehouse(warehouse_id)
+
+    results = [result_pdf for result_pdf in results if result_pdf is not None]
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
@@ -0,0 +1,238 @@
+import json
+import threading
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+
+class MetricsRow(Mapping):
+    """A read-only, dict-like view of one query's metrics in a `MetricsRecorder`."""
+
+    __slots__ = ("recorder", "index")
+
+    def __init__(self, recorder, index):
+        self.recorder = recorder
+        self.index = index
+
+    def __getitem__(self, column):
+        return self.recorder.value(self.index, column)
+
+    def __iter__(self):
+        return iter(self.recorder.columns())
+
+    def __len__(self):
+        return len(self.recorder.columns())
+
+    def __repr__(self):
+        return f"MetricsRow({dict(self)})"
+
+
+class MetricsRecorder:
+    """Records the client-side metrics of every query in compact, array-backed columns.
+
+    Durations and timestamps are float64 seconds and result sizes are int64, each in a
+    growable NumPy array. Query ids, query text and params are dictionary-encoded, so a
+    query that runs a million times stores its text once. Run-level constants, such as
+    the hostname and concurrency, are stored once per recorder rather than once per query.
+    Failed queries are recorded too, with their `error`.
+
+    `to_pandas()` and `to_arrow()` share the numeric arrays instead of copying them.
+    """
+
+    _TEXT_COLUMNS = ["id", "param", "query", "error"]
+    # end_time is the wall-clock time, in epoch seconds, at which the query finished
+    _FLOAT_COLUMNS = ["elapsed_time", "end_time"] + SQLWarehouseUtils._PHASES + ["fetch_mb_per_sec"]
+    _INT_COLUMNS = ["result_rows", "result_bytes"]
+    # Only recorded by open-loop runs
+    _OPEN_LOOP_COLUMNS = ["intended_start_time", "actual_start_time", "start_delay", "corrected_elapsed_time"]
+    _CONSTANTS = ["hostname", "http_path", "warehouse_name", "concurrency"]
+    # Missing integers are stored as -1, since result sizes can't be negative
+    _MISSING_INT = -1
+
+    def __init__(self, initial_capacity=1024, **constants):
+        self.constants = {name: constants.get(name) for name in self._CONSTANTS}
+        self._lock = threading.Lock()
+        self._size = 0
+        self._capacity = initial_capacity
+        self._open_loop = False
+        self._codes = {column: np.empty(initial_capacity, dtype=np.int32) for column in self._TEXT_COLUMNS}
+        # Per text column: the distinct values, and the code of each value's key
+        self._dictionaries = {column: [] for column in self._TEXT_COLUMNS}
+        self._dictionary_codes = {column: {} for column in self._TEXT_COLUMNS}
+        self._floats = {
+            column: np.empty(initial_capacity, dtype=np.float64)
+            for column in self._FLOAT_COLUMNS + self._OPEN_LOOP_COLUMNS
+        }
+        self._ints = {column: np.empty(initial_capacity, dtype=np.int64) for column in self._INT_COLUMNS}
+        self._warmup = np.empty(initial_capacity, dtype=np.bool_)
+        # Statement ids are unique per query, so dictionary encoding wouldn't save anything
+        self._statement_ids = []
+
+    def __len__(self):
+        return self._size
+
+    def columns(self):
+        """Returns the column names, in the order of `to_pandas()`."""
+        columns = (
+            ["id", "param", "hostname", "http_path", "warehouse_name", "concurrency", "query"]
+            + ["elapsed_time", "end_time", "statement_id", "warmup"]
+            + SQLWarehouseUtils._PHASES + self._INT_COLUMNS + ["fetch_mb_per_sec", "error"]
+        )
+        return columns + self._OPEN_LOOP_COLUMNS if self._open_loop else columns
+
+    def _grow(self):
+        # Growing allocates new arrays, so frames returned earlier keep sharing the old ones
+        self._capacity *= 2
+        for columns in [self._codes, self._floats, self._ints]:
+            for column, values in columns.items():
+                columns[column] = np.resize(values, self._capacity)
+        self._warmup = np.resize(self._warmup, self._capacity)
+
+    def _encode(self, column, value):
+        if value is None:
+            return -1
+        key = json.dumps(value, sort_keys=True, default=str) if column == "param" else value
+        codes = self._dictionary_codes[column]
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(self._dictionaries[column])
+            self._dictionaries[column].append(value)
+        return code
+
+    def record(self, **values):
+        """Appends one query's metrics and returns a `MetricsRow` view of them.
+
+        Unknown keys, such as run-level constants, are ignored. Missing metrics are left empty.
+        """
+        with self._lock:
+            if self._size == self._capacity:
+                self._grow()
+            index = self._size
+            for column in self._TEXT_COLUMNS:
+                self._codes[column][index] = self._encode(column, values.get(column))
+            for column in self._FLOAT_COLUMNS + self._OPEN_LOOP_COLUMNS:
+                value = values.get(column)
+                self._floats[column][index] = np.nan if value is None else value
+            if values.get("intended_start_time") is not None:
+                self._open_loop = True
+            for column in self._INT_COLUMNS:
+                value = values.get(column)
+                self._ints[column][index] = self._MISSING_INT if value is None else value
+            self._warmup[index] = bool(values.get("warmup"))
+            self._statement_ids.append(values.get("statement_id"))
+            self._size += 1
+        return MetricsRow(self, index)
+
+    def value(self, index, column):
+        """Returns a single metric of the query recorded at `index`."""
+        if column in self._codes:
+            code = self._codes[column][index]
+            return self._dictionaries[column][code] if code >= 0 else None
+        if column in self._floats:
+            value = float(self._floats[column][index])
+            return None if np.isnan(value) else value
+        if column in self._ints:
+            value = int(self._ints[column][index])
+            return None if value == self._MISSING_INT else value
+        if column == "warmup":
+            return bool(self._warmup[index])
+        if column == "statement_id":
+            return self._statement_ids[index]
+        if column in self.constants:
+            return self.constants[column]
+        raise KeyError(column)
+
+    def _snapshot(self):
+        with self._lock:
+            return self._size, dict(self._codes), dict(self._floats), dict(self._ints), self._warmup
+
+    def to_pandas(self, rows=None):
+        """Returns the recorded metrics as a DataFrame, one row per query.
+
+        Numeric columns share memory with the recorder. Text columns are categoricals over
+        the recorder's dictionaries, and params are the original dicts. `rows` selects and
+        orders a subset of rows by index, which copies them.
+        """
+        size, codes, floats, ints, warmup = self._snapshot()
+        take = slice(0, size) if rows is None else np.asarray(rows, dtype=np.int64)
+        num_rows = size if rows is None else len(take)
+
+        def constant(value):
+            return pd.Categorical.from_codes(np.zeros(num_rows, dtype=np.int8), categories=[value])
+
+        data = {}
+        for column in self.columns():
+            if column in ["id", "query", "error"]:
+                categories = pd.Index(self._dictionaries[column], dtype=object)
+                data[column] = pd.Categorical.from_codes(codes[column][:size][take], categories=categories)
+            elif column == "param":
+                params = np.empty(len(self._dictionaries["param"]) + 1, dtype=object)
+                params[:-1] = self._dictionaries["param"]
+                # Code -1 picks the trailing None
+                data[column] = params[codes["param"][:size][take]]
+            elif column == "concurrency":
+                data[column] = np.full(num_rows, self.constants["concurrency"] or 0, dtype=np.int64)
+            elif column in self.constants:
+                value = self.constants[column]
+                data[column] = constant(value) if value is not None else np.full(num_rows, None, dtype=object)
+            elif column in floats:
+                data[column] = floats[column][:size][take]
+            elif column in ints:
+                values = ints[column][:size][take]
+                data[column] = pd.arrays.IntegerArray(values, values == self._MISSING_INT)
+            elif column == "warmup":
+                data[column] = warmup[:size][take]
+            elif column == "statement_id":
+                data[column] = np.array(self._statement_ids[:size], dtype=object)[take]
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        """Returns the recorded metrics as a pyarrow Table, sharing the numeric buffers.
+
+        Text columns are dictionary arrays, and params are dictionary-encoded JSON strings.
+        """
+        # pyarrow is only needed by callers that export to Arrow
+        import pyarrow as pa
+
+        size, codes, floats, ints, warmup = self._snapshot()
+
+        def validity(missing):
+            if not missing.any():
+                return None
+            return pa.py_buffer(np.packbits(~missing, bitorder="little"))
+
+        def numeric(values, arrow_type, missing):
+            return pa.Array.from_buffers(arrow_type, size, [validity(missing), pa.py_buffer(values)])
+
+        def dictionary(indices, values):
+            return pa.DictionaryArray.from_arrays(numeric(indices, pa.int32(), indices < 0), pa.array(values, pa.string()))
+
+        def constant(value):
+            return dictionary(np.zeros(size, dtype=np.int32), [value])
+
+        arrays = {}
+        for column in self.columns():
+            if column in ["id", "query", "error"]:
+                arrays[column] = dictionary(codes[column][:size], [str(v) for v in self._dictionaries[column]])
+            elif column == "param":
+                params = [json.dumps(v, sort_keys=True, default=str) for v in self._dictionaries["param"]]
+                arrays[column] = dictionary(codes["param"][:size], params)
+            elif column == "concurrency":
+                arrays[column] = pa.array(np.full(size, self.constants["concurrency"] or 0, dtype=np.int64))
+            elif column in self.constants:
+                value = self.constants[column]
+                arrays[column] = constant(str(value)) if value is not None else pa.nulls(size, pa.string())
+            elif column in floats:
+                values = floats[column][:size]
+                arrays[column] = numeric(values, pa.float64(), np.isnan(values))
+            elif column in ints:
+                values = ints[column][:size]
+                arrays[column] = numeric(values, pa.int64(), values == self._MISSING_INT)
+            elif column == "warmup":
+                arrays[column] = pa.array(warmup[:size])
+            elif column == "statement_id":
+                arrays[column] = pa.array(self._statement_ids[:size], pa.string())
+        return pa.table(arrays)
@@ -0,0 +1,359 @@
+import contextlib
+import json
+import random
+import re
+import threading
+import time
+import types
+import uuid
+from unittest import mock
+from urllib.parse import urlparse
+
+import requests
+
+
+_DISTRIBUTIONS = ["constant", "uniform", "normal", "lognormal", "exponential"]
+
+
+def latency_sampler(spec, rng=None):
+    """Returns a function drawing latencies in seconds from a distribution spec.
+
+    `spec` is a number of seconds, or a dict such as:
+        {"distribution": "constant", "value": 0.1}
+        {"distribution": "uniform", "low": 0.05, "high": 0.2}
+        {"distribution": "normal", "mean": 0.1, "stddev": 0.02}
+        {"distribution": "lognormal", "median": 0.1, "sigma": 0.5}
+        {"distribution": "exponential", "mean": 0.1}
+    Negative draws are clipped to 0.
+    """
+    rng = rng or random.Random()
+    if isinstance(spec, (int, float)):
+        return lambda: float(spec)
+    spec = dict(spec)
+    distribution = spec.pop("distribution", "constant")
+    assert distribution in _DISTRIBUTIONS, (
+        f"Invalid latency distribution '{distribution}'. "
+        f"Allowed distributions include: {_DISTRIBUTIONS}."
+    )
+    if distribution == "constant":
+        draw = lambda: spec["value"]
+    elif distribution == "uniform":
+        draw = lambda: rng.uniform(spec["low"], spec["high"])
+    elif distribution == "normal":
+        draw = lambda: rng.gauss(spec["mean"], spec["stddev"])
+    elif distribution == "lognormal":
+        draw = lambda: rng.lognormvariate(0, spec["sigma"]) * spec["median"]
+    else:
+        draw = lambda: rng.expovariate(1 / spec["mean"])
+    return lambda: max(0.0, draw())
+
+
+class MockResponse:
+    """The parts of `requests.Response` that Beaker uses."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+
+class MockCursor:
+    """A cursor with the interface of the Databricks SQL connector's cursor."""
+
+    def __init__(self, workspace, connection):
+        self._workspace = workspace
+        self._connection = connection
+        self._rows = []
+        self._position = 0
+        self.query_id = None
+        self.description = None
+
+    def execute(self, operation, parameters=None):
+        self.query_id, self._rows = self._workspace.run_statement(
+            operation, parameters, warehouse_id=self._connection.warehouse_id
+        )
+        self._position = 0
+        self.description = [("id", "int"), ("value", "string")]
+        return self
+
+    def fetchmany(self, size=10000):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def fetchmany_arrow(self, size=10000):
+        # pyarrow is only needed by callers that fetch Arrow results
+        import pyarrow as pa
+
+        rows = self.fetchmany(size)
+        return pa.table({"id": [row[0] for row in rows], "value": [row[1] for row in rows]})
+
+    def close(self):
+        self._rows = []
+
+
+class MockConnection:
+    """A connection with the interface of `databricks.sql.connect(...)`."""
+
+    def __init__(self, workspace, server_hostname=None, http_path=None, **kwargs):
+        self._workspace = workspace
+        self.warehouse_id = http_path.split("/")[-1] if http_path else None
+        self.closed = False
+
+    def cursor(self):
+        return MockCursor(self._workspace, self)
+
+    def close(self):
+        self.closed = True
+
+
+class MockWorkspace:
+    """An in-memory stand-in for a Databricks workspace and its SQL warehouses.
+
+    Statements take a latency drawn from a configurable distribution and are recorded
+    into a query history, so complete benchmarks can run offline: the SQL connector,
+    the warehouses, query history, SCIM and Statement Execution REST endpoints, and
+    `WorkspaceClient(...).warehouses.start_and_wait` are all served from memory.
+
+    Parameters:
+    latency: The latency spec of every statement, see `latency_sampler`.
+    query_latencies (dict): Latency specs for statements matching a regex, e.g.
+        {"^USE ": 0}. The first matching pattern wins.
+    connect_latency: The latency spec of opening a connection.
+    startup_latency: The latency spec of starting a warehouse.
+    rows (int): Rows returned by every statement.
+    read_bytes (int): Bytes every statement reports reading in the query history.
+    page_size (int): Maximum query history entries per page.
+    seed (int): Seeds the latency distributions.
+    """
+
+    def __init__(
+        self,
+        latency=0.01,
+        query_latencies=None,
+        connect_latency=0,
+        startup_latency=0,
+        rows=1,
+        read_bytes=1024,
+        page_size=100,
+        seed=None,
+    ):
+        self.hostname = "mock.cloud.databricks.com"
+        self.user_id = "1000"
+        rng = random.Random(seed)
+        self._latency = latency_sampler(latency, rng)
+        self._query_latencies = [
+            (re.compile(pattern, re.IGNORECASE), latency_sampler(spec, rng))
+            for pattern, spec in (query_latencies or {}).items()
+        ]
+        self._connect_latency = latency_sampler(connect_latency, rng)
+        self._startup_latency = latency_sampler(startup_latency, rng)
+        self.rows = rows
+        self.read_bytes = read_bytes
+        self.page_size = page_size
+        self.history = []
+        self.warehouses = {}
+        self._statements = {}
+        self._page_tokens = {}
+        self._lock = threading.Lock()
+        self.warehouse_id = self._create_warehouse({"name": "Mock Warehouse"}, state="RUNNING")
+
+    @property
+    def http_path(self):
+        """The http path of the workspace's default, running warehouse."""
+        return f"/sql/1.0/warehouses/{self.warehouse_id}"
+
+    def _create_warehouse(self, config, state="STOPPED"):
+        warehouse_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self.warehouses[warehouse_id] = dict(config, id=warehouse_id, state=state)
+        return warehouse_id
+
+    def _statement_latency(self, statement):
+        for pattern, sampler in self._query_latencies:
+            if pattern.search(statement):
+                return sampler()
+        return self._latency()
+
+    def _record(self, statement, warehouse_id, start_time, latency):
+        statement_id = str(uuid.uuid4())
+        start_ms = int(start_time * 1000)
+        end_ms = int((start_time + latency) * 1000)
+        entry = {
+            "query_id": statement_id,
+            "query_text": statement,
+            "status": "FINISHED",
+            "warehouse_id": warehouse_id,
+            "user_id": self.user_id,
+            "query_start_time_ms": start_ms,
+            "execution_end_time_ms": end_ms,
+            "query_end_time_ms": end_ms,
+            "duration": end_ms - start_ms,
+            "is_final": True,
+            "statement_type": statement.strip().split(" ", 1)[0].upper(),
+            "metrics": {
+                "total_time_ms": end_ms - start_ms,
+                "execution_time_ms": end_ms - start_ms,
+                "read_bytes": self.read_bytes,
+                "rows_produced_count": self.rows,
+            },
+        }
+        with self._lock:
+            self.history.append(entry)
+        return entry
+
+    def _result_rows(self):
+        return [(i, f"row {i}") for i in range(self.rows)]
+
+    def run_statement(self, statement, parameters=None, warehouse_id=None):
+        """Runs a statement synchronously and returns its (statement id, rows)."""
+        start_time = time.time()
+        latency = self._statement_latency(statement)
+        time.sleep(latency)
+        entry = self._record(statement, warehouse_id or self.warehouse_id, start_time, latency)
+        return entry["query_id"], self._result_rows()
+
+    def connect(self, **kwargs):
+        """Opens a connection, with the signature of `databricks.sql.connect`."""
+        time.sleep(self._connect_latency())
+        return MockConnection(self, **kwargs)
+
+    def start_and_wait(self, warehouse_id):
+        """Starts a warehouse, with the signature of `WorkspaceClient().warehouses.start_and_wait`."""
+        with self._lock:
+            warehouse = self.warehouses[warehouse_id]
+            was_running = warehouse["state"] == "RUNNING"
+        if not was_running:
+            time.sleep(self._startup_latency())
+        with self._lock:
+            warehouse["state"] = "RUNNING"
+        return warehouse
+
+    def workspace_client(self, host=None, token=None, **kwargs):
+        """Returns a stand-in for `databricks.sdk.WorkspaceClient`."""
+        return types.SimpleNamespace(warehouses=types.SimpleNamespace(start_and_wait=self.start_and_wait))
+
+    def _matches(self, entry, filter_by):
+        if "statement_ids" in filter_by:
+            return entry["query_id"] in filter_by["statement_ids"]
+        time_range = filter_by.get("query_start_time_range", {})
+        if not time_range.get("start_time_ms", 0) <= entry["query_start_time_ms"] <= time_range.get("end_time_ms", float("inf")):
+            return False
+        if filter_by.get("warehouse_ids") and entry["warehouse_id"] not in filter_by["warehouse_ids"]:
+            return False
+        if filter_by.get("user_ids") and entry["user_id"] not in filter_by["user_ids"]:
+            return False
+        return True
+
+    def _query_history(self, body):
+        max_results = int(body.get("max_results", self.page_size))
+        with self._lock:
+            if "page_token" in body:
+                filter_by, offset = self._page_tokens.pop(body["page_token"])
+            else:
+                filter_by, offset = body.get("filter_by", {}), 0
+            matches = [entry for entry in self.history if self._matches(entry, filter_by)]
+            page = matches[offset:offset + min(max_results, self.page_size)]
+            response = {"res": page, "has_next_page": offset + len(page) < len(matches)}
+            if response["has_next_page"]:
+                page_token = uuid.uuid4().hex
+                self._page_tokens[page_token] = (filter_by, offset + len(page))
+                response["next_page_token"] = page_token
+        return response
+
+    def _submit_statement(self, body):
+        start_time = time.time()
+        latency = self._statement_latency(body["statement"])
+        entry = self._record(body["statement"], body.get("warehouse_id"), start_time, latency)
+        with self._lock:
+            self._statements[entry["query_id"]] = start_time + latency
+        return self._statement_status(entry["query_id"])
+
+    def _statement_status(self, statement_id):
+        with self._lock:
+            finish_time = self._statements.get(statement_id)
+        if finish_time is None:
+            return None
+        state = "SUCCEEDED" if time.time() >= finish_time else "RUNNING"
+        return {"statement_id": statement_id, "status": {"state": state}}
+
+    def route(self, method, url, **kwargs):
+        """Serves a REST request, with the signature of `requests.request`."""
+        path = urlparse(url).path.rstrip("/")
+        method = method.upper()
+        body = kwargs.get("json")
+        if body is None and kwargs.get("data"):
+            body = json.loads(kwargs["data"])
+        body = body or {}
+
+        if path.endswith("/preview/scim/v2/Me"):
+            return MockResponse(200, {"id": self.user_id, "userName": "mock@example.com"})
+        if path.endswith("/clusters/spark-versions"):
+            return MockResponse(200, {"versions": [{"key": "13.3.x-scala2.12"}, {"key": "14.3.x-scala2.12"}]})
+        if path.endswith("/sql/history/queries"):
+            return MockResponse(200, self._query_history(body))
+
+        match = re.search(r"/sql/statements(?:/([\w-]+))?$", path)
+        if match:
+            if method == "POST":
+                return MockResponse(200, self._submit_statement(body))
+            status = self._statement_status(match.group(1))
+            return MockResponse(200, status) if status else MockResponse(404, {"message": "statement not found"})
+
+        match = re.search(r"/sql/warehouses(?:/(\w+))?(?:/(start|stop))?$", path)
+        if match:
+            warehouse_id, action = match.groups()
+            if warehouse_id is None and method == "POST":
+                return MockResponse(200, {"id": self._create_warehouse(body)})
+            with self._lock:
+                warehouse = self.warehouses.get(warehouse_id)
+                if warehouse is None:
+                    return MockResponse(404, {"message": f"warehouse {warehouse_id} not found"})
+                if action == "stop":
+                    warehouse["state"] = "STOPPED"
+                elif action == "start":
+                    warehouse["state"] = "RUNNING"
+                return MockResponse(200, dict(warehouse) if action is None else {})
+
+        return MockResponse(404, {"message": f"no mock for {method} {path}"})
+
+    @contextlib.contextmanager
+    def patch(self):
+        """Routes the SQL connector, `requests` and `WorkspaceClient` used by Beaker to this workspace.
+
+        Only the current process is patched, so distributed runs must use threads or the
+        "async" engine rather than the "process" or "spark" backends.
+        """
+        # Imported here because the benchmark modules import this package's dependencies
+        from beaker import sqlwarehouseutils
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(mock.patch.object(requests, "request", self.route))
+            stack.enter_context(mock.patch.object(requests, "get", lambda url, **kwargs: self.route("GET", url, **kwargs)))
+            stack.enter_context(mock.patch.object(requests, "post", lambda url, **kwargs: self.route("POST", url, **kwargs)))
+            stack.enter_context(mock.patch.object(sqlwarehouseutils, "sql", types.SimpleNamespace(connect=self.connect)))
+            stack.enter_context(mock.patch.object(sqlwarehouseutils, "WorkspaceClient", self.workspace_client))
+            yield self
+
+
+@contextlib.contextmanager
+def mock_databricks(**kwargs):
+    """Runs Beaker against an in-memory `MockWorkspace` created with `kwargs`.
+
+        with mock_databricks(latency={"distribution": "lognormal", "median": 0.05, "sigma": 0.3}) as workspace:
+            benchmark = Benchmark(query=query, db_hostname=workspace.hostname,
+                                  warehouse_http_path=workspace.http_path, token="mock")
+            # Mock warehouses don't outlive the workspace, so don't register them
+            benchmark.setWarehouseRegistry(None)
+            benchmark.setWarehouse(workspace.http_path)
+            metrics = benchmark.execute()
+    """
+    workspace = MockWorkspace(**kwargs)
+    with workspace.patch():
+        yield workspace
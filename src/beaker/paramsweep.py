@@ -0,0 +1,181 @@
+import bisect
+import datetime
+import itertools
+import math
+import random
+from statistics import NormalDist
+
+
+_STRATEGIES = ["cartesian", "random", "latin_hypercube", "zipf"]
+
+
+class ValuesDomain:
+    """A discrete list of literal values."""
+
+    def __init__(self, values):
+        assert len(values) > 0, "A values domain needs at least one value."
+        self.values = values
+        self.size = len(values)
+
+    def at_index(self, index):
+        return self.values[index]
+
+
+class RangeDomain:
+    """Evenly spaced numbers from `start` up to and including `stop`."""
+
+    def __init__(self, start, stop, step=1):
+        assert step > 0, "A range domain needs a step > 0."
+        self.start = start
+        self.step = step
+        # Allow for float rounding so `stop` itself is included
+        self.size = int(math.floor((stop - start) / step + 1e-9)) + 1
+        assert self.size > 0, "A range domain needs stop >= start."
+
+    def at_index(self, index):
+        return self.start + index * self.step
+
+
+class DateRangeDomain:
+    """Dates from `start` to `end` (inclusive) every `step_days` days, formatted as strings."""
+
+    def __init__(self, start, end, step_days=1, format="%Y-%m-%d"):
+        self.format = format
+        self.start = datetime.datetime.strptime(start, format)
+        self.step = datetime.timedelta(days=step_days)
+        end = datetime.datetime.strptime(end, format)
+        self.size = (end - self.start) // self.step + 1
+        assert self.size > 0, "A date range domain needs end >= start."
+
+    def at_index(self, index):
+        return (self.start + index * self.step).strftime(self.format)
+
+
+class UniformDomain:
+    """A continuous uniform distribution between `low` and `high`."""
+
+    size = None
+
+    def __init__(self, low, high, integer=False):
+        self.low = low
+        self.high = high
+        self.integer = integer
+
+    def quantile(self, u):
+        value = self.low + u * (self.high - self.low)
+        return int(value) if self.integer else value
+
+
+class NormalDomain:
+    """A normal distribution, optionally clipped to [`low`, `high`]."""
+
+    size = None
+
+    def __init__(self, mean, stddev, low=None, high=None, integer=False):
+        self.distribution = NormalDist(mean, stddev)
+        self.low = low
+        self.high = high
+        self.integer = integer
+
+    def quantile(self, u):
+        # Keep u strictly inside (0, 1) where the inverse CDF is defined
+        value = self.distribution.inv_cdf(min(max(u, 1e-12), 1 - 1e-12))
+        if self.low is not None:
+            value = max(value, self.low)
+        if self.high is not None:
+            value = min(value, self.high)
+        return int(round(value)) if self.integer else value
+
+
+_DOMAINS = {
+    "values": ValuesDomain,
+    "range": RangeDomain,
+    "date_range": DateRangeDomain,
+    "uniform": UniformDomain,
+    "normal": NormalDomain,
+}
+
+
+def _make_domain(spec):
+    spec = dict(spec)
+    domain_type = spec.pop("type", "values")
+    assert domain_type in _DOMAINS, (
+        f"Invalid parameter domain type '{domain_type}'. "
+        f"Allowed types include: {list(_DOMAINS)}."
+    )
+    return _DOMAINS[domain_type](**spec)
+
+
+def _quantile(domain, u):
+    """Maps u in [0, 1) onto a domain, so every domain can be sampled the same way."""
+    if domain.size is None:
+        return domain.quantile(u)
+    return domain.at_index(min(int(u * domain.size), domain.size - 1))
+
+
+def _zipf_sampler(domain, s, rng):
+    """Returns a function drawing values with P(k-th value) proportional to 1 / k^s."""
+    assert domain.size is not None, "The zipf strategy needs discrete parameter domains."
+    cumulative_weights = list(itertools.accumulate(1 / (k ** s) for k in range(1, domain.size + 1)))
+    total = cumulative_weights[-1]
+    return lambda: domain.at_index(bisect.bisect_left(cumulative_weights, rng.random() * total))
+
+
+def generate_bindings(spec):
+    """Lazily yields parameter bindings (dicts) for one query.
+
+    `spec` is either a list of literal param dicts, which is yielded as-is, or a sweep:
+
+        {
+            "strategy": "random",  # cartesian, random, latin_hypercube or zipf
+            "samples": 100,        # number of bindings; optional cap for cartesian
+            "seed": 42,
+            "zipf_s": 1.1,         # skew of the zipf strategy
+            "domains": {
+                "segment": {"type": "values", "values": ["BUILDING", "MACHINERY"]},
+                "quantity": {"type": "range", "start": 1, "stop": 50, "step": 1},
+                "ship_date": {"type": "date_range", "start": "1995-01-01", "end": "1995-12-31", "step_days": 7},
+                "discount": {"type": "uniform", "low": 0.0, "high": 0.1},
+                "price": {"type": "normal", "mean": 100, "stddev": 10, "low": 0},
+            },
+        }
+    """
+    if isinstance(spec, list):
+        yield from spec
+        return
+
+    strategy = spec.get("strategy", "cartesian")
+    assert strategy in _STRATEGIES, (
+        f"Invalid parameter sweep strategy '{strategy}'. "
+        f"Allowed strategies include: {_STRATEGIES}."
+    )
+    names = list(spec["domains"])
+    domains = [_make_domain(spec["domains"][name]) for name in names]
+    samples = spec.get("samples")
+    rng = random.Random(spec.get("seed"))
+
+    if strategy == "cartesian":
+        assert all(d.size is not None for d in domains), (
+            "The cartesian strategy needs discrete parameter domains."
+        )
+        combinations = itertools.product(*[range(d.size) for d in domains])
+        for indexes in itertools.islice(combinations, samples):
+            yield {name: d.at_index(i) for name, d, i in zip(names, domains, indexes)}
+        return
+
+    assert samples is not None, f"The {strategy} strategy needs a number of 'samples'."
+    if strategy == "random":
+        for _ in range(samples):
+            yield {name: _quantile(d, rng.random()) for name, d in zip(names, domains)}
+    elif strategy == "latin_hypercube":
+        # Split every dimension into `samples` strata and use each stratum exactly once
+        strata = [rng.sample(range(samples), samples) for _ in domains]
+        for i in range(samples):
+            yield {
+                name: _quantile(d, (strata[j][i] + rng.random()) / samples)
+                for j, (name, d) in enumerate(zip(names, domains))
+            }
+    else:
+        samplers = [_zipf_sampler(d, spec.get("zipf_s", 1.1), rng) for d in domains]
+        for _ in range(samples):
+            yield {name: sampler() for name, sampler in zip(names, samplers)}
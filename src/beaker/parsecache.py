@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import json
+import os
+
+
+class ParseCache:
+    """An on-disk cache of parsed workload files.
+
+    Each source file gets one gzipped JSON entry keyed by its path, holding the file's
+    mtime, size, content hash and parsed value. An unchanged mtime and size is trusted
+    without reading the file; otherwise the content hash decides whether the file really
+    changed and has to be parsed again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def _content_hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_entry(self, entry_path):
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # A missing or corrupt entry just means the file is parsed again
+            return None
+
+    def _write_entry(self, entry_path, entry):
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, separators=(",", ":"))
+        os.replace(tmp_path, entry_path)
+
+    def get(self, path, parse):
+        """Returns the parsed value of `path`, calling `parse(path)` only if the file changed."""
+        stat = os.stat(path)
+        entry_path = self._entry_path(path)
+        entry = self._read_entry(entry_path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return entry["value"]
+
+        content_hash = self._content_hash(path)
+        if entry and entry["sha256"] == content_hash:
+            # Touched but not modified, so only refresh the cached mtime
+            value = entry["value"]
+        else:
+            value = parse(path)
+        self._write_entry(
+            entry_path,
+            {
+                "path": os.path.abspath(path),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": content_hash,
+                "value": value,
+            },
+        )
+        return value
+
+    def clear(self):
+        """Removes every cached entry."""
+        for f in os.listdir(self.cache_dir):
+            if f.endswith(".json.gz"):
+                os.remove(os.path.join(self.cache_dir, f))
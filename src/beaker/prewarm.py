@@ -0,0 +1,117 @@
+import re
+
+
+# A SQL literal: a string (optionally typed, e.g. DATE '2024-01-01') or a number
+_LITERAL = r"(?:(?:(?:DATE|TIMESTAMP)\s*)?'(?:[^']|'')*'|-?\d+(?:\.\d+)?)"
+
+
+def bind_params(query, param):
+    """Inlines named `:param` markers as SQL literals so the query text can be analyzed."""
+    if not param:
+        return query
+
+    def literal(match):
+        name = match.group(1)
+        if name not in param:
+            return match.group(0)
+        value = param[name]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        return "'" + str(value).replace("'", "''") + "'"
+
+    return re.sub(r"(?<!:):(\w+)", literal, query)
+
+
+def references_table(query, table):
+    """Returns True if a query mentions a table by its name, optionally qualified."""
+    name = re.escape(table.split(".")[-1].strip("`"))
+    return re.search(rf"(?<![\w.`])(?:`?\w+`?\.){{0,2}}`?{name}`?(?![\w`])", query, re.IGNORECASE) is not None
+
+
+def touched_columns(queries, columns):
+    """Returns the columns, in table order, that any of the queries mention.
+
+    A query selecting `*` touches every column. Returns None when every column is touched.
+    """
+    words = set()
+    for query in queries:
+        if re.search(r"(?:\bSELECT\s+(?:DISTINCT\s+)?|,\s*|\.)\*", query, re.IGNORECASE):
+            return None
+        words.update(word.lower() for word in re.findall(r"\w+", query))
+    touched = [column for column in columns if column.lower() in words]
+    return touched if touched and len(touched) < len(columns) else None
+
+
+# Words that can follow a table name in a FROM clause without being its alias
+_NOT_ALIASES = {
+    "where", "join", "on", "using", "group", "order", "having", "limit", "union", "left",
+    "right", "inner", "outer", "full", "cross", "natural", "lateral", "semi", "anti",
+    "window", "qualify", "pivot", "unpivot", "tablesample", "as",
+}
+
+
+def table_aliases(query, table):
+    """Returns the lower-cased names a query can qualify a table's columns with: its name and aliases."""
+    name = table.split(".")[-1].strip("`")
+    names = {name.lower()}
+    pattern = rf"(?<![\w.`])(?:`?\w+`?\.){{0,2}}`?{re.escape(name)}`?(?:\s+(?:AS\s+)?`?(\w+)`?)?"
+    for alias in re.findall(pattern, query, re.IGNORECASE):
+        if alias and alias.lower() not in _NOT_ALIASES:
+            names.add(alias.lower())
+    return names
+
+
+def _query_partition_predicates(query, partition_columns, table=None):
+    """Returns the literal predicates a query puts on partition columns, or None if it has none.
+
+    With a `table`, only predicates on unqualified columns or on columns qualified with the
+    table's name or alias count, so a same-named column of a joined table is ignored.
+    """
+    if re.search(r"\bOR\b", query, re.IGNORECASE):
+        # Predicates under an OR don't restrict the partitions on their own
+        return None
+    aliases = table_aliases(query, table) if table else None
+    predicates = []
+    for column in partition_columns:
+        qualified = rf"(?<![\w`.])((?:`?\w+`?\.){{0,3}})`?{re.escape(column)}`?"
+        for pattern in [
+            rf"{qualified}\s*(=|<>|!=|>=|<=|>|<)\s*({_LITERAL})",
+            rf"{qualified}\s+(BETWEEN)\s+({_LITERAL}\s+AND\s+{_LITERAL})",
+            rf"{qualified}\s+(IN)\s*(\((?:\s*(?:{_LITERAL})\s*,?)+\))",
+        ]:
+            for qualifier, operator, value in re.findall(pattern, query, re.IGNORECASE):
+                qualifier = qualifier.rstrip(".").split(".")[-1].strip("`").lower()
+                if qualifier and aliases is not None and qualifier not in aliases:
+                    continue
+                predicates.append(f"{column} {operator.upper()} {value}")
+    return " AND ".join(predicates) if predicates else None
+
+
+def partition_filter(queries, partition_columns, table=None):
+    """Returns a WHERE condition covering the partitions the queries read, or None for all.
+
+    Each query contributes the conjunction of its literal predicates on partition columns,
+    and the filter is their disjunction. If any query doesn't restrict the partition
+    columns, the whole table is needed. With a `table`, predicates qualified with another
+    table's name or alias are ignored.
+    """
+    if not partition_columns:
+        return None
+    conditions = []
+    for query in queries:
+        condition = _query_partition_predicates(query, partition_columns, table)
+        if condition is None:
+            return None
+        if condition not in conditions:
+            conditions.append(condition)
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else " OR ".join(f"({c})" for c in conditions)
+
+
+def warm_statement(table, columns=None, where=None):
+    """Returns the CACHE SELECT statement that warms a table, or a subset of it."""
+    statement = f"CACHE SELECT {', '.join(columns) if columns else '*'} FROM {table}"
+    if where:
+        statement += f" WHERE {where}"
+    return statement
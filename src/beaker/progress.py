@@ -0,0 +1,167 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from beaker.hooks import BenchmarkHook
+
+
+def _notebook_display():
+    """Returns IPython's `display` when running in a notebook kernel, otherwise None."""
+    try:
+        from IPython import get_ipython
+        from IPython.display import display
+    except ImportError:
+        return None
+    shell = get_ipython()
+    if shell is None or not hasattr(shell, "kernel"):
+        return None
+    return display
+
+
+class LiveProgress(BenchmarkHook):
+    """Shows rolling client-side statistics while a benchmark runs, and enforces latency SLOs.
+
+    Every `refresh_interval` seconds the rolling QPS, in-flight count, error rate and p95
+    latency over the last `window` seconds are printed, or updated in place in a notebook.
+    When the rolling p95 exceeds `slo_p95` seconds, or the error rate exceeds
+    `slo_error_rate`, `on_breach(reason)` is called, e.g. to stop the run early. SLOs are
+    only checked once the window holds `min_samples` queries. Warm-up queries are left out.
+    """
+
+    def __init__(
+        self,
+        refresh_interval=5,
+        window=60,
+        slo_p95=None,
+        slo_error_rate=None,
+        min_samples=20,
+        on_breach=None,
+    ):
+        self.refresh_interval = refresh_interval
+        self.window = window
+        self.slo_p95 = slo_p95
+        self.slo_error_rate = slo_error_rate
+        self.min_samples = min_samples
+        self.on_breach = on_breach
+        self.breach = None
+        self._lock = threading.Lock()
+        self._reset()
+        self._stop = threading.Event()
+        self._thread = None
+        self._display_handle = None
+
+    def _reset(self):
+        # (end time, latency in seconds, or None for an error) of recent queries
+        self._recent = deque()
+        self._in_flight = 0
+        self._completed = 0
+        self._errors = 0
+        self._run_start = time.time()
+        self.breach = None
+
+    def _expire(self, now):
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def stats(self, now=None):
+        """Returns the rolling statistics as a dict."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            latencies = sorted(latency for _, latency in self._recent if latency is not None)
+            errors = len(self._recent) - len(latencies)
+            elapsed = max(min(self.window, now - self._run_start), 1e-9)
+            return {
+                "elapsed": now - self._run_start,
+                "completed": self._completed,
+                "errors": self._errors,
+                "in_flight": self._in_flight,
+                "qps": len(self._recent) / elapsed,
+                "error_rate": errors / len(self._recent) if self._recent else 0.0,
+                "p95": latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)] if latencies else None,
+                "samples": len(self._recent),
+            }
+
+    def _check_slos(self, now):
+        if self.breach is not None:
+            return
+        stats = self.stats(now)
+        if stats["samples"] < self.min_samples:
+            return
+        reason = None
+        if self.slo_p95 is not None and stats["p95"] is not None and stats["p95"] > self.slo_p95:
+            reason = f"rolling p95 latency {stats['p95']:0.3f}s exceeded the SLO of {self.slo_p95}s"
+        elif self.slo_error_rate is not None and stats["error_rate"] > self.slo_error_rate:
+            reason = f"rolling error rate {stats['error_rate']:.1%} exceeded the SLO of {self.slo_error_rate:.1%}"
+        if reason is None:
+            return
+        self.breach = reason
+        logging.warning(f"SLO breached: {reason}")
+        if self.on_breach is not None:
+            self.on_breach(reason)
+
+    def render(self):
+        stats = self.stats()
+        p95 = f"{stats['p95']:0.3f}s" if stats["p95"] is not None else "-"
+        return (
+            f"[{stats['elapsed']:7.0f}s] completed={stats['completed']} in_flight={stats['in_flight']} "
+            f"qps={stats['qps']:0.2f} errors={stats['error_rate']:.1%} p95={p95} (last {self.window}s)"
+        )
+
+    def _show(self, final=False):
+        line = self.render()
+        display = _notebook_display()
+        if display is not None:
+            if self._display_handle is None:
+                self._display_handle = display(line, display_id=True)
+            else:
+                self._display_handle.update(line)
+        else:
+            print(f"\r{line}", end="\n" if final else "", flush=True)
+
+    def _refresh(self):
+        while not self._stop.wait(self.refresh_interval):
+            self._show()
+
+    def on_run_start(self, event):
+        with self._lock:
+            self._reset()
+        self._display_handle = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh, name="beaker-progress", daemon=True)
+        self._thread.start()
+
+    def on_query_submit(self, event):
+        with self._lock:
+            self._in_flight += 1
+
+    def on_query_complete(self, event):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            # Warm-up queries are expected to be slow, so they don't count towards the SLOs
+            if event.get("warmup"):
+                return
+            self._completed += 1
+            self._recent.append((event["time"], float(event["elapsed_time"])))
+        self._check_slos(event["time"])
+
+    def on_error(self, event):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if event.get("warmup"):
+                return
+            self._errors += 1
+            self._recent.append((event["time"], None))
+        self._check_slos(event["time"])
+
+    def on_run_end(self, event):
+        self.close()
+        self._show(final=True)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
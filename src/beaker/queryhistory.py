@@ -0,0 +1,120 @@
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class QueryHistoryFetcher:
+    """Retrieves query history from the Databricks Query History API.
+
+    Large time windows are split into sub-ranges that are fetched in parallel, and each
+    sub-range follows `next_page_token` until every page has been read. Queries that are
+    not final yet are re-polled by statement id with an exponential backoff, instead of
+    refetching the whole window.
+    """
+
+    def __init__(
+        self,
+        hostname,
+        token,
+        max_results=1000,
+        max_workers=8,
+        min_partition_ms=60_000,
+        initial_backoff=1,
+        max_backoff=30,
+        max_wait=600,
+    ):
+        self.hostname = hostname
+        self.token = token
+        self.max_results = max_results
+        self.max_workers = max_workers
+        self.min_partition_ms = min_partition_ms
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+
+    def _request(self, request_body):
+        response = requests.get(
+            f"https://{self.hostname}/api/2.0/sql/history/queries",
+            data=json.dumps(request_body),
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        if response.status_code != 200:
+            raise Exception(f"Failed to retrieve query history ({response.status_code}): {response.text}")
+        return response.json()
+
+    def _fetch_pages(self, filter_by):
+        """Fetches every page of results matching a filter."""
+        request_body = {
+            "filter_by": filter_by,
+            "include_metrics": "true",
+            "max_results": str(self.max_results),
+        }
+        results = []
+        while True:
+            response = self._request(request_body)
+            results += response.get("res", [])
+            page_token = response.get("next_page_token")
+            if not page_token or not response.get("has_next_page", True):
+                return results
+            # The filter can't be combined with a page token; the token carries it
+            request_body = {
+                "page_token": page_token,
+                "include_metrics": "true",
+                "max_results": str(self.max_results),
+            }
+
+    def _partition(self, start_ts_ms, end_ts_ms):
+        """Splits a time window into contiguous, non-overlapping sub-ranges."""
+        window_ms = max(end_ts_ms - start_ts_ms + 1, 1)
+        num_partitions = max(1, min(self.max_workers, math.ceil(window_ms / self.min_partition_ms)))
+        step = math.ceil(window_ms / num_partitions)
+        return [
+            (start, min(start + step - 1, end_ts_ms))
+            for start in range(start_ts_ms, end_ts_ms + 1, step)
+        ]
+
+    def _fetch_parallel(self, filters):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pages = list(executor.map(self._fetch_pages, filters))
+        return [query for page in pages for query in page]
+
+    def fetch(self, warehouse_ids, user_ids, start_ts_ms, end_ts_ms, wait_for_final=True):
+        """Returns the queries that started within [start_ts_ms, end_ts_ms].
+
+        With `wait_for_final`, queries that are still running are re-polled until
+        they are final or `max_wait` seconds have passed.
+        """
+        filters = [
+            {
+                "query_start_time_range": {"start_time_ms": start, "end_time_ms": end},
+                "warehouse_ids": warehouse_ids,
+                "user_ids": user_ids,
+            }
+            for start, end in self._partition(start_ts_ms, end_ts_ms)
+        ]
+        # Key by query id so results on sub-range boundaries are only kept once
+        history = {query["query_id"]: query for query in self._fetch_parallel(filters)}
+
+        backoff = self.initial_backoff
+        deadline = time.time() + self.max_wait
+        pending = [query_id for query_id, query in history.items() if not query.get("is_final")]
+        while wait_for_final and pending:
+            if time.time() + backoff > deadline:
+                logging.warning(f"{len(pending)} queries were still not final after {self.max_wait}s.")
+                break
+            logging.info(f"Waiting {backoff}s for {len(pending)} queries to finish")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            filters = [
+                {"statement_ids": pending[i:i + self.max_results]}
+                for i in range(0, len(pending), self.max_results)
+            ]
+            for query in self._fetch_parallel(filters):
+                history[query["query_id"]] = query
+            pending = [query_id for query_id in pending if not history[query_id].get("is_final")]
+
+        return sorted(history.values(), key=lambda query: query.get("query_start_time_ms", 0))
@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+
+class RunStore:
+    """A local, on-disk store of benchmark runs.
+
+    Client metrics and query history are written as Parquet files partitioned by kind and
+    run id (`<path>/<kind>/run_id=<run_id>/part-00000.parquet`), and a small JSON manifest
+    indexes every run. Past runs can be listed and compared from disk without calling the
+    Databricks APIs again.
+    """
+
+    _MANIFEST = "manifest.json"
+    _KINDS = ["client", "history"]
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, self._MANIFEST)
+
+    def _partition_dir(self, kind, run_id):
+        assert kind in self._KINDS, (
+            "Invalid run store kind. "
+            f"Allowed kinds include: {self._KINDS}."
+        )
+        return os.path.join(self.path, kind, f"run_id={run_id}")
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return {}
+        with open(self._manifest_path(), "r") as f:
+            return json.load(f)
+
+    def update_run(self, run_id, **info):
+        """Adds or updates a run's entry in the manifest."""
+        with self._lock:
+            manifest = self._read_manifest()
+            manifest.setdefault(run_id, {"run_id": run_id}).update(info)
+            # Write to a temporary file first so a crash can't corrupt the manifest
+            tmp_path = self._manifest_path() + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.replace(tmp_path, self._manifest_path())
+
+    def _to_storable(self, pdf):
+        """Serializes nested dict/list columns to JSON strings so Parquet gets a stable schema."""
+        pdf = pdf.copy()
+        for column in pdf.columns[pdf.dtypes == object]:
+            if pdf[column].map(lambda v: isinstance(v, (dict, list))).any():
+                pdf[column] = pdf[column].map(
+                    lambda v: json.dumps(v, sort_keys=True, default=str) if v is not None else None
+                )
+        return pdf
+
+    def append(self, run_id, kind, data):
+        """Appends a batch of records (a DataFrame or list of dicts) to a run as a new part file."""
+        pdf = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if pdf.empty:
+            return
+        partition_dir = self._partition_dir(kind, run_id)
+        with self._lock:
+            os.makedirs(partition_dir, exist_ok=True)
+            part = len([f for f in os.listdir(partition_dir) if f.endswith(".parquet")])
+            part_path = os.path.join(partition_dir, f"part-{part:05d}.parquet")
+            self._to_storable(pdf).to_parquet(part_path, index=False)
+
+    def list_runs(self):
+        """Returns the manifest as a DataFrame with one row per run."""
+        with self._lock:
+            manifest = self._read_manifest()
+        return pd.DataFrame(list(manifest.values()))
+
+    def load(self, kind="history", run_ids=None):
+        """Loads the stored records of the given runs (all runs by default) into one DataFrame."""
+        kind_dir = os.path.join(self.path, kind)
+        if run_ids is None:
+            run_ids = [
+                d.split("=", 1)[1] for d in sorted(os.listdir(kind_dir)) if d.startswith("run_id=")
+            ] if os.path.isdir(kind_dir) else []
+        frames = []
+        for run_id in run_ids:
+            partition_dir = self._partition_dir(kind, run_id)
+            if not os.path.isdir(partition_dir):
+                continue
+            pdf = pd.read_parquet(partition_dir)
+            pdf["run_id"] = run_id
+            frames.append(pdf)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -1,7 +1,20 @@
 import os
+import json
 from pyspark.sql import SparkSession
 from functools import lru_cache
 from pyspark.sql.functions import col
+from pyspark.sql.types import (
+    BooleanType,
+    DoubleType,
+    LongType,
+    StringType,
+    StructField,
+    StructType,
+    TimestampType,
+)
+import pandas as pd
+
+from beaker.metricsrecorder import MetricsRecorder
 
 @lru_cache(maxsize=None)
 def get_spark_session():
@@ -16,13 +29,179 @@ def get_spark_session():
     else:
         return SparkSession.builder.appName("beaker").getOrCreate()
 
-    
+
+def _to_string(value):
+    """Returns a value as a string for a string column: nested values as JSON, missing values as None."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def flatten_metrics(metrics_pdf, column="metrics"):
+    """Expands a column of nested dicts, e.g. the query history `metrics`, into one column per key.
+
+    The new columns are named `<column>_<key>`, e.g. `metrics_read_bytes`.
+    """
+    if column not in metrics_pdf.columns:
+        return metrics_pdf
+    nested = metrics_pdf[column].map(lambda v: v if isinstance(v, dict) else {})
+    flat_pdf = pd.json_normalize(nested.tolist(), sep="_").add_prefix(f"{column}_")
+    flat_pdf.index = metrics_pdf.index
+    for flat_column in flat_pdf.columns:
+        # Counters missing from some rows come back as floats
+        values = flat_pdf[flat_column]
+        if pd.api.types.is_float_dtype(values.dtype) and (values.dropna() % 1 == 0).all():
+            flat_pdf[flat_column] = values.astype("Int64")
+    return pd.concat([metrics_pdf.drop(columns=[column]), flat_pdf], axis=1)
+
+
+# Spark types of the columns beaker knows about: the client metrics, the query history
+# and its flattened `metrics`. Pinning them keeps the Delta table schema the same across
+# runs, e.g. when a merge turns integers into floats or a column is empty in one run.
+# Columns not listed here have their type inferred.
+METRICS_SCHEMA = {
+    **{column: StringType for column in MetricsRecorder._TEXT_COLUMNS + MetricsRecorder._CONSTANTS},
+    **{column: DoubleType for column in MetricsRecorder._FLOAT_COLUMNS + MetricsRecorder._OPEN_LOOP_COLUMNS},
+    **{column: LongType for column in MetricsRecorder._INT_COLUMNS},
+    "concurrency": LongType,
+    "statement_id": StringType,
+    "warmup": BooleanType,
+    "run_id": StringType,
+    # Query history
+    **{
+        column: StringType
+        for column in [
+            "query_id", "status", "query_text", "error_message", "warehouse_id", "endpoint_id",
+            "user_name", "executed_as_user_name", "lookup_key", "spark_ui_url", "statement_type",
+            "plans_state", "client_application",
+        ]
+    },
+    **{
+        column: LongType
+        for column in [
+            "query_start_time_ms", "execution_end_time_ms", "query_end_time_ms", "duration",
+            "rows_produced", "user_id", "executed_as_user_id",
+        ]
+    },
+    "is_final": BooleanType,
+    **{
+        f"metrics_{column}": LongType
+        for column in [
+            "total_time_ms", "compilation_time_ms", "execution_time_ms", "planning_time_ms",
+            "metadata_time_ms", "result_fetch_time_ms", "task_total_time_ms", "photon_total_time_ms",
+            "query_execution_time_ms", "read_bytes", "read_remote_bytes", "read_cache_bytes",
+            "write_remote_bytes", "spill_to_disk_bytes", "network_sent_bytes", "pruned_bytes",
+            "rows_produced_count", "rows_read_count", "read_files_count", "read_partitions_count",
+            "pruned_files_count",
+        ]
+    },
+    "metrics_result_from_cache": BooleanType,
+}
+
+
+def _spark_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return BooleanType
+    if pd.api.types.is_integer_dtype(dtype):
+        return LongType
+    if pd.api.types.is_float_dtype(dtype):
+        return DoubleType
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return TimestampType
+    return StringType
+
+
+def _typed_column(series):
+    """Returns an object column as booleans or numbers when all its values are, otherwise as strings."""
+    values = [v for v in series if not isinstance(v, (dict, list)) and not pd.isna(v)]
+    if len(values) == series.notna().sum():
+        if values and all(isinstance(v, bool) for v in values):
+            return series.astype("boolean")
+        if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            return series.astype("Int64")
+        if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return series.astype("float64")
+    return series.map(_to_string)
+
+
+def _cast_column(series, spark_type):
+    """Returns a column as the pandas type matching a Spark type, whatever it was inferred as."""
+    if spark_type is StringType:
+        return series.astype(object).map(_to_string)
+    if spark_type is BooleanType:
+        return series.astype("boolean")
+    values = pd.to_numeric(series, errors="coerce")
+    if spark_type is LongType:
+        return values.round().astype("Int64")
+    return values.astype("float64")
+
+
+def to_spark_compatible(metrics_pdf):
+    """Returns a copy of a metrics DataFrame with flat columns of a single type each.
+
+    Nested query history metrics are flattened. Known columns are cast to their type in
+    `METRICS_SCHEMA`. Other columns of mixed or nested values, such as unknown history
+    fields, become JSON or plain strings.
+    """
+    pdf = flatten_metrics(metrics_pdf).copy()
+    for column in pdf.columns:
+        dtype = pdf[column].dtype
+        if column in METRICS_SCHEMA:
+            pdf[column] = _cast_column(pdf[column], METRICS_SCHEMA[column])
+        elif dtype == object:
+            pdf[column] = _typed_column(pdf[column])
+        elif _spark_type(dtype) is StringType:
+            pdf[column] = pdf[column].astype(object).map(_to_string)
+    return pdf
+
+
+def spark_schema(metrics_pdf):
+    """Returns the explicit Spark schema of a DataFrame prepared by `to_spark_compatible`.
+
+    Known columns take their type from `METRICS_SCHEMA`, the rest from their pandas dtype.
+    """
+    return StructType([
+        StructField(str(column), METRICS_SCHEMA.get(column, _spark_type(dtype))(), nullable=True)
+        for column, dtype in metrics_pdf.dtypes.items()
+    ])
+
+
+def metrics_to_spark_df(metrics_pdf):
+    """Converts a metrics pandas DataFrame to a Spark DataFrame with Arrow and an explicit schema."""
+    spark = get_spark_session()
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    pdf = to_spark_compatible(metrics_pdf)
+    return spark.createDataFrame(pdf, schema=spark_schema(pdf))
+
+
 def metrics_to_df_view(metrics_pdf, view_name):
     """Convert a pandas dataframe to a spark dataframe.
     Create a view and return the spark dataframe.
     """
-    spark = get_spark_session()
-    metrics_df = spark.createDataFrame(metrics_pdf)
+    metrics_df = metrics_to_spark_df(metrics_pdf)
     metrics_df.createOrReplaceTempView(view_name)
     print(f"Query metrics at: {view_name}")
     return metrics_df
+
+
+def export_metrics_to_delta(metrics_pdf, table, run_id, mode="append"):
+    """Appends the metrics of a run to a Delta table partitioned by `run_id`.
+
+    New metric columns are merged into the table schema, so results of many runs build up
+    in one table for trend queries.
+    """
+    if metrics_pdf.empty:
+        print(f"No metrics to export to {table}")
+        return None
+    metrics_df = metrics_to_spark_df(metrics_pdf.assign(run_id=run_id))
+    (
+        metrics_df.write.format("delta")
+        .mode(mode)
+        .option("mergeSchema", "true")
+        .partitionBy("run_id")
+        .saveAsTable(table)
+    )
+    print(f"Query metrics of run {run_id} appended to: {table}")
+    return metrics_df
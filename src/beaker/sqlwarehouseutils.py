@@ -3,8 +3,11 @@ import datetime
 from databricks import sql
 import logging
 import time
+import threading
 from databricks.sdk import WorkspaceClient
 
+from beaker.connectionpool import ConnectionPool
+
 class SQLWarehouseUtils:
     _LATEST_RUNTIME = "13.3.x-scala2.12"
     _CLUSTER_SIZES = [
@@ -18,6 +21,14 @@ class SQLWarehouseUtils:
         "3X-Large",
         "4X-Large",
     ]
+    _CONNECTION_MODES = ["fresh", "pooled"]
+    _FETCH_MODES = ["none", "rows", "arrow"]
+    _PHASES = ["connect_time", "execute_time", "time_to_first_row", "fetch_time", "close_time"]
+    _RESULT_STATS = ["result_rows", "result_bytes", "fetch_mb_per_sec"]
+    # Warehouse states from which a registered warehouse can't be restarted
+    _GONE_STATES = ["DELETING", "DELETED"]
+    # Spark runtimes per hostname, shared by every instance since they rarely change
+    _spark_runtimes_cache = {}
 
     def __init__(
         self,
@@ -28,6 +39,12 @@ class SQLWarehouseUtils:
         schema="default",
         enable_results_caching=False,
         new_warehouse_config=None,
+        connection_mode="fresh",
+        pool_size=8,
+        pool_max_idle_time=300,
+        pool_health_check_interval=30,
+        fetch_mode="none",
+        fetch_batch_size=10000,
     ):
         self.hostname = hostname
         self.http_path = warehouse_http_path
@@ -36,7 +53,13 @@ class SQLWarehouseUtils:
         self.catalog = catalog
         self.schema = schema
         self.enable_results_caching = enable_results_caching
-
+        self.setConnectionMode(
+            connection_mode,
+            pool_size=pool_size,
+            pool_max_idle_time=pool_max_idle_time,
+            pool_health_check_interval=pool_health_check_interval,
+        )
+        self.setFetchMode(fetch_mode, fetch_batch_size)
 
     # def __del__(self):
     #     self.close_connection()
@@ -61,16 +84,166 @@ class SQLWarehouseUtils:
         return connection
 
 
-    def execute_query(self, query_str, param=None):
-        # create a seperate connection for each query to facilitate concurrency
-        connection = self._get_connection()
+    def _get_pool(self):
+        # Lazily create the pool, since most callers never use pooled mode
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ConnectionPool(
+                    self._get_connection,
+                    max_size=self.pool_size,
+                    max_idle_time=self.pool_max_idle_time,
+                    health_check_interval=self.pool_health_check_interval,
+                )
+            return self._pool
+
+    def _fetch_rows(self, cursor, timings, phase_start):
+        """Streams the result set in batches, discarding rows as they arrive."""
+        rows = cursor.fetchmany(self.fetch_batch_size)
+        timings["time_to_first_row"] = time.perf_counter() - phase_start
+        result_rows = 0
+        while rows:
+            result_rows += len(rows)
+            rows = cursor.fetchmany(self.fetch_batch_size)
+        timings["result_rows"] = result_rows
+
+    def _fetch_arrow(self, cursor, timings, phase_start):
+        """Streams the result set as Arrow batches, so memory stays bounded by one batch."""
+        batch = cursor.fetchmany_arrow(self.fetch_batch_size)
+        timings["time_to_first_row"] = time.perf_counter() - phase_start
+        result_rows = 0
+        result_bytes = 0
+        while batch.num_rows:
+            result_rows += batch.num_rows
+            result_bytes += batch.nbytes
+            batch = cursor.fetchmany_arrow(self.fetch_batch_size)
+        timings["result_rows"] = result_rows
+        timings["result_bytes"] = result_bytes
+
+    def _run_cursor(self, connection, query_str, param, timings):
+        phase_start = time.perf_counter()
         cursor = connection.cursor()
         if param:
             cursor.execute(query_str, param)
         else:
             cursor.execute(query_str)
+        phase_end = time.perf_counter()
+        timings["execute_time"] = phase_end - phase_start
+        # The server-side id of the statement, used to join with query history
+        timings["statement_id"] = getattr(cursor, "query_id", None)
+
+        if self.fetch_mode != "none":
+            phase_start = phase_end
+            if self.fetch_mode == "arrow":
+                self._fetch_arrow(cursor, timings, phase_start)
+            else:
+                self._fetch_rows(cursor, timings, phase_start)
+            phase_end = time.perf_counter()
+            timings["fetch_time"] = phase_end - phase_start
+            if timings["result_bytes"] is not None and timings["fetch_time"] > 0:
+                timings["fetch_mb_per_sec"] = timings["result_bytes"] / (1024 * 1024) / timings["fetch_time"]
+
         cursor.close()
+        return phase_end
+
+    def execute_query(self, query_str, param=None):
+        """Executes a query and returns how long each phase of the query took, in seconds.
+
+        The phases are connect_time, execute_time (until `cursor.execute` returns),
+        time_to_first_row and fetch_time (only when a fetch mode is set) and close_time.
+        When results are fetched, result_rows is also returned, and in "arrow" mode
+        result_bytes and fetch_mb_per_sec as well. The statement_id of the query is
+        returned alongside the timings.
+        """
+        timings = dict.fromkeys(self._PHASES + self._RESULT_STATS + ["statement_id"])
+        phase_start = time.perf_counter()
+        if self.connection_mode == "pooled":
+            # reuse the warm session leased to this worker thread
+            pool = self._get_pool()
+            pooled = pool.lease()
+            timings["connect_time"] = time.perf_counter() - phase_start
+            try:
+                phase_start = self._run_cursor(pooled.connection, query_str, param, timings)
+            except Exception:
+                pool.end_lease(discard=True)
+                raise
+            pooled.query_count += 1
+            timings["close_time"] = time.perf_counter() - phase_start
+            return timings
+
+        # create a seperate connection for each query to facilitate concurrency
+        connection = self._get_connection()
+        timings["connect_time"] = time.perf_counter() - phase_start
+        phase_start = self._run_cursor(connection, query_str, param, timings)
         connection.close()
+        timings["close_time"] = time.perf_counter() - phase_start
+        return timings
+
+    def fetch_all(self, query_str, param=None):
+        """Executes a small metadata query and returns its (column names, rows)."""
+        connection = self._get_connection()
+        try:
+            cursor = connection.cursor()
+            if param:
+                cursor.execute(query_str, param)
+            else:
+                cursor.execute(query_str)
+            columns = [column[0] for column in cursor.description or []]
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+        return columns, rows
+
+    def release_connection(self):
+        """Returns the calling thread's leased connection to the pool."""
+        if self._pool is not None:
+            self._pool.end_lease()
+
+    def close_connections(self):
+        """Closes all pooled connections."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def setConnectionMode(
+        self,
+        connection_mode,
+        pool_size=8,
+        pool_max_idle_time=300,
+        pool_health_check_interval=30,
+    ):
+        """Chooses between a fresh connection per query and pooled, reused sessions."""
+        connection_mode = connection_mode.strip().lower()
+        assert connection_mode in self._CONNECTION_MODES, (
+            "Invalid connection mode. "
+            f"Allowed modes include: {self._CONNECTION_MODES}."
+        )
+        if getattr(self, "_pool", None) is not None:
+            self.close_connections()
+        self.connection_mode = connection_mode
+        self.pool_size = pool_size
+        self.pool_max_idle_time = pool_max_idle_time
+        self.pool_health_check_interval = pool_health_check_interval
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def setPoolSize(self, pool_size):
+        """Changes the maximum number of pooled sessions, resizing the pool if it's open."""
+        self.pool_size = pool_size
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.resize(pool_size)
+
+    def setFetchMode(self, fetch_mode, fetch_batch_size=10000):
+        """Sets whether query results are fetched (and discarded) after execution."""
+        fetch_mode = fetch_mode.strip().lower()
+        assert fetch_mode in self._FETCH_MODES, (
+            "Invalid fetch mode. "
+            f"Allowed modes include: {self._FETCH_MODES}."
+        )
+        self.fetch_mode = fetch_mode
+        self.fetch_batch_size = fetch_batch_size
 
     def setToken(self, token):
         self.access_token = token
@@ -89,16 +262,51 @@ class SQLWarehouseUtils:
 
     def _get_spark_runtimes(self):
         """Gets a list of the latest Spark runtimes."""
+        if self.hostname not in self._spark_runtimes_cache:
+            response = requests.get(
+                f"https://{self.hostname}/api/2.0/clusters/spark-versions",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            )
+            result = list(map(lambda v: v["key"], response.json()["versions"]))
+            self._spark_runtimes_cache[self.hostname] = result
+        return self._spark_runtimes_cache[self.hostname]
+    
+
+    def launch_warehouse(self, config, registry=None):
+        """Starts a SQL warehouse for a config and waits until it is running.
+
+        With a `WarehouseRegistry`, a warehouse previously provisioned for the same config
+        is restarted instead of creating a new one, and new warehouses are registered.
+        """
+        warehouse_id = self.find_registered_warehouse(config, registry)
+        if warehouse_id is None:
+            warehouse_id = self.create_warehouse(config)
+            if registry is not None:
+                registry.register(self.hostname, config, warehouse_id)
+        self.wait_for_warehouse(warehouse_id)
+        return warehouse_id
+
+    def find_registered_warehouse(self, config, registry):
+        """Returns the id of a registered warehouse for a config that still exists, or None."""
+        if registry is None:
+            return None
+        warehouse_id = registry.lookup(self.hostname, config)
+        if warehouse_id is None:
+            return None
         response = requests.get(
-            f"https://{self.hostname}/api/2.0/clusters/spark-versions",
+            f"https://{self.hostname}/api/2.0/sql/warehouses/{warehouse_id}",
             headers={"Authorization": f"Bearer {self.access_token}"},
         )
-        result = list(map(lambda v: v["key"], response.json()["versions"]))
-        return result
-    
+        if response.status_code != 200 or response.json().get("state") in self._GONE_STATES:
+            logging.info(f"Registered warehouse {warehouse_id} no longer exists.")
+            registry.forget(self.hostname, config)
+            return None
+        print(f"Reusing warehouse {warehouse_id} ({response.json().get('state')})")
+        self.http_path = f"/sql/1.0/warehouses/{warehouse_id}"
+        return warehouse_id
 
-    def launch_warehouse(self, config):
-        """Creates a new SQL warehouse based upon a config."""
+    def create_warehouse(self, config):
+        """Creates a new SQL warehouse based upon a config without waiting for it to start."""
         assert self.access_token is not None, (
             "An API token is needed to launch a compute instance. "
             "Use `.setToken(token)` to add an API token."
@@ -146,14 +354,14 @@ class SQLWarehouseUtils:
             )
 
 
-        # Determine the Spark runtime to install
-        latest_runtimes = self._get_spark_runtimes()
+        # Determine the Spark runtime to install, only looking up runtimes to validate a specific one
         if "runtime" not in config:
             spark_version = self._LATEST_RUNTIME  # default to the latest runtime
         elif config["runtime"].strip().lower() == "latest":
             spark_version = self._LATEST_RUNTIME  # default to the latest runtime
         else:
             spark_version = config["runtime"].strip().lower()
+            latest_runtimes = self._get_spark_runtimes()
             assert spark_version in latest_runtimes, (
                 f"Invalid Spark 'runtime'. "
                 f"Valid runtimes include: {latest_runtimes}"
@@ -208,12 +416,6 @@ class SQLWarehouseUtils:
         
         warehouse_id = response.json().get("id")
 
-        warehouse_start_time = time.time()
-
-        WorkspaceClient(host=f"https://{self.hostname}", token=self.access_token).warehouses.start_and_wait(warehouse_id)
-
-        print(f"{int(time.time() - warehouse_start_time)}s Warehouse {warehouse_id} Startup Time")
-        
         if not warehouse_id:
             raise Exception(f"did not get back warehouse_id ({response.json()})")
         
@@ -222,6 +424,16 @@ class SQLWarehouseUtils:
 
         return warehouse_id
 
+    def wait_for_warehouse(self, warehouse_id):
+        """Blocks until a SQL warehouse is running and returns its startup time in seconds."""
+        warehouse_start_time = time.time()
+
+        WorkspaceClient(host=f"https://{self.hostname}", token=self.access_token).warehouses.start_and_wait(warehouse_id)
+
+        startup_time = time.time() - warehouse_start_time
+        print(f"{int(startup_time)}s Warehouse {warehouse_id} Startup Time")
+        return startup_time
+
 
     def __str__(self):
         object_str = f"""
@@ -232,5 +444,8 @@ class SQLWarehouseUtils:
     schema={self.schema}
     http_path={self.http_path}
     enable_results_caching={self.enable_results_caching}
+    connection_mode={self.connection_mode}
+    fetch_mode={self.fetch_mode}
+    pool={self._pool}
     """
         return object_str
\ No newline at end of file
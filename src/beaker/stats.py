@@ -0,0 +1,49 @@
+import math
+from statistics import NormalDist, median
+
+
+def median_confidence_interval(samples, confidence=0.95):
+    """Returns a distribution-free (lower, upper) confidence interval for the median.
+
+    The bounds are order statistics whose ranks come from the normal approximation to
+    the binomial distribution, so no assumption is made about the latency distribution.
+    With too few samples the interval spans every sample.
+    """
+    values = sorted(samples)
+    n = len(values)
+    if n == 0:
+        return None, None
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * math.sqrt(n) / 2
+    lower_rank = max(1, math.floor(n / 2 - half_width))
+    upper_rank = min(n, math.ceil(n / 2 + half_width + 1))
+    return values[lower_rank - 1], values[upper_rank - 1]
+
+
+def relative_median_ci_width(samples, confidence=0.95):
+    """Returns the width of the median's confidence interval relative to the median."""
+    lower, upper = median_confidence_interval(samples, confidence)
+    center = median(samples) if samples else None
+    if not center:
+        return math.inf
+    return (upper - lower) / center
+
+
+def find_saturation_knee(concurrency_levels, throughputs, tail_latencies, min_scaling=0.2, max_latency_growth=1.5):
+    """Returns the concurrency level after which a warehouse stops scaling, or None.
+
+    Moving from one level to the next, throughput has flattened when it grew by less than
+    `min_scaling` of the concurrency increase (e.g. doubling concurrency but gaining less
+    than 20% throughput), and tail latency has shot up when it grew by at least
+    `max_latency_growth` times. The knee is the last level before the first step where
+    both happen.
+    """
+    points = list(zip(concurrency_levels, throughputs, tail_latencies))
+    for (prev_level, prev_throughput, prev_latency), (level, throughput, latency) in zip(points, points[1:]):
+        if not prev_throughput or not prev_latency or throughput is None or latency is None:
+            continue
+        throughput_gain = (throughput - prev_throughput) / prev_throughput
+        concurrency_gain = (level - prev_level) / prev_level
+        if throughput_gain < min_scaling * concurrency_gain and latency / prev_latency >= max_latency_growth:
+            return prev_level
+    return None
@@ -0,0 +1,88 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+
+class WarehouseRegistry:
+    """A local registry of the warehouses Beaker has provisioned, keyed by config fingerprint.
+
+    Launching a config that matches a registered warehouse restarts that warehouse instead
+    of creating another one, so iterative sessions don't leave a pile of orphaned
+    warehouses behind and skip the creation time.
+    """
+
+    # Values the warehouses API falls back to, so equivalent configs share a fingerprint
+    _DEFAULTS = {
+        "type": "warehouse",
+        "warehouse": "serverless",
+        "size": "Small",
+        "enable_photon": "true",
+        "min_num_clusters": 1,
+        "max_num_clusters": 1,
+        "runtime": "latest",
+    }
+
+    def __init__(self, path=os.path.join(os.path.expanduser("~"), ".beaker", "warehouses.json")):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def fingerprint(self, hostname, config):
+        """Returns a stable hash of a workspace and the warehouse settings of a config."""
+        settings = {**self._DEFAULTS, **config}
+        for key, value in settings.items():
+            if isinstance(value, str) and key != "name":
+                settings[key] = value.strip().lower()
+        settings["enable_photon"] = str(settings["enable_photon"]).lower()
+        if "max_num_clusters" not in config:
+            settings["min_num_clusters"] = 1
+        payload = json.dumps({"hostname": hostname, "config": settings}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except ValueError:
+            # A corrupt registry only costs creating new warehouses
+            return {}
+
+    def _write(self, entries):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, hostname, config):
+        """Returns the id of the warehouse registered for a config, or None."""
+        with self._lock:
+            entry = self._read().get(self.fingerprint(hostname, config))
+        return entry["warehouse_id"] if entry else None
+
+    def register(self, hostname, config, warehouse_id):
+        """Records the warehouse provisioned for a config."""
+        with self._lock:
+            entries = self._read()
+            entries[self.fingerprint(hostname, config)] = {
+                "hostname": hostname,
+                "warehouse_id": warehouse_id,
+                "config": config,
+                "registered_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._write(entries)
+
+    def forget(self, hostname, config):
+        """Removes a config's warehouse from the registry, e.g. after it was deleted."""
+        with self._lock:
+            entries = self._read()
+            entries.pop(self.fingerprint(hostname, config), None)
+            self._write(entries)
+
+    def list_warehouses(self):
+        """Returns every registered warehouse as a list of dicts."""
+        with self._lock:
+            return list(self._read().values())
@@ -0,0 +1,34 @@
+import unittest
+import sys
+from itertools import islice
+
+sys.path.append("../")
+from beaker.arrivals import arrival_offsets
+
+
+class TestArrivals(unittest.TestCase):
+    def test_constant_arrivals(self):
+        offsets = list(islice(arrival_offsets([{"rate": 4}]), 4))
+        self.assertEqual(offsets, [0.25, 0.5, 0.75, 1.0])
+
+    def test_step_schedule_ends(self):
+        schedule = [{"duration": 1, "rate": 2}, {"duration": 1, "rate": 4}]
+        offsets = list(arrival_offsets(schedule))
+        self.assertEqual(offsets, [0.5, 1.0, 1.25, 1.5, 1.75, 2.0])
+
+    def test_ramp_schedule(self):
+        # Ramping from 0 to 10 qps over 2 seconds yields 10 arrivals that get denser over time
+        offsets = list(arrival_offsets([{"duration": 2, "start_rate": 0, "end_rate": 10}]))
+        self.assertEqual(len(offsets), 10)
+        self.assertAlmostEqual(offsets[-1], 2.0)
+        gaps = [b - a for a, b in zip(offsets, offsets[1:])]
+        self.assertEqual(gaps, sorted(gaps, reverse=True))
+
+    def test_poisson_arrivals_match_target_rate(self):
+        offsets = list(arrival_offsets([{"duration": 100, "rate": 50}], "poisson", seed=7))
+        self.assertAlmostEqual(len(offsets) / 100, 50, delta=2.5)
+        self.assertEqual(offsets, sorted(offsets))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+from unittest import mock
+
+sys.path.append("../")
+from beaker.asyncengine import AsyncStatementEngine, run_coroutine
+
+
+def response(json_body, status_code=200):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=json_body), text="")
+
+
+class TestAsyncStatementEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = AsyncStatementEngine("host", "token", "abc123", poll_interval=0, max_poll_interval=0)
+
+    def tearDown(self):
+        self.engine.close()
+
+    @mock.patch("beaker.asyncengine.requests.request")
+    def test_execute_query_polls_until_terminal(self, request):
+        request.side_effect = [
+            response({"statement_id": "s1", "status": {"state": "PENDING"}}),
+            response({"statement_id": "s1", "status": {"state": "RUNNING"}}),
+            response({"statement_id": "s1", "status": {"state": "SUCCEEDED"}}),
+        ]
+        statement = run_coroutine(self.engine.execute_query("select :x", {"x": 1}))
+
+        self.assertEqual(statement["status"]["state"], "SUCCEEDED")
+        self.assertEqual(request.call_count, 3)
+        submitted = request.call_args_list[0].kwargs["json"]
+        self.assertEqual(submitted["wait_timeout"], "0s")
+        self.assertEqual(submitted["parameters"], [{"name": "x", "value": "1"}])
+
+    @mock.patch("beaker.asyncengine.requests.request")
+    def test_failed_statement_raises(self, request):
+        request.return_value = response(
+            {"statement_id": "s1", "status": {"state": "FAILED", "error": {"message": "boom"}}}
+        )
+        with self.assertRaises(Exception):
+            run_coroutine(self.engine.execute_query("select 1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
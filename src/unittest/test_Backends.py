@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+sys.path.append("../")
+from beaker.benchmark import Benchmark
+from beaker.backends import SQLiteBackend, DuckDBBackend, SparkSessionBackend
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SETUP = """
+CREATE TABLE sales (store_id INTEGER, amount REAL);
+INSERT INTO sales VALUES (1, 10.0), (1, 5.0), (2, 7.5), (3, 1.0);
+"""
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.query_file = os.path.join(self.tmp_dir.name, "queries.sql")
+        with open(self.query_file, "w") as f:
+            f.write("--by_store--\nselect store_id, sum(amount) from sales where store_id <= :max_store group by store_id;\n")
+            f.write("--total--\nselect sum(amount) from sales;\n")
+        self.params_path = os.path.join(self.tmp_dir.name, "params.json")
+        with open(self.params_path, "w") as f:
+            json.dump({"by_store": [{"max_store": 1}, {"max_store": 3}]}, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, backend, fetch_mode="none"):
+        bm = Benchmark(
+            query_file=self.query_file,
+            params_path=self.params_path,
+            concurrency=2,
+            query_repeat_count=2,
+            backend=backend,
+            fetch_mode=fetch_mode,
+        )
+        bm.setWarehouseRegistry(None)
+        result_pdf = bm.execute()
+        backend.close_connections()
+        return result_pdf
+
+    def _check(self, result_pdf):
+        # 2 bindings of by_store and 1 total, repeated twice
+        self.assertEqual(len(result_pdf), 6)
+        self.assertTrue(result_pdf["query_id"].notna().all())
+        self.assertTrue((result_pdf["status"] == "FINISHED").all())
+
+    def test_sqlite(self):
+        result_pdf = self._run(SQLiteBackend(database="file:beaker_test?mode=memory&cache=shared", setup=SETUP))
+        self._check(result_pdf)
+        self.assertEqual(result_pdf["warehouse_name"].unique().tolist(), ["sqlite"])
+
+    def test_sqlite_fetches_rows(self):
+        result_pdf = self._run(
+            SQLiteBackend(database="file:beaker_test_fetch?mode=memory&cache=shared", setup=SETUP), fetch_mode="rows"
+        )
+        self._check(result_pdf)
+        self.assertEqual(sorted(result_pdf.loc[result_pdf["id"] == "by_store", "result_rows"].unique()), [1, 3])
+
+    def test_local_backends_reject_arrow_fetch(self):
+        backend = SQLiteBackend(database="file:beaker_test_arrow?mode=memory&cache=shared", setup=SETUP)
+        with self.assertRaises(AssertionError):
+            backend.setFetchMode("arrow")
+        with self.assertRaises(AssertionError):
+            self._run(backend, fetch_mode="arrow")
+
+    def test_failed_statement_is_recorded(self):
+        backend = SQLiteBackend(database="file:beaker_test_fail?mode=memory&cache=shared", setup=SETUP)
+        with self.assertRaises(Exception):
+            backend.execute_query("select * from missing_table")
+        history = backend.get_query_history(None, ["sqlite"], 0, 2 ** 62)
+        self.assertEqual(history[-1]["status"], "FAILED")
+
+    @unittest.skipIf(duckdb is None, "duckdb is not installed")
+    def test_duckdb(self):
+        self._check(self._run(DuckDBBackend(setup=SETUP)))
+
+    @unittest.skipIf(shutil.which("java") is None, "Spark needs a Java runtime")
+    def test_spark(self):
+        os.environ["ENV"] = "LOCAL"
+        backend = SparkSessionBackend()
+        backend.spark.sql("create or replace temp view sales as select * from values (1, 10.0), (1, 5.0), (2, 7.5), (3, 1.0) as t(store_id, amount)")
+        self._check(self._run(backend))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
 import unittest
 import sys
+import io
+import contextlib
 from dotenv import load_dotenv
 import os
+import threading
+import time
+from collections import Counter
 
 sys.path.append("../")
 from beaker import benchmark
@@ -15,6 +20,30 @@ access_token = os.getenv("DATABRICKS_ACCESS_TOKEN")
 catalog_name = os.getenv("CATALOG")
 schema_name = os.getenv("SCHEMA")
 
+class FakeWarehouse:
+    """Stands in for SQLWarehouseUtils and tracks how many queries are in flight."""
+
+    def __init__(self, latencies=None, failures=()):
+        self.latencies = latencies or {}
+        self.failures = failures
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def execute_query(self, query_str, param=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latencies.get(query_str, 0.05))
+        with self.lock:
+            self.in_flight -= 1
+        if query_str in self.failures:
+            raise RuntimeError(f"{query_str} failed")
+
+    def release_connection(self):
+        pass
+
+
 class TestBenchmark(unittest.TestCase):
     def setUp(self):
         self.bm = benchmark.Benchmark()
@@ -72,6 +101,20 @@ class TestBenchmark(unittest.TestCase):
         # Assert that the actual output matches the expected output
         self.assertEqual(actual_output, expected_output)
 
+    def test_iter_queries_from_file_is_lazy(self):
+        # Define a test case
+        test_file_path = '../../examples/queries/q2.sql'
+        expected_output = [("--q02--\nselect 'q2', now();", 'q02', None)]
+
+        # The file is parsed as the queries are consumed
+        queries = self.bm._iter_queries_from_file(test_file_path)
+        self.assertEqual(next(queries), expected_output[0])
+
+        # Repeating a workload re-streams it instead of copying it
+        self.bm.setQueryRepeatCount(2)
+        workload = benchmark._Workload(lambda: self.bm._iter_queries_from_file(test_file_path))
+        self.assertEqual(list(self.bm._repeat_queries(workload)), expected_output * 2)
+
     def test_validate_warehouse(self):
         # Define a test case
         test_http_path = "/sql/1.0/warehouses/632c5da7a7fd6a78"
@@ -95,6 +138,101 @@ class TestBenchmark(unittest.TestCase):
         # Assert that the actual output matches the expected output
         self.assertEqual(actual_output2, expected_output2)
 
+    def test_continuous_scheduler_does_not_wait_for_stragglers(self):
+        # One slow query should not hold back the rest of the workload
+        queries = [("slow", "slow", None)] + [(f"q{i}", f"q{i}", None) for i in range(8)]
+        self.bm.sql_warehouse = FakeWarehouse(latencies={"slow": 0.2})
+        self.bm.warehouse_name = "unittest"
+        self.bm.setConcurrency(2)
+
+        self.bm.setScheduler("continuous")
+        start = time.perf_counter()
+        metrics = self.bm._execute_queries(queries, 2)
+        continuous_elapsed = time.perf_counter() - start
+
+        self.bm.setScheduler("bucketed")
+        start = time.perf_counter()
+        self.bm._execute_queries(queries, 2)
+        bucketed_elapsed = time.perf_counter() - start
+
+        self.assertEqual([m["id"] for m in metrics], [id for _, id, _ in queries])
+        self.assertEqual(self.bm.sql_warehouse.max_in_flight, 2)
+        self.assertLess(continuous_elapsed, bucketed_elapsed)
+
+    def test_failed_query_does_not_stop_its_worker(self):
+        queries = [(f"q{i}", f"q{i}", None) for i in range(41)]
+        self.bm.warehouse_name = "unittest"
+        for scheduler in ["continuous", "bucketed"]:
+            self.bm.sql_warehouse = FakeWarehouse(latencies={}, failures={"q3"})
+            self.bm.setScheduler(scheduler)
+            metrics = self.bm._execute_queries(queries, 2)
+
+            self.assertEqual([m["id"] for m in metrics], [id for _, id, _ in queries])
+            self.assertEqual([m["id"] for m in metrics if m["error"] is not None], ["q3"])
+            self.assertEqual(metrics[3]["error"], "q3 failed")
+            self.assertEqual(self.bm.sql_warehouse.max_in_flight, 2)
+
+    def test_warmup_runs_in_the_configured_mode(self):
+        queries = [(f"q{i}", f"q{i}", None) for i in range(3)]
+        self.bm.warehouse_name = "unittest"
+        self.bm.sql_warehouse = FakeWarehouse(latencies={})
+        self.bm.setWarmup(2)
+        self.bm.setArrivalRate(100)
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = self.bm._execute_warmup(queries)
+
+        self.assertEqual(len(metrics), 6)
+        self.assertTrue(all(m["warmup"] for m in metrics))
+        # Open-loop queries record when they were meant to start
+        self.assertTrue(all(m["intended_start_time"] is not None for m in metrics))
+        self.assertFalse(self.bm._warming_up)
+        self.assertEqual(self.bm.latency_recorder.overall()["count"], 0)
+
+    def test_setup_query_failure_raises(self):
+        self.bm.sql_warehouse = FakeWarehouse(failures={"USE CATALOG main"})
+        self.bm.setCatalog("main")
+        with self.assertRaises(RuntimeError):
+            self.bm._set_default_catalog()
+
+    def test_clean_query_history_joins_on_statement_id(self):
+        self.bm.warehouse_name = "unittest"
+        # The same query text runs twice, which a regex over the query text can't tell apart
+        metrics = [
+            {"id": "q1", "param": None, "query": "--q1--\nselect 1;", "elapsed_time": "1.000", "statement_id": "s1"},
+            {"id": "q1", "param": None, "query": "--q1--\nselect 1;", "elapsed_time": "2.000", "statement_id": "s2"},
+        ]
+        history = [
+            {"query_id": "s2", "query_text": "--q1--\nselect 1;", "duration": 1900},
+            {"query_id": "s1", "query_text": "--q1--\nselect 1;", "duration": 900},
+            {"query_id": "s0", "query_text": "USE CATALOG main", "duration": 10},
+        ]
+        self.bm.get_query_history = lambda warehouse_id, start_ts_ms, end_ts_ms: history
+
+        actual_output = self.bm._clean_query_history("abc", 0, 1, metrics)
+
+        self.assertEqual(len(actual_output), 2)
+        self.assertEqual(list(actual_output["duration"]), [900, 1900])
+        self.assertEqual(list(actual_output["elapsed_time"]), ["1.000", "2.000"])
+
+    def test_adaptive_repetition_stops_stable_queries(self):
+        queries = [("stable", "stable", None), ("noisy", "noisy", None)]
+        warehouse = FakeWarehouse(latencies={"stable": 0.01})
+        noisy_latencies = iter([0.01, 0.05, 0.02, 0.04, 0.01, 0.03] * 10)
+        stable_execute = warehouse.execute_query
+        warehouse.execute_query = lambda query_str, param=None: (
+            time.sleep(next(noisy_latencies)) if query_str == "noisy" else stable_execute(query_str, param)
+        )
+        self.bm.sql_warehouse = warehouse
+        self.bm.warehouse_name = "unittest"
+        self.bm.setAdaptiveRepetition(target_relative_ci=0.5, min_repetitions=3, max_repetitions=12)
+
+        metrics = self.bm._execute_queries(queries, 2)
+
+        runs = Counter(m["id"] for m in metrics)
+        self.assertEqual(runs["stable"], 3)
+        self.assertGreater(runs["noisy"], runs["stable"])
+        self.assertLessEqual(runs["noisy"], 12)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import threading
+
+sys.path.append("../")
+from beaker.connectionpool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query):
+        if not self.connection.healthy:
+            raise ConnectionError("session expired")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.healthy = True
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            connection = FakeConnection()
+            self.created.append(connection)
+            return connection
+
+        self.pool = ConnectionPool(factory, max_size=2, health_check_interval=0)
+
+    def test_acquire_reuses_released_connection(self):
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        pooled_again = self.pool.acquire()
+        self.assertIs(pooled.connection, pooled_again.connection)
+        self.assertEqual(len(self.created), 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        pooled = self.pool.acquire()
+        pooled.connection.healthy = False
+        self.pool.release(pooled)
+        pooled_again = self.pool.acquire()
+        self.assertIsNot(pooled.connection, pooled_again.connection)
+        self.assertTrue(pooled.connection.closed)
+
+    def test_lease_is_pinned_per_thread(self):
+        main_lease = self.pool.lease()
+        self.assertIs(self.pool.lease(), main_lease)
+
+        worker_leases = []
+        worker = threading.Thread(target=lambda: worker_leases.append(self.pool.lease()))
+        worker.start()
+        worker.join()
+        self.assertIsNot(worker_leases[0], main_lease)
+
+        # The dead worker's lease is reclaimed instead of growing past max_size
+        self.pool.end_lease()
+        self.pool.acquire()
+        self.pool.acquire()
+        self.assertEqual(len(self.created), 2)
+
+    def test_acquire_times_out_when_exhausted(self):
+        self.pool.acquire_timeout = 0.01
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(TimeoutError):
+            self.pool.acquire()
+
+    def test_idle_connections_are_evicted(self):
+        self.pool.max_idle_time = 0
+        pooled = self.pool.acquire()
+        self.pool.release(pooled)
+        self.pool.evict_idle()
+        self.assertTrue(pooled.connection.closed)
+        self.assertEqual(self.pool.stats()["size"], 0)
+
+    def test_resize(self):
+        self.pool.acquire_timeout = 0.01
+        first, second = self.pool.acquire(), self.pool.acquire()
+        self.pool.resize(3)
+        self.pool.acquire()
+        self.assertEqual(self.pool.stats()["max_size"], 3)
+
+        # Shrinking closes connections as they come back until the pool fits
+        self.pool.resize(1)
+        self.pool.release(first)
+        self.pool.release(second)
+        self.assertTrue(first.connection.closed)
+        self.assertTrue(second.connection.closed)
+        self.assertEqual(self.pool.stats()["size"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import sys
+import io
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.append("../")
+from beaker import benchmark, distributed
+from beaker.benchmark import Benchmark
+
+
+class FakeWarehouse:
+    def execute_query(self, query_str, param=None):
+        time.sleep(0.01)
+        return {"statement_id": f"stmt-{query_str}"}
+
+    def release_connection(self):
+        pass
+
+
+class ThreadExecutor(ThreadPoolExecutor):
+    """Runs the shards in threads, so a patched `run_shard` is used."""
+
+    def __init__(self, max_workers, mp_context=None):
+        super().__init__(max_workers=max_workers)
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self.queries = [(f"select {i}", f"q{i}", None) for i in range(7)]
+
+    def test_shard_queries(self):
+        shards = distributed.shard_queries(list(range(7)), 3)
+        self.assertEqual(shards, [[0, 3, 6], [1, 4], [2, 5]])
+
+    def test_merge_shard_metrics_with_uneven_shards(self):
+        # The first shard's arrival schedule ended one query early
+        shard_metrics = [[(0, "m0")], [(1, "m1"), (4, "m4")], [(2, "m2"), (5, "m5")]]
+        self.assertEqual(distributed.merge_shard_metrics(shard_metrics), ["m0", "m1", "m2", "m4", "m5"])
+
+    def test_run_distributed_merges_by_workload_index(self):
+        def fake_run_shard(worker_config, shard, start_at):
+            # Worker 0 runs one query fewer than it was given
+            if worker_config["worker_index"] == 0:
+                shard = shard[:-1]
+            return [(index, {"id": query[1]}) for index, query in shard]
+
+        worker_configs = [{"worker_index": i} for i in range(3)]
+        with mock.patch.object(distributed, "run_shard", fake_run_shard), \
+                mock.patch.object(distributed, "ProcessPoolExecutor", ThreadExecutor):
+            metrics = distributed.run_distributed(worker_configs, self.queries, start_delay=0)
+        self.assertEqual([m["id"] for m in metrics], ["q0", "q1", "q2", "q3", "q4", "q5"])
+
+    def test_run_shard_returns_workload_indices(self):
+        worker_config = {
+            "kwargs": {"name": "worker", "concurrency": 2},
+            "attributes": {"warehouse_id": "abc", "warehouse_name": "fake"},
+        }
+        shard = [(1, self.queries[1]), (4, self.queries[4])]
+        with mock.patch.object(Benchmark, "_create_dbc", lambda self: FakeWarehouse()):
+            pairs = distributed.run_shard(worker_config, shard, time.time())
+        self.assertEqual([index for index, _ in pairs], [1, 4])
+        self.assertEqual([metrics["id"] for _, metrics in pairs], ["q1", "q4"])
+        self.assertIsInstance(pairs[0][1], dict)
+
+    def test_distributed_latencies_keep_worker_end_times(self):
+        # 100 one-second queries, ten at a time over ten seconds
+        start = time.time()
+        metrics_list = [
+            {"id": "q", "param": None, "elapsed_time": 1.0, "end_time": start + 1 + i // 10, "error": None}
+            for i in range(100)
+        ]
+        bm = Benchmark(concurrency=10)
+        bm.setWarehouseRegistry(None)
+        bm.warehouse_id, bm.warehouse_name = "abc", "fake"
+        bm.setDistributed(2)
+        with mock.patch.object(benchmark, "run_distributed", lambda *args, **kwargs: metrics_list):
+            rows = bm._execute_queries_distributed([])
+        self.assertEqual(len(rows), 100)
+        self.assertEqual(rows[0]["end_time"], start + 1)
+        self.assertAlmostEqual(bm.getLatencySummary(overall=True)["throughput_qps"][0], 10, delta=0.5)
+
+    def test_distributed_warmup_is_tagged(self):
+        metrics_list = [{"id": "q", "param": None, "elapsed_time": 1.0, "end_time": time.time(), "error": None}] * 4
+        bm = Benchmark(concurrency=2)
+        bm.setWarehouseRegistry(None)
+        bm.warehouse_id, bm.warehouse_name = "abc", "fake"
+        bm.setDistributed(2)
+        bm.setWarmup(1)
+        with mock.patch.object(benchmark, "run_distributed", lambda *args, **kwargs: metrics_list), \
+                contextlib.redirect_stdout(io.StringIO()):
+            rows = bm._execute_warmup([("select 1", "q", None)])
+        self.assertTrue(all(row["warmup"] for row in rows))
+        self.assertEqual(bm.latency_recorder.overall()["count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import random
+
+sys.path.append("../")
+from beaker.histogram import LatencyHistogram, LatencyRecorder
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_precision(self):
+        rng = random.Random(42)
+        values = sorted(rng.lognormvariate(0, 1) for _ in range(10000))
+        histogram = LatencyHistogram(significant_digits=2)
+        for value in values:
+            histogram.record(value)
+
+        for percentile in [50, 90, 99, 99.9]:
+            expected = values[int(percentile / 100 * len(values)) - 1]
+            self.assertAlmostEqual(histogram.percentile(percentile), expected, delta=expected * 0.01)
+        self.assertAlmostEqual(histogram.max / 1_000_000, values[-1], places=6)
+
+    def test_merge(self):
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1, 101):
+            (first if i % 2 else second).record(i / 100)
+            combined.record(i / 100)
+
+        first.merge(second)
+        self.assertEqual(first.counts, combined.counts)
+        self.assertEqual(first.percentile(99), combined.percentile(99))
+
+    def test_memory_is_bounded(self):
+        histogram = LatencyHistogram(significant_digits=2)
+        for i in range(100000):
+            histogram.record(i / 1000)
+        self.assertLess(len(histogram.counts), 2000)
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    def test_summary_is_keyed_by_id_param_and_concurrency(self):
+        recorder = LatencyRecorder()
+        recorder.record("q1", {"x": 1}, 4, 0.5, end_time=10)
+        recorder.record("q1", {"x": 1}, 4, 1.5, end_time=11)
+        recorder.record("q1", {"x": 2}, 4, 1.0, end_time=11)
+
+        rows = {row["param"]: row for row in recorder.summary()}
+        self.assertEqual(rows['{"x": 1}']["count"], 2)
+        self.assertAlmostEqual(rows['{"x": 1}']["max"], 1.5)
+        self.assertEqual(recorder.overall()["count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.append("../")
+from beaker.benchmark import Benchmark
+from beaker.backends import SQLiteBackend
+from beaker.hooks import BenchmarkHook, HookDispatcher, InMemorySink, JSONLinesSink, PrometheusSink
+
+
+class SlowHook(BenchmarkHook):
+    def __init__(self):
+        self.release = threading.Event()
+        self.completed = 0
+
+    def on_query_complete(self, event):
+        self.release.wait(5)
+        self.completed += 1
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        backend = SQLiteBackend(database="file:beaker_hooks?mode=memory&cache=shared")
+        self.bm = Benchmark(query="select 1", concurrency=2, query_repeat_count=5, backend=backend)
+        self.bm.setWarehouseRegistry(None)
+
+    def tearDown(self):
+        self.bm.clearHooks()
+        self.tmp_dir.cleanup()
+
+    def test_emit_never_blocks_and_drops_when_full(self):
+        hook = SlowHook()
+        dispatcher = HookDispatcher([hook], max_queue_size=2)
+        start = time.perf_counter()
+        for i in range(10):
+            dispatcher.emit("on_query_complete", {"id": i})
+        self.assertLess(time.perf_counter() - start, 0.5)
+        hook.release.set()
+        dispatcher.close()
+        # One event is being handled while the queue holds two more
+        self.assertEqual(hook.completed + dispatcher.dropped, 10)
+        self.assertGreater(dispatcher.dropped, 0)
+
+    def test_in_memory_sink_aggregates_a_run(self):
+        sink = InMemorySink()
+        self.bm.addHook(sink)
+        self.bm.execute()
+        self.assertEqual(sink.counts["on_run_start"], 1)
+        self.assertEqual(sink.counts["on_query_complete"], 5)
+        self.assertEqual(sink.counts["on_run_end"], 1)
+        self.assertEqual(sink.in_flight, 0)
+        self.assertEqual(sink.summary()[0]["count"], 5)
+        self.assertTrue(all(event["run_id"] == self.bm.run_id for event in sink.events))
+
+    def test_errors_are_reported(self):
+        sink = InMemorySink()
+        self.bm.addHook(sink)
+        self.bm.setQuery("select * from missing_table")
+        self.bm.execute()
+        self.assertEqual(sink.counts["on_error"], 5)
+        self.assertEqual(sink.events[-1]["status"], "completed")
+        self.assertEqual(sink.events[-1]["num_failed"], 5)
+        self.assertEqual(sink.summary()[0]["errors"], 5)
+
+    def test_failed_run_is_reported(self):
+        sink = InMemorySink()
+        self.bm.addHook(sink)
+
+        def fail(*args):
+            raise RuntimeError("history unavailable")
+
+        self.bm.get_query_history = fail
+        with self.assertRaises(RuntimeError):
+            self.bm.execute()
+        self.assertEqual(sink.events[-1]["status"], "failed")
+
+    def test_json_lines_sink(self):
+        path = os.path.join(self.tmp_dir.name, "events.jsonl")
+        self.bm.addHook(JSONLinesSink(path))
+        self.bm.execute()
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(events[0]["event"], "on_run_start")
+        self.assertEqual(events[-1]["event"], "on_run_end")
+        self.assertEqual(len([e for e in events if e["event"] == "on_query_complete"]), 5)
+
+    def test_prometheus_sink(self):
+        sink = PrometheusSink(port=0)
+        self.bm.addHook(sink)
+        self.bm.execute()
+        body = urllib.request.urlopen(f"http://127.0.0.1:{sink.port}/metrics").read().decode("utf-8")
+        self.assertIn('beaker_queries_total{id="query"} 5', body)
+        self.assertIn('beaker_query_latency_seconds{id="query",quantile="0.99"}', body)
+        self.assertIn("beaker_queries_in_flight 0", body)
+
+
+if __name__ == '__main__':
+    unittest.main()
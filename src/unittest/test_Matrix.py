@@ -0,0 +1,91 @@
+import unittest
+import sys
+import threading
+from unittest import mock
+
+import pandas as pd
+
+sys.path.append("../")
+from beaker import benchmark, matrix
+from beaker.hooks import InMemorySink
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+
+class TestMatrix(unittest.TestCase):
+    def setUp(self):
+        self.bm = benchmark.Benchmark(db_hostname="example.cloud.databricks.com", token="token")
+        self.bm.setWarehouseRegistry(None)
+        self.created = []
+        self.waiting = 0
+        self.max_waiting = 0
+        self.lock = threading.Lock()
+        self.all_waiting = threading.Barrier(3, timeout=5)
+
+    # Bound methods aren't rebound when patched onto a class, so the patches take no self
+    def _create(self, config):
+        self.created.append(config["name"])
+        return f"{len(self.created):x}"
+
+    def _wait(self, warehouse_id):
+        # Only passes once every warehouse is starting at the same time
+        self.all_waiting.wait()
+        return 0
+
+    @staticmethod
+    def _execute(clone):
+        return pd.DataFrame([{"id": "q1", "warehouse_id": clone.warehouse_id}])
+
+    def test_run_matrix_provisions_in_parallel_and_stops_warehouses(self):
+        configs = [{"size": "Small"}, {"size": "Medium"}, {"size": "Large"}]
+        with mock.patch.object(SQLWarehouseUtils, "create_warehouse", self._create), \
+                mock.patch.object(SQLWarehouseUtils, "wait_for_warehouse", self._wait), \
+                mock.patch.object(benchmark.Benchmark, "_get_warehouse_info", lambda bm: f"wh-{bm.warehouse_id}"), \
+                mock.patch.object(benchmark.Benchmark, "execute", self._execute), \
+                mock.patch.object(benchmark.Benchmark, "stop_warehouse") as stop_warehouse:
+            result_pdf = self.bm.runMatrix(configs)
+
+        self.assertEqual(len(set(self.created)), 3)
+        self.assertEqual(list(result_pdf["warehouse_id"]), ["1", "2", "3"])
+        self.assertEqual(list(result_pdf["config_index"]), [0, 1, 2])
+        self.assertEqual(result_pdf["warehouse_config"][1], '{"size": "Medium"}')
+        self.assertEqual(sorted(call.args[0] for call in stop_warehouse.call_args_list), ["1", "2", "3"])
+        self.assertEqual(self.bm.matrix_benchmarks[2].http_path, "/sql/1.0/warehouses/3")
+
+    def test_failed_warehouse_is_skipped_but_stopped(self):
+        def wait(warehouse_id):
+            if warehouse_id == "2":
+                raise TimeoutError("warehouse did not start")
+            return 0
+
+        configs = [{"size": "Small"}, {"size": "Medium"}]
+        with mock.patch.object(SQLWarehouseUtils, "create_warehouse", self._create), \
+                mock.patch.object(SQLWarehouseUtils, "wait_for_warehouse", staticmethod(wait)), \
+                mock.patch.object(benchmark.Benchmark, "_get_warehouse_info", lambda bm: "wh"), \
+                mock.patch.object(benchmark.Benchmark, "execute", self._execute), \
+                mock.patch.object(benchmark.Benchmark, "stop_warehouse") as stop_warehouse:
+            result_pdf = matrix.run_matrix(self.bm, configs, concurrent=True)
+
+        self.assertEqual(list(result_pdf["warehouse_id"]), ["1"])
+        self.assertEqual(sorted(call.args[0] for call in stop_warehouse.call_args_list), ["1", "2"])
+
+    def test_clones_stop_and_report_progress_on_their_own(self):
+        progress = self.bm.setLiveProgress(slo_p95=1.0, min_samples=5)
+        sink = InMemorySink()
+        self.bm.addHook(sink)
+        with mock.patch.object(benchmark.Benchmark, "_get_warehouse_info", lambda bm: "wh"), \
+                mock.patch.object(benchmark.Benchmark, "_create_dbc", lambda bm: None):
+            clones = [matrix._benchmark_on_warehouse(self.bm, warehouse_id) for warehouse_id in ["1", "2"]]
+
+        clones[0].hooks[0].on_breach("p95 too high")
+        self.assertTrue(clones[0]._stop_event.is_set())
+        self.assertFalse(clones[1]._stop_event.is_set())
+        self.assertFalse(self.bm._stop_event.is_set())
+        self.assertIsNot(clones[0].hooks[0], progress)
+        self.assertIsNot(clones[0].hooks[0], clones[1].hooks[0])
+        self.assertEqual(clones[1].hooks[0].slo_p95, 1.0)
+        self.assertIs(clones[1].hooks[1], sink)
+        self.bm.clearHooks()
+
+
+if __name__ == '__main__':
+    unittest.main()
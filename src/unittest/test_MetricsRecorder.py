@@ -0,0 +1,80 @@
+import unittest
+import sys
+
+import numpy as np
+
+sys.path.append("../")
+from beaker.metricsrecorder import MetricsRecorder
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    def setUp(self):
+        self.recorder = MetricsRecorder(initial_capacity=2, hostname="host", warehouse_name="wh", concurrency=4)
+        for i in range(5):
+            self.recorder.record(
+                id=f"q{i % 2}",
+                param={"x": i % 2},
+                query=f"select {i % 2}",
+                elapsed_time=0.5 * i,
+                statement_id=f"s{i}",
+                warmup=i == 0,
+                result_rows=10 if i % 2 else None,
+            )
+
+    def test_rows_read_like_dicts(self):
+        row = self.recorder.record(id="q9", param=None, query="select 9", elapsed_time=1.25, unknown="ignored")
+        self.assertEqual(row["elapsed_time"], 1.25)
+        self.assertEqual(row["hostname"], "host")
+        self.assertIsNone(row["statement_id"])
+        self.assertIsNone(row["result_rows"])
+        self.assertEqual(dict(row)["concurrency"], 4)
+        self.assertNotIn("unknown", dict(row))
+        self.assertEqual(len(self.recorder), 6)
+
+    def test_text_is_dictionary_encoded(self):
+        # Five queries, but only two distinct ids, params and query texts
+        self.assertEqual(self.recorder._dictionaries["query"], ["select 0", "select 1"])
+        self.assertEqual(self.recorder._dictionaries["param"], [{"x": 0}, {"x": 1}])
+
+    def test_to_pandas_shares_numeric_columns(self):
+        pdf = self.recorder.to_pandas()
+        self.assertEqual(len(pdf), 5)
+        self.assertEqual(pdf["elapsed_time"].dtype, np.float64)
+        self.assertTrue(np.shares_memory(pdf["elapsed_time"].to_numpy(), self.recorder._floats["elapsed_time"]))
+        self.assertEqual(list(pdf["id"]), ["q0", "q1", "q0", "q1", "q0"])
+        self.assertEqual(list(pdf["param"]), [{"x": 0}, {"x": 1}, {"x": 0}, {"x": 1}, {"x": 0}])
+        self.assertEqual(list(pdf["warehouse_name"]), ["wh"] * 5)
+        self.assertEqual(pdf["result_rows"].isna().tolist(), [True, False, True, False, True])
+        self.assertEqual(list(pdf["warmup"]), [True, False, False, False, False])
+        self.assertNotIn("start_delay", pdf.columns)
+
+    def test_to_pandas_keeps_working_while_recording(self):
+        pdf = self.recorder.to_pandas()
+        for _ in range(10):
+            self.recorder.record(id="q0", query="select 0", elapsed_time=9.0)
+        self.assertEqual(list(pdf["elapsed_time"]), [0.0, 0.5, 1.0, 1.5, 2.0])
+        self.assertEqual(len(self.recorder.to_pandas()), 15)
+
+    def test_to_pandas_selects_rows(self):
+        pdf = self.recorder.to_pandas(rows=[3, 1])
+        self.assertEqual(list(pdf["statement_id"]), ["s3", "s1"])
+        self.assertEqual(list(pdf["elapsed_time"]), [1.5, 0.5])
+
+    def test_open_loop_columns(self):
+        self.recorder.record(id="q0", query="select 0", elapsed_time=1.0, intended_start_time=100.0, start_delay=0.25)
+        pdf = self.recorder.to_pandas()
+        self.assertEqual(pdf["start_delay"].isna().sum(), 5)
+        self.assertEqual(pdf["start_delay"].iloc[-1], 0.25)
+
+    def test_to_arrow(self):
+        table = self.recorder.to_arrow()
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column_names, self.recorder.columns())
+        self.assertEqual(table.column("id").to_pylist(), ["q0", "q1", "q0", "q1", "q0"])
+        self.assertEqual(table.column("param").to_pylist()[1], '{"x": 1}')
+        self.assertEqual(table.column("result_rows").to_pylist(), [None, 10, None, 10, None])
+        self.assertEqual(table.column("elapsed_time").to_pylist(), [0.0, 0.5, 1.0, 1.5, 2.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import random
+import statistics
+
+sys.path.append("../")
+from beaker.benchmark import Benchmark
+from beaker.mock import mock_databricks, latency_sampler, MockWorkspace
+from beaker.queryhistory import QueryHistoryFetcher
+
+
+class TestMock(unittest.TestCase):
+    def _benchmark(self, workspace, **kwargs):
+        bm = Benchmark(db_hostname=workspace.hostname, token="mock", **kwargs)
+        bm.setWarehouseRegistry(None)
+        bm.setWarehouse(workspace.http_path)
+        return bm
+
+    def test_latency_sampler(self):
+        self.assertEqual(latency_sampler(0.1)(), 0.1)
+        draw = latency_sampler({"distribution": "lognormal", "median": 0.1, "sigma": 0.5}, random.Random(7))
+        samples = [draw() for _ in range(2000)]
+        self.assertAlmostEqual(statistics.median(samples), 0.1, delta=0.01)
+        draw = latency_sampler({"distribution": "normal", "mean": 0, "stddev": 1}, random.Random(7))
+        self.assertTrue(all(draw() >= 0 for _ in range(100)))
+        with self.assertRaises(AssertionError):
+            latency_sampler({"distribution": "pareto"})
+
+    def test_execute_offline_measures_configured_latency(self):
+        with mock_databricks(latency=0.05, query_latencies={"^USE ": 0}) as workspace:
+            bm = self._benchmark(workspace, query="select 1", concurrency=4, query_repeat_count=12)
+            result_pdf = bm.execute()
+        self.assertEqual(len(result_pdf), 12)
+        # Every client row is joined with its server-side history entry
+        self.assertTrue(result_pdf["query_id"].notna().all())
+        elapsed = result_pdf["elapsed_time"].astype(float)
+        self.assertTrue(((elapsed >= 0.05) & (elapsed < 0.15)).all())
+
+    def test_documented_example(self):
+        with mock_databricks(latency=0.01) as workspace:
+            benchmark = Benchmark(query="select 1", db_hostname=workspace.hostname,
+                                  warehouse_http_path=workspace.http_path, token="mock")
+            benchmark.setWarehouseRegistry(None)
+            benchmark.setWarehouse(workspace.http_path)
+            metrics = benchmark.execute()
+        self.assertEqual(len(metrics), 1)
+
+    def test_execute_offline_with_async_engine(self):
+        with mock_databricks(latency=0.02) as workspace:
+            bm = self._benchmark(workspace, query="select 1", concurrency=4, query_repeat_count=8, engine="async")
+            result_pdf = bm.execute()
+        self.assertEqual(len(result_pdf), 8)
+        self.assertTrue(result_pdf["query_id"].notna().all())
+
+    def test_async_engine_rejects_fetching(self):
+        with mock_databricks(latency=0.01) as workspace:
+            bm = self._benchmark(workspace, query="select 1", engine="async", fetch_mode="arrow")
+            with self.assertRaises(AssertionError):
+                bm.execute()
+
+    def test_execute_offline_pooled(self):
+        with mock_databricks(latency=0.01) as workspace:
+            bm = self._benchmark(workspace, query="select 1", concurrency=1, query_repeat_count=4, connection_mode="pooled")
+            bm.sql_warehouse = bm._create_dbc()
+            # A starved worker fails instead of hanging the test
+            bm.sql_warehouse._get_pool().acquire_timeout = 5
+            # USE CATALOG/SCHEMA hand their session back, so the single worker isn't starved
+            result_pdf = bm.execute()
+            self.assertEqual(len(result_pdf), 4)
+            self.assertEqual(bm.sql_warehouse._pool.stats()["leased"], 0)
+
+            # Raising the concurrency grows the pool, as a concurrency sweep does
+            bm.setConcurrency(4)
+            bm.setQueryRepeatCount(8)
+            self.assertEqual(len(bm.execute()), 8)
+            self.assertEqual(bm.sql_warehouse._pool.stats()["max_size"], 4)
+            self.assertLessEqual(bm.sql_warehouse._pool.stats()["size"], 4)
+            bm.sql_warehouse.close_connections()
+
+    def test_execute_offline_open_loop_pooled(self):
+        with mock_databricks(latency=0.05, query_latencies={"^USE ": 0}) as workspace:
+            bm = self._benchmark(workspace, query="select 1", query_repeat_count=100, connection_mode="pooled")
+            bm.setArrivalRate(200, max_in_flight=32)
+            bm.sql_warehouse = bm._create_dbc()
+            result_pdf = bm.execute()
+            # The pool holds a session per query in flight, not per (ignored) concurrent worker
+            self.assertEqual(bm.sql_warehouse._pool.stats()["max_size"], 32)
+            bm.sql_warehouse.close_connections()
+        self.assertEqual(len(result_pdf), 100)
+        # Queries start on schedule instead of queueing for a session
+        self.assertLess(result_pdf["start_delay"].max(), 0.1)
+        self.assertLess(result_pdf["elapsed_time"].astype(float).mean(), 0.1)
+        self.assertLess(result_pdf["elapsed_time"].astype(float).max(), 0.3)
+
+    def test_launch_and_stop_warehouse(self):
+        with mock_databricks(startup_latency=0) as workspace:
+            bm = Benchmark(db_hostname=workspace.hostname, token="mock")
+            bm.setWarehouseRegistry(None)
+            bm.setWarehouseConfig({"name": "bench", "size": "Small"})
+            self.assertEqual(workspace.warehouses[bm.warehouse_id]["state"], "RUNNING")
+            self.assertEqual(bm.warehouse_name, "bench")
+            self.assertEqual(bm.stop_warehouse(bm.warehouse_id), 200)
+            self.assertEqual(workspace.warehouses[bm.warehouse_id]["state"], "STOPPED")
+
+    def test_query_history_pages(self):
+        workspace = MockWorkspace(latency=0, page_size=3)
+        for i in range(10):
+            workspace.run_statement(f"select {i}")
+        with workspace.patch():
+            history = QueryHistoryFetcher(workspace.hostname, "mock").fetch(
+                [workspace.warehouse_id], [workspace.user_id], 0, 2 ** 62
+            )
+        self.assertEqual([query["query_text"] for query in history], [f"select {i}" for i in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
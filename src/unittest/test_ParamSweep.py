@@ -0,0 +1,63 @@
+import unittest
+import sys
+from collections import Counter
+
+sys.path.append("../")
+from beaker.paramsweep import generate_bindings
+
+
+class TestParamSweep(unittest.TestCase):
+    def test_literal_params_pass_through(self):
+        params = [{"x": 1}, {"x": 2}]
+        self.assertEqual(list(generate_bindings(params)), params)
+
+    def test_cartesian(self):
+        spec = {
+            "strategy": "cartesian",
+            "domains": {
+                "segment": {"type": "values", "values": ["A", "B"]},
+                "quantity": {"type": "range", "start": 0.1, "stop": 0.3, "step": 0.1},
+                "day": {"type": "date_range", "start": "1995-01-01", "end": "1995-01-08", "step_days": 7},
+            },
+        }
+        bindings = list(generate_bindings(spec))
+        self.assertEqual(len(bindings), 2 * 3 * 2)
+        self.assertEqual(bindings[-1]["day"], "1995-01-08")
+
+    def test_latin_hypercube_covers_every_stratum(self):
+        spec = {
+            "strategy": "latin_hypercube",
+            "samples": 10,
+            "seed": 1,
+            "domains": {
+                "x": {"type": "uniform", "low": 0, "high": 10},
+                "y": {"type": "range", "start": 0, "stop": 9},
+            },
+        }
+        bindings = list(generate_bindings(spec))
+        self.assertEqual(sorted(int(b["x"]) for b in bindings), list(range(10)))
+        self.assertEqual(sorted(b["y"] for b in bindings), list(range(10)))
+
+    def test_zipf_is_skewed_towards_first_values(self):
+        spec = {
+            "strategy": "zipf",
+            "samples": 2000,
+            "seed": 3,
+            "domains": {"k": {"type": "range", "start": 1, "stop": 100}},
+        }
+        counts = Counter(b["k"] for b in generate_bindings(spec))
+        self.assertGreater(counts[1], counts[2])
+        self.assertGreater(counts[2], counts[50])
+
+    def test_random_is_reproducible(self):
+        spec = {
+            "strategy": "random",
+            "samples": 5,
+            "seed": 7,
+            "domains": {"price": {"type": "normal", "mean": 100, "stddev": 10, "low": 0}},
+        }
+        self.assertEqual(list(generate_bindings(spec)), list(generate_bindings(spec)))
+
+
+if __name__ == '__main__':
+    unittest.main()
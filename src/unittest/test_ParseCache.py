@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.append("../")
+from beaker.parsecache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp_dir.name, "cache"))
+        self.sql_path = os.path.join(self.tmp_dir.name, "q1.sql")
+        with open(self.sql_path, "w") as f:
+            f.write("--q1--\nselect 1;")
+        self.parse_calls = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def parse(self, path):
+        self.parse_calls += 1
+        with open(path) as f:
+            return [["q1", f.read()]]
+
+    def test_unchanged_file_is_not_reparsed(self):
+        first = self.cache.get(self.sql_path, self.parse)
+        second = self.cache.get(self.sql_path, self.parse)
+        self.assertEqual(first, second)
+        self.assertEqual(self.parse_calls, 1)
+
+    def test_touched_file_is_not_reparsed(self):
+        self.cache.get(self.sql_path, self.parse)
+        stat = os.stat(self.sql_path)
+        os.utime(self.sql_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.cache.get(self.sql_path, self.parse)
+        self.assertEqual(self.parse_calls, 1)
+
+    def test_modified_file_is_reparsed(self):
+        self.cache.get(self.sql_path, self.parse)
+        with open(self.sql_path, "w") as f:
+            f.write("--q1--\nselect 2;")
+        stat = os.stat(self.sql_path)
+        os.utime(self.sql_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        value = self.cache.get(self.sql_path, self.parse)
+        self.assertEqual(self.parse_calls, 2)
+        self.assertEqual(value, [["q1", "--q1--\nselect 2;"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import sys
+import threading
+import time
+from unittest import mock
+
+import pandas as pd
+
+sys.path.append("../")
+from beaker import benchmark
+from beaker.prewarm import bind_params, references_table, table_aliases, touched_columns, partition_filter, warm_statement
+
+
+class FakeWarehouse:
+    """Stands in for SQLWarehouseUtils, answering metadata queries for a partitioned `sales` table."""
+
+    def __init__(self):
+        self.statements = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def execute_query(self, query_str, param=None):
+        with self.lock:
+            self.statements.append(query_str)
+            statement_id = f"stmt-{len(self.statements)}"
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05 if query_str.startswith("CACHE") else 0)
+        with self.lock:
+            self.in_flight -= 1
+        return {"statement_id": statement_id}
+
+    def fetch_all(self, query_str, param=None):
+        if "missing" in query_str:
+            raise RuntimeError("TABLE_OR_VIEW_NOT_FOUND")
+        if query_str.startswith("DESCRIBE DETAIL"):
+            return ["name", "partitionColumns"], [("sales", ["sale_date"])]
+        return ["sale_date", "store_id", "amount", "comment"], []
+
+    def release_connection(self):
+        pass
+
+
+class TestPreWarm(unittest.TestCase):
+    def test_bind_params(self):
+        query = "select * from t where d = :d and n > :n and x::int = 1"
+        self.assertEqual(
+            bind_params(query, {"d": "it's", "n": 5}),
+            "select * from t where d = 'it''s' and n > 5 and x::int = 1",
+        )
+
+    def test_references_table(self):
+        self.assertTrue(references_table("select * from main.tpch.lineitem l", "lineitem"))
+        self.assertTrue(references_table("select * from lineitem", "tpch.lineitem"))
+        self.assertFalse(references_table("select * from lineitem_archive", "lineitem"))
+
+    def test_touched_columns(self):
+        columns = ["sale_date", "store_id", "amount", "comment"]
+        self.assertEqual(touched_columns(["select store_id, sum(amount) from sales group by 1"], columns), ["store_id", "amount"])
+        self.assertEqual(touched_columns(["select count(*), sum(amount) from sales"], columns), ["amount"])
+        self.assertIsNone(touched_columns(["select * from sales"], columns))
+
+    def test_partition_filter(self):
+        self.assertEqual(
+            partition_filter(
+                [
+                    "select * from sales where sale_date = '2024-01-01' and amount > 3",
+                    "select * from sales where sale_date BETWEEN '2024-02-01' and '2024-02-07'",
+                    "select * from sales s where s.sale_date in ('2024-03-01', '2024-03-02')",
+                ],
+                ["sale_date"],
+            ),
+            "(sale_date = '2024-01-01') OR (sale_date BETWEEN '2024-02-01' and '2024-02-07') "
+            "OR (sale_date IN ('2024-03-01', '2024-03-02'))",
+        )
+        # One query reading every partition means the whole table is needed
+        self.assertIsNone(
+            partition_filter(["select * from sales where sale_date = '2024-01-01'", "select * from sales"], ["sale_date"])
+        )
+        self.assertIsNone(partition_filter(["select * from sales where sale_date = '2024-01-01' or amount > 3"], ["sale_date"]))
+
+    def test_partition_filter_ignores_other_tables(self):
+        query = (
+            "select * from main.bench.sales AS s join dates d on s.date_id = d.id "
+            "where d.sale_date = '2020-01-01' and s.sale_date = '2024-01-01'"
+        )
+        self.assertEqual(table_aliases(query, "sales"), {"sales", "s"})
+        self.assertEqual(partition_filter([query], ["sale_date"], "sales"), "sale_date = '2024-01-01'")
+        # Only the joined table is filtered, so every partition of sales is needed
+        query = "select * from sales join dates d on sales.date_id = d.id where d.sale_date = '2020-01-01'"
+        self.assertIsNone(partition_filter([query], ["sale_date"], "sales"))
+        query = "select * from sales where sales.sale_date = '2024-01-01'"
+        self.assertEqual(partition_filter([query], ["sale_date"], "sales"), "sale_date = '2024-01-01'")
+
+    def test_warm_statement(self):
+        self.assertEqual(warm_statement("sales"), "CACHE SELECT * FROM sales")
+        self.assertEqual(
+            warm_statement("sales", ["amount"], "sale_date = '2024-01-01'"),
+            "CACHE SELECT amount FROM sales WHERE sale_date = '2024-01-01'",
+        )
+
+    def test_pre_warm_tables_in_parallel(self):
+        bm = benchmark.Benchmark(warehouse_http_path="/sql/1.0/warehouses/abc", catalog=None, schema=None)
+        bm.setWarehouseRegistry(None)
+        bm.warehouse_id, bm.warehouse_name = "abc", "wh"
+        bm.sql_warehouse = FakeWarehouse()
+        bm.catalog = "main"
+        history = [{"query_id": "stmt-2", "metrics": {"read_bytes": 1024}}]
+        with mock.patch.object(benchmark.Benchmark, "get_query_history", return_value=history):
+            warm_pdf = bm.preWarmTables([f"table_{i}" for i in range(6)], concurrency=3)
+        self.assertEqual(bm.sql_warehouse.max_in_flight, 3)
+        self.assertEqual(len(warm_pdf), 6)
+        self.assertTrue(warm_pdf["elapsed_time"].notna().all())
+        self.assertEqual(warm_pdf["read_bytes"].dropna().tolist(), [1024])
+
+    def test_pre_warm_workload_only(self):
+        bm = benchmark.Benchmark(
+            query="select store_id, sum(amount) from sales where sale_date = :d group by 1",
+            warehouse_http_path="/sql/1.0/warehouses/abc",
+            catalog=None,
+            schema=None,
+        )
+        bm.setWarehouseRegistry(None)
+        bm.warehouse_id, bm.warehouse_name = "abc", "wh"
+        bm.sql_warehouse = FakeWarehouse()
+        bm.catalog = "main"
+        with mock.patch.object(benchmark.Benchmark, "_get_workload", return_value=[(bm.query, "q1", {"d": "2024-01-01"})]), \
+                mock.patch.object(benchmark.Benchmark, "get_query_history", return_value=[]):
+            warm_pdf = bm.preWarmTables(["sales", "customers"], workload_only=True)
+        self.assertEqual(
+            warm_pdf["statement"].tolist(),
+            ["CACHE SELECT sale_date, store_id, amount FROM sales WHERE sale_date = '2024-01-01'"],
+        )
+
+    def test_pre_warm_workload_only_reports_failing_tables(self):
+        bm = benchmark.Benchmark(
+            query="select * from missing join sales using (id) where sale_date = '2024-01-01'",
+            warehouse_http_path="/sql/1.0/warehouses/abc",
+            catalog=None,
+            schema=None,
+        )
+        bm.setWarehouseRegistry(None)
+        bm.warehouse_id, bm.warehouse_name = "abc", "wh"
+        bm.sql_warehouse = FakeWarehouse()
+        bm.catalog = "main"
+        with mock.patch.object(benchmark.Benchmark, "_get_workload", return_value=[(bm.query, "q1", None)]), \
+                mock.patch.object(benchmark.Benchmark, "get_query_history", return_value=[]):
+            warm_pdf = bm.preWarmTables(["missing", "sales"], workload_only=True)
+        self.assertEqual(warm_pdf["table"].tolist(), ["missing", "sales"])
+        self.assertEqual(warm_pdf["error"].tolist()[0], "TABLE_OR_VIEW_NOT_FOUND")
+        self.assertTrue(pd.isna(warm_pdf["error"].tolist()[1]))
+        self.assertEqual(warm_pdf["statement"].tolist()[1], "CACHE SELECT * FROM sales WHERE sale_date = '2024-01-01'")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import sys
+import io
+import contextlib
+import time
+from unittest import mock
+
+sys.path.append("../")
+from beaker.benchmark import Benchmark
+from beaker.backends import SQLiteBackend
+from beaker.hooks import InMemorySink
+from beaker.progress import LiveProgress
+
+# Takes a few milliseconds on SQLite, so a run of many of them is long enough to stop
+SLOW_QUERY = (
+    "with recursive n(i) as (select 1 union all select i + 1 from n where i < 20000) "
+    "select count(*) from n"
+)
+
+
+class TestLiveProgress(unittest.TestCase):
+    def setUp(self):
+        self.breaches = []
+        self.progress = LiveProgress(
+            window=10, slo_p95=1.0, slo_error_rate=0.5, min_samples=4, on_breach=self.breaches.append
+        )
+        self.progress._run_start = 1000.0
+
+    def complete(self, end_time, elapsed_time):
+        self.progress.on_query_submit({"time": end_time})
+        self.progress.on_query_complete({"time": end_time, "elapsed_time": elapsed_time})
+
+    def test_rolling_stats(self):
+        for i in range(10):
+            self.complete(1001.0 + i, 0.1 * (i + 1))
+        self.progress.on_query_submit({"time": 1010.5})
+        stats = self.progress.stats(now=1011.0)
+        self.assertEqual(stats["completed"], 10)
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertAlmostEqual(stats["qps"], 1.0)
+        self.assertEqual(stats["error_rate"], 0.0)
+        self.assertAlmostEqual(stats["p95"], 1.0)
+        # Queries older than the window drop out of the rolling statistics
+        stats = self.progress.stats(now=1015.5)
+        self.assertEqual(stats["samples"], 5)
+        self.assertAlmostEqual(stats["p95"], 1.0)
+        self.assertEqual(stats["completed"], 10)
+
+    def test_slos_need_min_samples(self):
+        self.progress._run_start = 0.0
+        for _ in range(3):
+            self.complete(1000.0, 5.0)
+        self.progress.stats(now=1000.0)
+        self.assertEqual(self.breaches, [])
+
+    def test_p95_breach_is_reported_once(self):
+        now = time.time()
+        for _ in range(6):
+            self.complete(now, 5.0)
+        self.assertEqual(len(self.breaches), 1)
+        self.assertIn("p95", self.breaches[0])
+        self.assertEqual(self.progress.breach, self.breaches[0])
+
+    def test_error_rate_breach(self):
+        now = time.time()
+        for _ in range(4):
+            self.progress.on_error({"time": now})
+        self.assertEqual(len(self.breaches), 1)
+        self.assertIn("error rate", self.breaches[0])
+
+    def test_warmup_is_ignored(self):
+        now = time.time()
+        for _ in range(6):
+            self.progress.on_query_submit({"time": now, "warmup": True})
+            self.progress.on_query_complete({"time": now, "elapsed_time": 5.0, "warmup": True})
+            self.progress.on_error({"time": now, "warmup": True})
+        self.assertEqual(self.breaches, [])
+        self.assertEqual(self.progress.stats(now=now)["completed"], 0)
+        self.assertEqual(self.progress.stats(now=now)["in_flight"], 0)
+
+
+class TestStopRun(unittest.TestCase):
+    def setUp(self):
+        backend = SQLiteBackend(database="file:beaker_progress?mode=memory&cache=shared")
+        self.bm = Benchmark(query=SLOW_QUERY, concurrency=2, query_repeat_count=500, backend=backend)
+        self.bm.setWarehouseRegistry(None)
+
+    def tearDown(self):
+        self.bm.clearHooks()
+
+    def test_slo_breach_stops_the_run_early(self):
+        progress = self.bm.setLiveProgress(refresh_interval=0.05, slo_p95=0.0, min_samples=3)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            metrics = self.bm.execute()
+        self.assertIsNotNone(progress.breach)
+        self.assertIn("p95", self.bm.stop_reason)
+        self.assertLess(len(metrics), 500)
+        self.assertIn("Benchmark stopped early", output.getvalue())
+        self.assertIn("qps=", output.getvalue())
+
+    def test_error_rate_breach_returns_partial_results(self):
+        sink = InMemorySink()
+        self.bm.addHook(sink)
+        self.bm.setQuery("select * from missing_table")
+        self.bm.setLiveProgress(refresh_interval=0.05, slo_error_rate=0.5, min_samples=3)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            metrics = self.bm.execute()
+        self.assertIn("error rate", self.bm.stop_reason)
+        self.assertLess(len(metrics), 500)
+        self.assertTrue(metrics["error"].notna().all())
+        self.assertIn("Benchmark stopped early", output.getvalue())
+        self.assertEqual(sink.events[-1]["status"], "stopped")
+        self.assertEqual(sink.events[-1]["num_failed"], len(metrics))
+
+    def test_stopped_before_the_measured_run(self):
+        warmup = Benchmark._execute_warmup
+
+        def warmup_then_stop(bm, queries):
+            rows = warmup(bm, queries)
+            bm.stopRun("stopped during the warm-up")
+            return rows
+
+        self.bm.setWarmup(2)
+        with mock.patch.object(Benchmark, "_execute_warmup", warmup_then_stop), \
+                contextlib.redirect_stdout(io.StringIO()) as output:
+            metrics = self.bm.execute()
+        self.assertEqual(len(metrics), 0)
+        self.assertIn("query_id", metrics.columns)
+        self.assertIn("elapsed_time", metrics.columns)
+        self.assertIn("Benchmark stopped early", output.getvalue())
+        # The warm-up that did run is still recorded
+        self.assertGreater(len(self.bm.metrics_recorder), 0)
+
+    def test_stop_is_cleared_for_the_next_run(self):
+        self.bm.stopRun()
+        self.bm.setQueryRepeatCount(3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = self.bm.execute()
+        self.assertEqual(len(metrics), 3)
+        self.assertIsNone(self.bm.stop_reason)
+
+    def test_stop_bucketed_scheduler(self):
+        self.bm.setScheduler("bucketed")
+        self.bm.setLiveProgress(slo_p95=0.0, min_samples=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = self.bm.execute()
+        self.assertLess(len(metrics), 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
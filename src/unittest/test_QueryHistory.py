@@ -0,0 +1,48 @@
+import unittest
+import sys
+import json
+from unittest import mock
+
+sys.path.append("../")
+from beaker.queryhistory import QueryHistoryFetcher
+
+
+def response(json_body):
+    return mock.Mock(status_code=200, json=mock.Mock(return_value=json_body))
+
+
+class TestQueryHistoryFetcher(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = QueryHistoryFetcher("host", "token", max_results=2, initial_backoff=0)
+
+    def test_partition_covers_window(self):
+        partitions = self.fetcher._partition(0, 600_000)
+        self.assertEqual(len(partitions), 8)
+        self.assertEqual(partitions[0][0], 0)
+        self.assertEqual(partitions[-1][1], 600_000)
+        for (_, end), (start, _) in zip(partitions, partitions[1:]):
+            self.assertEqual(start, end + 1)
+
+    @mock.patch("beaker.queryhistory.requests.get")
+    def test_fetch_follows_pages_and_repolls_pending(self, get):
+        def history_api(url, data, headers):
+            body = json.loads(data)
+            if "page_token" in body:
+                return response({"res": [{"query_id": "c", "is_final": True}], "has_next_page": False})
+            if "statement_ids" in body["filter_by"]:
+                return response({"res": [{"query_id": "b", "is_final": True, "status": "FINISHED"}]})
+            return response({
+                "res": [{"query_id": "a", "is_final": True}, {"query_id": "b", "is_final": False}],
+                "has_next_page": True,
+                "next_page_token": "page2",
+            })
+
+        get.side_effect = history_api
+        history = self.fetcher.fetch(["wh"], ["user"], 0, 1000)
+
+        self.assertEqual(sorted(q["query_id"] for q in history), ["a", "b", "c"])
+        self.assertTrue(all(q["is_final"] for q in history))
+
+
+if __name__ == '__main__':
+    unittest.main()
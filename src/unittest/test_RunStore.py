@@ -0,0 +1,73 @@
+import unittest
+import sys
+import tempfile
+
+sys.path.append("../")
+from beaker.runstore import RunStore
+from beaker.benchmark import Benchmark
+from beaker.backends import SQLiteBackend
+
+
+class TestRunStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = RunStore(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_and_load_runs(self):
+        self.store.update_run("run1", name="test", status="running")
+        self.store.append("run1", "client", [{"id": "q1", "param": {"x": 1}, "elapsed_time": "1.000"}])
+        self.store.append("run1", "client", [{"id": "q2", "param": None, "elapsed_time": "2.000"}])
+        self.store.append("run2", "client", [{"id": "q1", "param": None, "elapsed_time": "3.000"}])
+        self.store.update_run("run1", status="completed")
+
+        runs = self.store.list_runs()
+        self.assertEqual(runs.loc[0, "status"], "completed")
+
+        run1 = self.store.load("client", ["run1"])
+        self.assertEqual(sorted(run1["id"]), ["q1", "q2"])
+        self.assertIn('{"x": 1}', list(run1["param"]))
+        self.assertEqual(len(self.store.load("client")), 3)
+
+
+class TestBenchmarkRunStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        backend = SQLiteBackend(database="file:beaker_run_store?mode=memory&cache=shared")
+        self.bm = Benchmark(query="select 1", concurrency=2, query_repeat_count=5, backend=backend)
+        self.bm.setWarehouseRegistry(None)
+        self.bm.setRunStore(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_client_metrics_survive_a_failed_history_fetch(self):
+        def fail(*args):
+            raise RuntimeError("history unavailable")
+
+        self.bm.get_query_history = fail
+        with self.assertRaises(RuntimeError):
+            self.bm.execute()
+        run = self.bm.run_store.list_runs().iloc[0]
+        self.assertEqual(run["status"], "failed")
+        self.assertEqual(run["error"], "history unavailable")
+        self.assertEqual(len(self.bm.run_store.load("client", [self.bm.run_id])), 5)
+
+    def test_interrupted_run_is_marked_failed(self):
+        def interrupt(workload, num_threads):
+            self.bm._execute_single_query("select 1", "q1")
+            raise KeyboardInterrupt
+
+        self.bm._execute_queries = interrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.bm.execute()
+        run = self.bm.run_store.list_runs().iloc[0]
+        self.assertEqual(run["status"], "failed")
+        self.assertEqual(run["num_queries"], 1)
+        self.assertEqual(list(self.bm.run_store.load("client", [self.bm.run_id])["id"]), ["q1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
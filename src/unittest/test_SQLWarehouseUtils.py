@@ -0,0 +1,93 @@
+import unittest
+import sys
+
+sys.path.append("../")
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, query, param=None):
+        self.executed.append((query, param))
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchmany_arrow(self, size):
+        return FakeArrowTable(self.fetchmany(size))
+
+    def close(self):
+        pass
+
+
+class FakeArrowTable:
+    def __init__(self, rows):
+        self.num_rows = len(rows)
+        self.nbytes = 8 * len(rows)
+
+
+class FakeConnection:
+    def __init__(self, rows=()):
+        self.rows = rows
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+    def close(self):
+        self.closed = True
+
+
+class TestSQLWarehouseUtils(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+        self.utils = SQLWarehouseUtils()
+
+        def get_connection():
+            connection = FakeConnection(rows=[(i,) for i in range(25)])
+            self.connections.append(connection)
+            return connection
+
+        self.utils._get_connection = get_connection
+
+    def test_execute_query_records_phases(self):
+        timings = self.utils.execute_query("select 1")
+        self.assertIsNotNone(timings["connect_time"])
+        self.assertIsNotNone(timings["execute_time"])
+        self.assertIsNotNone(timings["close_time"])
+        # Nothing is fetched by default
+        self.assertIsNone(timings["time_to_first_row"])
+        self.assertIsNone(timings["fetch_time"])
+        self.assertTrue(self.connections[0].closed)
+
+    def test_fetch_rows(self):
+        self.utils.setFetchMode("rows", fetch_batch_size=10)
+        timings = self.utils.execute_query("select 1")
+        self.assertIsNotNone(timings["time_to_first_row"])
+        self.assertGreaterEqual(timings["fetch_time"], timings["time_to_first_row"])
+        self.assertEqual(timings["result_rows"], 25)
+        self.assertIsNone(timings["result_bytes"])
+
+    def test_fetch_arrow(self):
+        self.utils.setFetchMode("arrow", fetch_batch_size=10)
+        timings = self.utils.execute_query("select 1")
+        self.assertEqual(timings["result_rows"], 25)
+        self.assertEqual(timings["result_bytes"], 200)
+        self.assertIsNotNone(timings["time_to_first_row"])
+
+    def test_pooled_mode_reuses_connection(self):
+        self.utils.setConnectionMode("pooled", pool_size=1)
+        self.utils.execute_query("select 1")
+        self.utils.execute_query("select 2")
+        self.assertEqual(len(self.connections), 1)
+        self.assertFalse(self.connections[0].closed)
+        self.utils.close_connections()
+        self.assertTrue(self.connections[0].closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
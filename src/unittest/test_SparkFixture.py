@@ -0,0 +1,117 @@
+import unittest
+import sys
+from unittest import mock
+
+import pandas as pd
+
+sys.path.append("../")
+from beaker import spark_fixture
+from beaker.metricsrecorder import MetricsRecorder
+
+
+class FakeWriter:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls.append((name, args))
+            return self
+        return call
+
+
+class FakeSpark:
+    def __init__(self):
+        self.conf = mock.Mock()
+        self.created = []
+        self.writes = []
+
+    def createDataFrame(self, pdf, schema=None):
+        self.created.append((pdf, schema))
+        return mock.Mock(write=FakeWriter(self.writes))
+
+
+class TestSparkFixture(unittest.TestCase):
+    def setUp(self):
+        recorder = MetricsRecorder(hostname="host", concurrency=2)
+        recorder.record(id="q1", param={"x": 1}, query="select 1", elapsed_time=0.5, statement_id="s1", result_rows=3)
+        recorder.record(id="q2", param=None, query="select 2", elapsed_time=0.7, statement_id="s2")
+        history = pd.DataFrame([
+            {"query_id": "s1", "metrics": {"read_bytes": 10, "photon": True, "task_time_ms": 4}, "status": "FINISHED"},
+            {"query_id": "s2", "metrics": {"read_bytes": 20}, "status": 1},
+        ])
+        self.metrics_pdf = recorder.to_pandas().merge(history, how="left", left_on="statement_id", right_on="query_id")
+
+    def test_flatten_metrics(self):
+        pdf = spark_fixture.flatten_metrics(self.metrics_pdf)
+        self.assertNotIn("metrics", pdf.columns)
+        self.assertEqual(list(pdf["metrics_read_bytes"]), [10, 20])
+        # Missing counters stay integers
+        self.assertEqual(str(pdf["metrics_task_time_ms"].dtype), "Int64")
+
+    def test_explicit_schema(self):
+        pdf = spark_fixture.to_spark_compatible(self.metrics_pdf)
+        schema = {field.name: field.dataType.simpleString() for field in spark_fixture.spark_schema(pdf).fields}
+        self.assertEqual(schema["id"], "string")
+        self.assertEqual(schema["param"], "string")
+        self.assertEqual(schema["concurrency"], "bigint")
+        self.assertEqual(schema["elapsed_time"], "double")
+        self.assertEqual(schema["connect_time"], "double")
+        self.assertEqual(schema["result_rows"], "bigint")
+        self.assertEqual(schema["warmup"], "boolean")
+        self.assertEqual(schema["metrics_photon"], "boolean")
+        self.assertEqual(schema["metrics_read_bytes"], "bigint")
+        # Mixed types become strings rather than failing the conversion
+        self.assertEqual(schema["status"], "string")
+        self.assertEqual(list(pdf["status"]), ["FINISHED", "1"])
+        self.assertEqual(pdf["param"].iloc[0], '{"x": 1}')
+        self.assertTrue(pd.isna(pdf["param"].iloc[1]))
+
+    def test_known_columns_keep_their_type(self):
+        recorder = MetricsRecorder(concurrency=2)
+        recorder.record(id="q1", query="select 1", elapsed_time=0.5, statement_id="s1")
+        recorder.record(id="q2", query="select 2", elapsed_time=0.7, statement_id="s2", error="q2 failed")
+        # s2 failed before the warehouse saw it, so the left merge leaves its history empty
+        history = pd.DataFrame([
+            {"query_id": "s1", "duration": 480, "query_start_time_ms": 1_700_000_000_000, "error_message": None},
+        ])
+        metrics_pdf = recorder.to_pandas().merge(history, how="left", left_on="statement_id", right_on="query_id")
+        self.assertEqual(metrics_pdf["duration"].dtype, "float64")
+
+        pdf = spark_fixture.to_spark_compatible(metrics_pdf)
+        schema = {field.name: field.dataType.simpleString() for field in spark_fixture.spark_schema(pdf).fields}
+        self.assertEqual(schema["duration"], "bigint")
+        self.assertEqual(schema["query_start_time_ms"], "bigint")
+        self.assertEqual(list(pdf["query_start_time_ms"]), [1_700_000_000_000, pd.NA])
+        # Empty in this run, but typed as in every other run
+        self.assertEqual(schema["error_message"], "string")
+        self.assertEqual(schema["result_rows"], "bigint")
+        self.assertEqual(schema["error"], "string")
+        self.assertTrue(pd.isna(pdf["error"].iloc[0]))
+        self.assertEqual(pdf["error"].iloc[1], "q2 failed")
+
+    def test_unknown_columns_are_inferred(self):
+        pdf = spark_fixture.to_spark_compatible(pd.DataFrame({"custom": [1.5, 2.5], "tag": [None, None]}))
+        schema = {field.name: field.dataType.simpleString() for field in spark_fixture.spark_schema(pdf).fields}
+        self.assertEqual(schema, {"custom": "double", "tag": "string"})
+
+    def test_export_metrics_to_delta(self):
+        spark = FakeSpark()
+        with mock.patch.object(spark_fixture, "get_spark_session", return_value=spark):
+            spark_fixture.export_metrics_to_delta(self.metrics_pdf, "main.bench.results", "run_1")
+        spark.conf.set.assert_called_with("spark.sql.execution.arrow.pyspark.enabled", "true")
+        pdf, schema = spark.created[0]
+        self.assertEqual(list(pdf["run_id"]), ["run_1", "run_1"])
+        self.assertIn("run_id", schema.fieldNames())
+        self.assertIn(("partitionBy", ("run_id",)), spark.writes)
+        self.assertIn(("mode", ("append",)), spark.writes)
+        self.assertEqual(spark.writes[-1], ("saveAsTable", ("main.bench.results",)))
+
+    def test_export_skips_empty_metrics(self):
+        with mock.patch.object(spark_fixture, "get_spark_session") as get_spark_session:
+            self.assertIsNone(spark_fixture.export_metrics_to_delta(pd.DataFrame(), "t", "run_1"))
+        get_spark_session.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import sys
+
+sys.path.append("../")
+from beaker.stats import median_confidence_interval, relative_median_ci_width, find_saturation_knee
+
+
+class TestStats(unittest.TestCase):
+    def test_median_confidence_interval_contains_median(self):
+        samples = list(range(1, 101))
+        lower, upper = median_confidence_interval(samples, 0.95)
+        self.assertLess(lower, 50.5)
+        self.assertGreater(upper, 50.5)
+        # Roughly +/- 1 standard error of the median rank around the middle
+        self.assertGreaterEqual(lower, 38)
+        self.assertLessEqual(upper, 63)
+
+    def test_interval_narrows_with_more_samples(self):
+        noisy = [1.0, 1.5, 0.8, 1.2, 1.1, 0.9]
+        self.assertGreater(
+            relative_median_ci_width(noisy),
+            relative_median_ci_width(noisy * 20),
+        )
+
+    def test_constant_samples_have_zero_width(self):
+        self.assertEqual(relative_median_ci_width([2.0] * 10), 0)
+
+    def test_find_saturation_knee(self):
+        levels = [1, 2, 4, 8, 16, 32]
+        throughputs = [10, 19, 37, 70, 75, 76]
+        p99s = [1.0, 1.0, 1.1, 1.2, 2.5, 5.0]
+        self.assertEqual(find_saturation_knee(levels, throughputs, p99s), 8)
+
+    def test_no_knee_while_scaling(self):
+        levels = [1, 2, 4, 8]
+        self.assertIsNone(find_saturation_knee(levels, [10, 20, 40, 80], [1.0, 1.0, 1.0, 1.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+sys.path.append("../")
+from beaker.warehouseregistry import WarehouseRegistry
+from beaker.sqlwarehouseutils import SQLWarehouseUtils
+
+hostname = "example.cloud.databricks.com"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class TestWarehouseRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.registry = WarehouseRegistry(os.path.join(self.tmp_dir.name, "registry", "warehouses.json"))
+        self.utils = SQLWarehouseUtils(hostname=hostname, token="token")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_equivalent_configs_share_a_fingerprint(self):
+        self.assertEqual(
+            self.registry.fingerprint(hostname, {}),
+            self.registry.fingerprint(hostname, {"size": "small", "warehouse": "serverless", "enable_photon": True}),
+        )
+        self.assertNotEqual(
+            self.registry.fingerprint(hostname, {"size": "Small"}),
+            self.registry.fingerprint(hostname, {"size": "Medium"}),
+        )
+        self.assertNotEqual(
+            self.registry.fingerprint(hostname, {}),
+            self.registry.fingerprint("other.cloud.databricks.com", {}),
+        )
+
+    def test_register_lookup_and_forget(self):
+        self.assertIsNone(self.registry.lookup(hostname, {"size": "Small"}))
+        self.registry.register(hostname, {"size": "Small"}, "abc123")
+        self.assertEqual(self.registry.lookup(hostname, {"size": "Small"}), "abc123")
+        self.assertEqual(len(self.registry.list_warehouses()), 1)
+        self.registry.forget(hostname, {"size": "Small"})
+        self.assertIsNone(self.registry.lookup(hostname, {"size": "Small"}))
+
+    def test_launch_restarts_registered_warehouse(self):
+        self.registry.register(hostname, {"size": "Small"}, "abc123")
+        with mock.patch("beaker.sqlwarehouseutils.requests.get", return_value=FakeResponse(200, {"state": "STOPPED"})), \
+                mock.patch.object(SQLWarehouseUtils, "create_warehouse") as create_warehouse, \
+                mock.patch.object(SQLWarehouseUtils, "wait_for_warehouse") as wait_for_warehouse:
+            warehouse_id = self.utils.launch_warehouse({"size": "Small"}, registry=self.registry)
+        self.assertEqual(warehouse_id, "abc123")
+        create_warehouse.assert_not_called()
+        wait_for_warehouse.assert_called_once_with("abc123")
+
+    def test_launch_replaces_deleted_warehouse(self):
+        self.registry.register(hostname, {"size": "Small"}, "abc123")
+        with mock.patch("beaker.sqlwarehouseutils.requests.get", return_value=FakeResponse(200, {"state": "DELETED"})), \
+                mock.patch.object(SQLWarehouseUtils, "create_warehouse", return_value="def456"), \
+                mock.patch.object(SQLWarehouseUtils, "wait_for_warehouse"):
+            warehouse_id = self.utils.launch_warehouse({"size": "Small"}, registry=self.registry)
+        self.assertEqual(warehouse_id, "def456")
+        self.assertEqual(self.registry.lookup(hostname, {"size": "Small"}), "def456")
+
+    def test_serverless_launch_skips_runtime_lookup(self):
+        with mock.patch("beaker.sqlwarehouseutils.requests.post", return_value=FakeResponse(200, {"id": "abc123"})), \
+                mock.patch.object(SQLWarehouseUtils, "_get_spark_runtimes") as get_spark_runtimes:
+            self.assertEqual(self.utils.create_warehouse({"warehouse": "serverless"}), "abc123")
+        get_spark_runtimes.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()